@@ -0,0 +1,78 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+"""
+Benchmark of vectorized portfolio pricing and yield to maturity solver
+Prints throughput in bonds priced per second
+
+Run from src directory:
+    python benchmarks/bench_analytics.py [--sizes 1000 100000 1000000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+
+import django  # noqa: E402
+import numpy as np  # noqa: E402
+
+django.setup()
+
+from bonds_api.analytics import analyze_portfolio  # noqa: E402
+from bonds_api.valuation import to_datetime64  # noqa: E402
+
+
+def generate(size: int, seed: int = 42):
+    rnd = random.Random(seed)
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    purchase = [start + timedelta(seconds=rnd.randrange(10 ** 8))
+                for _ in range(size)]
+    maturity = [date + timedelta(seconds=rnd.randrange(10 ** 8, 6 * 10 ** 8))
+                for date in purchase]
+    portfolio = {"value": np.array([rnd.uniform(1, 10000)
+                                    for _ in range(size)]),
+                 "interest": np.array([rnd.uniform(0, 10)
+                                       for _ in range(size)]),
+                 "purchase_date": to_datetime64(purchase),
+                 "maturity_date": to_datetime64(maturity),
+                 "frequency": np.array([rnd.choice("DWMY")
+                                        for _ in range(size)], dtype="U1")}
+    prices = portfolio["value"] * np.array([rnd.uniform(0.8, 1.2)
+                                            for _ in range(size)])
+    return portfolio, prices
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 100000, 1000000])
+    parser.add_argument("--rate", type=float, default=3.0,
+                        help="discount rate in percent")
+    args = parser.parse_args()
+    as_of = to_datetime64([datetime(2024, 1, 1, tzinfo=timezone.utc)])[0]
+
+    print("%10s %12s %14s %10s" % ("bonds", "seconds", "bonds/s", "errors"))
+    for size in args.sizes:
+        portfolio, prices = generate(size)
+
+        start = time.perf_counter()
+        analytics = analyze_portfolio(portfolio, args.rate, prices, as_of)
+        elapsed = time.perf_counter() - start
+
+        errors = int((analytics["error"] != None).sum())  # noqa: E711
+        print("%10d %12.4f %14.0f %10d" % (size, elapsed, size / elapsed,
+                                           errors))
+
+
+if __name__ == "__main__":
+    main()
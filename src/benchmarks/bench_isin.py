@@ -0,0 +1,62 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+"""
+Micro-benchmark of offline ISIN rejection compared to CDCP round trip
+
+Run from src directory:
+    python benchmarks/bench_isin.py [--remote URL]
+
+Without --remote the round trip is measured against local CDCP stub,
+which is the lower bound of real CDCP latency.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, os.path.join(SRC_DIR, "tests"))
+
+from bonds_api.isin import get_isin_error  # noqa: E402
+from bonds_api.cdcp import CDCPClient  # noqa: E402
+from cdcp_stub import CDCPStubServer  # noqa: E402
+
+MALFORMED = ["CZ0003551252", "CZ000355125", "QQ0003551251", "cz0003551251"]
+
+
+def bench(func, number: int) -> float:
+    """
+        Return average time of one call in microseconds
+    """
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--remote", help="CDCP URL ending with ?isin=")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    print("local rejection:")
+    for isin in MALFORMED:
+        print("  %-14s %8.2f us" % (isin, bench(lambda: get_isin_error(isin),
+                                               100000)))
+
+    def round_trip(client):
+        return bench(lambda: client.is_issued("CZ0003551252"), args.requests)
+
+    if args.remote:
+        client = CDCPClient(url=args.remote, max_retries=0)
+        print("CDCP round trip:  %10.2f us" % round_trip(client))
+    else:
+        with CDCPStubServer() as server:
+            client = CDCPClient(url=server.url, max_retries=0)
+            print("stub round trip:  %10.2f us" % round_trip(client))
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
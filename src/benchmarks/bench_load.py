@@ -0,0 +1,334 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+"""
+End-to-end load benchmark of every route of bonds_api.bond_urls
+Concurrent clients send seeded mix of requests, latency percentiles
+and throughput are reported per route as JSON
+
+Run from src directory:
+    python benchmarks/bench_load.py [--bonds 10000] [--users 50]
+        [--concurrency 16] [--duration 20] [--output load.json]
+
+Without --url synthetic portfolio is generated to temporary SQLite
+database (or to --database, which is reused when it exists) and served
+by threaded WSGI server in subprocess, ISINs of new bonds are validated
+by local CDCP stub. With --url running service is benchmarked, its
+database must contain generated users (see generator.py).
+"""
+
+import argparse
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from collections import Counter
+from collections import defaultdict
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from generator import NEW_ISIN_START
+from generator import PASSWORD
+from generator import TESTS_DIR
+from generator import USER_PREFIX
+from generator import generate_bond_data
+from generator import populate
+from generator import setup_django
+from report import summarize
+from report import write_report
+
+# route name, method, weight in request mix
+SCENARIOS: List[Tuple[str, str, int]] = [
+    ("bond-list", "GET", 20),
+    ("bond-list", "POST", 5),
+    ("bond-list-async", "POST", 2),
+    ("bond-bulk", "POST", 1),
+    ("bond-bulk", "PATCH", 1),
+    ("bond-bulk", "DELETE", 1),
+    ("bond-export", "GET", 1),
+    ("bond-detail", "GET", 30),
+    ("bond-detail", "PATCH", 5),
+    ("bond-detail-async", "PATCH", 2),
+    ("bond-detail", "DELETE", 5),
+    ("bond-cashflows", "GET", 10),
+    ("portfolio-cashflows", "GET", 5),
+    ("bond-analytics", "POST", 2),
+    ("bond-user-detail", "GET", 10),
+]
+BULK_SIZE = 10
+
+
+class Worker(threading.Thread):
+    """
+        Client of one user sending requests until deadline
+    """
+    def __init__(self, base_url: str, username: str, seed: int,
+                 new_isins: Callable[[], int], deadline: float):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.rnd = random.Random(seed)
+        self.new_isins = new_isins
+        self.deadline = deadline
+        self.session = requests.Session()
+        self.session.auth = (username, PASSWORD)
+        self.isins: List[str] = []
+        self.created: List[str] = []
+        self.user_id: Optional[int] = None
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    def url(self, name: str, *args: Any) -> str:
+        from django.urls import reverse
+
+        return self.base_url + reverse(name, args=args)
+
+    def prepare(self) -> None:
+        """
+            Find bonds and id of user, not measured
+        """
+        response = self.session.get(self.url("bond-list"),
+                                    params={"page_size": 200})
+        response.raise_for_status()
+        bonds = response.json()["results"]
+        self.isins = [bond["isin"] for bond in bonds]
+        self.user_id = bonds[0]["user"]
+
+    def new_bond(self) -> Dict[str, Any]:
+        return generate_bond_data(self.rnd, self.new_isins())
+
+    def request(self, name: str, method: str) -> Optional[Tuple]:
+        """
+            Arguments of request of scenario, None if it can not be sent
+        """
+        rnd = self.rnd
+        if name == "bond-list" and method == "GET":
+            return (self.url(name), {"params": {"page_size": 50}})
+        if name in ("bond-list", "bond-list-async"):
+            return (self.url(name), {"json": self.new_bond()})
+        if name == "bond-bulk" and method == "POST":
+            return (self.url(name),
+                    {"json": [self.new_bond() for _ in range(BULK_SIZE)]})
+        if name == "bond-bulk" and method == "PATCH":
+            return (self.url(name),
+                    {"json": [{"isin": isin,
+                               "value": round(rnd.uniform(1000, 100000), 2)}
+                              for isin in rnd.sample(self.isins, min(
+                                  BULK_SIZE, len(self.isins)))]})
+        if name == "bond-bulk":
+            if not self.created:
+                return None
+            isins = self.created[-BULK_SIZE:]
+            del self.created[-BULK_SIZE:]
+            return (self.url(name), {"json": isins})
+        if name == "bond-export":
+            return (self.url(name, rnd.choice(["ndjson", "csv"])), {})
+        if name == "bond-detail" and method == "DELETE":
+            if not self.created:
+                return None
+            return (self.url(name, self.created.pop()), {})
+        if method == "PATCH":
+            return (self.url(name, rnd.choice(self.isins)),
+                    {"json": {"value": round(rnd.uniform(1000, 100000),
+                                             2)}})
+        if name in ("bond-detail", "bond-cashflows"):
+            return (self.url(name, rnd.choice(self.isins)),
+                    {"params": {"limit": 20}})
+        if name == "portfolio-cashflows":
+            return (self.url(name), {"params": {"from": "2025-01-01",
+                                                "limit": 50}})
+        if name == "bond-analytics":
+            return (self.url(name), {"json": {"discount_rate": 3.0}})
+        if name == "bond-user-detail":
+            return (self.url(name, self.user_id), {})
+        raise ValueError("Unknown scenario %s %s" % (method, name))
+
+    def run(self) -> None:
+        population = [(name, method) for name, method, _ in SCENARIOS]
+        weights = [weight for _, _, weight in SCENARIOS]
+        while time.perf_counter() < self.deadline:
+            name, method = self.rnd.choices(population, weights)[0]
+            args = self.request(name, method)
+            if args is None:
+                continue
+            url, kwargs = args
+            key = "%s %s" % (method, name)
+
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+                response.content
+            except requests.RequestException:
+                response = None
+            self.latencies[key].append(time.perf_counter() - start)
+            self.statuses[key][response.status_code if response is not None
+                               else "exception"] += 1
+
+            if response is None or response.status_code >= 400:
+                continue
+            # created bonds are deleted later
+            if method == "POST" and name in ("bond-list",
+                                             "bond-list-async"):
+                self.created.append(kwargs["json"]["isin"])
+            elif name == "bond-bulk" and method == "POST":
+                self.created.extend(result["isin"]
+                                    for result in response.json()
+                                    if result["status"] == "created")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), 1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def serve(database: str, port: int) -> None:
+    """
+        Serve bonds API over database with CDCP stub until killed
+    """
+    sys.path.insert(0, TESTS_DIR)
+    from cdcp_stub import CDCPStubServer
+
+    with CDCPStubServer(issue_all=True) as stub:
+        setup_django(database=database, cdcp_url=stub.url)
+        from django.core.servers.basehttp import ThreadedWSGIServer
+        from django.core.servers.basehttp import WSGIRequestHandler
+        from django.core.wsgi import get_wsgi_application
+
+        class Server(ThreadedWSGIServer):
+            request_queue_size = 256
+
+        httpd = Server(("127.0.0.1", port), WSGIRequestHandler)
+        httpd.set_app(get_wsgi_application())
+        # every request and client error would be logged
+        logging.getLogger("django.server").setLevel(logging.ERROR)
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+        httpd.serve_forever()
+
+
+def run_load(base_url: str, users: int, concurrency: int, duration: float,
+             seed: int) -> Dict[str, Any]:
+    from bonds_api import bond_urls
+
+    counter = count(NEW_ISIN_START + seed * 1000000)
+    lock = threading.Lock()
+
+    def new_isins() -> int:
+        with lock:
+            return next(counter)
+
+    workers = [Worker(base_url, "%s%s" % (USER_PREFIX, i % users),
+                      seed + i, new_isins, 0.0)
+               for i in range(concurrency)]
+    for worker in workers:
+        worker.prepare()
+
+    start = time.perf_counter()
+    for worker in workers:
+        worker.deadline = start + duration
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Counter] = defaultdict(Counter)
+    for worker in workers:
+        for key, values in worker.latencies.items():
+            latencies[key].extend(values)
+            statuses[key].update(worker.statuses[key])
+
+    def route_results(key: str) -> Dict[str, Any]:
+        errors = sum(number for code, number in statuses[key].items()
+                     if code == "exception" or code >= 400)
+        return dict(summarize(latencies[key], errors, elapsed),
+                    status_codes={str(code): number for code, number
+                                  in sorted(statuses[key].items(),
+                                            key=str)})
+
+    covered = {name for name, _, _ in SCENARIOS}
+    uncovered = sorted(pattern.name for pattern in bond_urls.urlpatterns
+                       if pattern.name not in covered)
+    if uncovered:
+        print("Routes without scenario: %s" % ", ".join(uncovered),
+              file=sys.stderr)
+    routes = {key: route_results(key) for key in sorted(latencies)}
+    return {"routes": routes,
+            "total": summarize([value for values in latencies.values()
+                                for value in values],
+                               sum(route["errors"] for route
+                                   in routes.values()), elapsed),
+            "uncovered_routes": uncovered}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="URL of running service")
+    parser.add_argument("--database", help="SQLite file of served database")
+    parser.add_argument("--bonds", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0,
+                        help="seconds of load")
+    parser.add_argument("--output", help="JSON report file, stdout if not set")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.database, args.serve)
+        return
+
+    if args.url:
+        setup_django()
+        results = run_load(args.url.rstrip("/"), args.users,
+                           args.concurrency, args.duration, args.seed)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            database = args.database or os.path.join(directory, "db.sqlite3")
+            exists = os.path.exists(database)
+            setup_django(database=database)
+            if not exists:
+                from django.core.management import call_command
+
+                call_command("migrate", verbosity=0)
+                populate(args.bonds, args.users, args.seed)
+
+            port = free_port()
+            server = subprocess.Popen([sys.executable, __file__,
+                                       "--database", database,
+                                       "--serve", str(port)])
+            try:
+                wait_for_port(port)
+                results = run_load("http://127.0.0.1:%s" % port, args.users,
+                                   args.concurrency, args.duration,
+                                   args.seed)
+            finally:
+                server.terminate()
+                server.wait()
+
+    write_report("load", vars(args), results, args.output)
+
+
+if __name__ == "__main__":
+    main()
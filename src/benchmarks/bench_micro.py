@@ -0,0 +1,99 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+"""
+Micro-benchmarks of hot functions of request handling
+CDCP is replaced by local stub, nothing goes to network
+
+Run from src directory:
+    python benchmarks/bench_micro.py [--seed 42] [--output micro.json]
+"""
+
+import argparse
+import random
+import sys
+import timeit
+
+from generator import TESTS_DIR
+from generator import generate_bond_data
+from generator import generate_bonds
+from generator import setup_django
+from report import write_report
+
+sys.path.insert(0, TESTS_DIR)
+
+from cdcp_stub import CDCPStubServer  # noqa: E402
+
+
+def bench(func, number: int) -> float:
+    """
+        Return the best average time of one call in microseconds
+    """
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch", type=int, default=1000,
+                        help="number of bonds serialized at once")
+    parser.add_argument("--output", help="JSON report file, stdout if not set")
+    args = parser.parse_args()
+
+    with CDCPStubServer(issue_all=True) as server:
+        setup_django(cdcp_url=server.url)
+
+        from bonds_api.cdcp import get_cdcp_client
+        from bonds_api.isin_cache import get_isin_cache
+        from bonds_api.serializers import BondSerializer
+        from bonds_api.serializers import serialize_bond_values
+        from bonds_api.utils import check_attributes
+        from bonds_api.utils import get_number_of_payments
+
+        rnd = random.Random(args.seed)
+        data = generate_bond_data(rnd, 0)
+        cache = get_isin_cache()
+        results = {}
+
+        results["check_attributes.format_only"] = bench(
+            lambda: check_attributes(data, check_isin=False), 20000)
+        check_attributes(data)
+        results["check_attributes.cached_isin"] = bench(
+            lambda: check_attributes(data), 20000)
+
+        def uncached():
+            cache.clear()
+            check_attributes(data)
+        results["check_attributes.cdcp_stub"] = bench(uncached, 200)
+        get_cdcp_client().close()
+
+        bonds = list(generate_bonds(args.batch, [1], args.seed))
+        for i, bond in enumerate(bonds):
+            bond.id = i + 1
+        bond = bonds[0]
+        results["check_attributes.update"] = bench(
+            lambda: check_attributes({"value": 10.5}, bond, True), 20000)
+
+        for frequency in "DWMY":
+            results["get_number_of_payments.%s" % frequency] = bench(
+                lambda: get_number_of_payments(
+                    bond.purchase_date, bond.maturity_date, frequency),
+                100000)
+
+        rows = [{field: getattr(bond, "user_id" if field == "user"
+                                else field)
+                 for field in BondSerializer.Meta.fields} for bond in bonds]
+        results["BondSerializer.one"] = bench(
+            lambda: BondSerializer(bonds[0]).data, 2000)
+        results["BondSerializer.many_per_bond"] = bench(
+            lambda: BondSerializer(bonds, many=True).data, 5) / len(bonds)
+        results["serialize_bond_values.per_bond"] = bench(
+            lambda: serialize_bond_values(rows), 20) / len(bonds)
+
+    write_report("micro", vars(args),
+                 {name: {"per_call_us": value}
+                  for name, value in results.items()}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+"""
+Benchmark of renderers of bond list
+Prints payload size and render time per 10k bonds of JSONRenderer,
+ORJSONRenderer and MessagePackRenderer (renderers of missing packages
+are skipped) for all fields and for subset selected by ?fields=
+
+Run from src directory:
+    python benchmarks/bench_renderers.py [--size 10000] [--repeat 5]
+        [--fields isin,value,maturity_date] [--output renderers.json]
+"""
+
+import argparse
+import time
+
+from bench_serializer import generate
+from report import write_report
+
+from rest_framework.renderers import JSONRenderer
+
+from bonds_api import renderers
+from bonds_api.serializers import BondSerializer
+from bonds_api.serializers import serialize_bond_values
+from bonds_api.utils import parse_fields_param
+
+
+def measure(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fields", default="isin,value,maturity_date",
+                        help="subset of fields as in ?fields= parameter")
+    parser.add_argument("--output", help="JSON report file, stdout if not set")
+    args = parser.parse_args()
+
+    _, rows = generate(args.size)
+    fieldsets = {
+        "all": BondSerializer.Meta.fields,
+        "fields": parse_fields_param(args.fields, BondSerializer.Meta.fields),
+    }
+    candidates = {"JSONRenderer": JSONRenderer()}
+    if renderers.orjson is not None:
+        candidates["ORJSONRenderer"] = renderers.ORJSONRenderer()
+    if renderers.msgpack is not None:
+        candidates["MessagePackRenderer"] = renderers.MessagePackRenderer()
+    skipped = {"ORJSONRenderer": renderers.orjson,
+               "MessagePackRenderer": renderers.msgpack}
+    for name, module in skipped.items():
+        if module is None:
+            print("%s skipped, package is not installed" % name)
+
+    per_10k = 10000 / args.size
+    results = {}
+    print("%-20s %-8s %14s %14s" % ("renderer", "fields", "kB / 10k bonds",
+                                    "ms / 10k bonds"))
+    for fieldset, fields in fieldsets.items():
+        # rows as returned by values(*fields) of list view
+        data = serialize_bond_values(
+            [{field: row[field] for field in fields} for row in rows],
+            fields)
+        for name, renderer in candidates.items():
+            payload = renderer.render(data)
+            render_time = measure(lambda: renderer.render(data), args.repeat)
+            results["%s.%s" % (name, fieldset)] = {
+                "kb_per_10k": len(payload) * per_10k / 1024,
+                "ms_per_10k": render_time * per_10k * 1000}
+            print("%-20s %-8s %14.1f %14.1f" % (
+                name, fieldset, len(payload) * per_10k / 1024,
+                render_time * per_10k * 1000))
+
+    if args.output:
+        write_report("renderers", vars(args), results, args.output)
+
+
+if __name__ == "__main__":
+    main()
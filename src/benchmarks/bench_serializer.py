@@ -0,0 +1,99 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+"""
+Benchmark of BondSerializer and lean serialization of values() rows
+Prints serialization time per 10k bonds
+
+Run from src directory:
+    python benchmarks/bench_serializer.py [--size 10000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from bonds_api.models import Bond  # noqa: E402
+from bonds_api.serializers import BondSerializer  # noqa: E402
+from bonds_api.serializers import serialize_bond_values  # noqa: E402
+
+
+def generate(size: int, seed: int = 42):
+    rnd = random.Random(seed)
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    bonds = []
+    for i in range(size):
+        purchase = start + timedelta(seconds=rnd.randrange(10 ** 8))
+        bonds.append(Bond(id=i + 1,
+                          emmision_name="Bond %s" % i,
+                          isin="CZ%010d" % i,
+                          value=rnd.uniform(1, 10000),
+                          interest=rnd.uniform(-1, 10),
+                          purchase_date=purchase,
+                          maturity_date=purchase + timedelta(
+                              seconds=rnd.randrange(10 ** 9)),
+                          interest_payment_frequency=rnd.choice("DWMY"),
+                          user_id=1))
+    # rows as returned by values(*BondSerializer.Meta.fields)
+    rows = [{"emmision_name": bond.emmision_name,
+             "isin": bond.isin,
+             "value": bond.value,
+             "interest": bond.interest,
+             "purchase_date": bond.purchase_date,
+             "maturity_date": bond.maturity_date,
+             "user": bond.user_id,
+             "interest_payment_frequency": bond.interest_payment_frequency,
+             "validation_status": bond.validation_status}
+            for bond in bonds]
+    return bonds, rows
+
+
+def measure(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bonds, rows = generate(args.size)
+    renderer = JSONRenderer()
+    assert renderer.render(BondSerializer(bonds, many=True).data) == \
+        renderer.render(serialize_bond_values(rows))
+
+    model_time = measure(lambda: BondSerializer(bonds, many=True).data,
+                         args.repeat)
+    lean_time = measure(lambda: serialize_bond_values(rows), args.repeat)
+    per_10k = 10000 / args.size
+
+    print("%-16s %14s" % ("serializer", "ms / 10k bonds"))
+    print("%-16s %14.1f" % ("BondSerializer", model_time * per_10k * 1000))
+    print("%-16s %14.1f" % ("lean", lean_time * per_10k * 1000))
+    print("speedup %.1fx" % (model_time / lean_time))
+
+
+if __name__ == "__main__":
+    main()
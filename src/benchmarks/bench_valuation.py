@@ -0,0 +1,88 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+"""
+Benchmark of scalar and NumPy-vectorized future value of portfolio
+Both read bonds from in-memory SQLite, speedup includes load of columns
+
+Run from src directory:
+    python benchmarks/bench_valuation.py [--sizes 1000 100000 1000000]
+"""
+
+import argparse
+import time
+
+from generator import generate_bonds
+from generator import setup_django
+
+
+def scalar(queryset):
+    from bonds_api.utils import get_number_of_payments
+    from bonds_api.valuation import VALUATION_FIELDS
+
+    future_value = 0.0
+    payments = []
+    for value, interest, *args in queryset.values_list(*VALUATION_FIELDS):
+        number_of_payments = get_number_of_payments(*args)
+        payments.append(number_of_payments)
+        future_value += value * (1.0 + interest / 100) ** number_of_payments
+    return future_value, payments
+
+
+def vectorized(portfolio):
+    from bonds_api.valuation import get_future_values
+    from bonds_api.valuation import get_numbers_of_payments
+
+    payments = get_numbers_of_payments(portfolio["purchase_date"],
+                                       portfolio["maturity_date"],
+                                       portfolio["frequency"])
+    return get_future_values(portfolio["value"], portfolio["interest"],
+                             payments).sum(), payments
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 100000, 1000000])
+    args = parser.parse_args()
+
+    setup_django(database=":memory:")
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+
+    from bonds_api.models import Bond
+    from bonds_api.registry import iter_batches
+    from bonds_api.valuation import load_portfolio
+
+    call_command("migrate", verbosity=0)
+    user = User.objects.create_user("bench")
+    queryset = Bond.objects.filter(user=user)
+
+    # both paths read bonds from database, load of vectorized path
+    # includes conversion of dates to datetime64
+    print("%10s %12s %12s %12s %8s" % ("bonds", "scalar s", "load s",
+                                       "vector s", "speedup"))
+    for size in args.sizes:
+        queryset.delete()
+        for batch in iter_batches(generate_bonds(size, [user.id]), 10000):
+            Bond.objects.bulk_create(batch)
+
+        start = time.perf_counter()
+        scalar_fv, scalar_payments = scalar(queryset)
+        scalar_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        portfolio = load_portfolio(queryset)
+        load_time = time.perf_counter() - start
+        vector_fv, vector_payments = vectorized(portfolio)
+        vector_time = time.perf_counter() - start - load_time
+
+        assert vector_payments.tolist() == scalar_payments
+        assert abs(vector_fv - scalar_fv) <= 1e-9 * abs(scalar_fv)
+        print("%10d %12.4f %12.4f %12.4f %7.1fx" % (
+            size, scalar_time, load_time, vector_time,
+            scalar_time / (load_time + vector_time)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+"""
+Seeded generator of synthetic portfolios for benchmarks
+
+Run from src directory to fill database:
+    python benchmarks/generator.py --bonds 100000 --users 100
+        [--seed 42] [--database bench.sqlite3]
+
+The same seed always generates the same users and bonds. ISINs are
+well formed (valid check digit), so they pass local validation, CDCP
+is never asked as bonds are inserted directly.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from typing import Iterator, List, Optional
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS_DIR = os.path.join(SRC_DIR, "tests")
+sys.path.insert(0, SRC_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+
+USER_PREFIX = "bench_user_"
+PASSWORD = "bench"
+# ISINs of generated bonds are numbered from 0, bonds created during
+# benchmarks from NEW_ISIN_START
+NEW_ISIN_START = 500000000
+START_DATE = datetime(2015, 1, 1, tzinfo=timezone.utc)
+# interest of bond is paid every period, annual rates are divided by
+# number of periods, so future values stay realistic
+PERIODS_PER_YEAR = {"D": 365, "W": 52, "M": 12, "Y": 1}
+FREQUENCY_NAMES = {"D": "Daily", "W": "Weekly", "M": "Monthly",
+                   "Y": "Yearly"}
+
+
+def setup_django(database: Optional[str] = None,
+                 cdcp_url: Optional[str] = None,
+                 fast_auth: bool = True) -> None:
+    """
+        Configure settings for benchmark and set Django up
+        Must be called before any import of bonds_api
+        database    - SQLite file used instead of db.sqlite3
+        cdcp_url    - URL of CDCP (stub) instead of real CDCP
+        fast_auth   - hash passwords by MD5, so basic authentication
+                      does not dominate latency of requests
+    """
+    import django
+    import settings
+
+    if database:
+        settings.DATABASES = {"default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": database,
+            # concurrent writers wait for lock instead of failing
+            "OPTIONS": {"timeout": 30},
+        }}
+    if cdcp_url:
+        settings.CDCP_URL = cdcp_url
+    if fast_auth:
+        settings.PASSWORD_HASHERS = [
+            "django.contrib.auth.hashers.MD5PasswordHasher"]
+    # DEBUG would record every query in memory and logging of every
+    # request would be measured too
+    settings.DEBUG = False
+    settings.LOGGING = dict(settings.LOGGING,
+                            root={"handlers": ["console"],
+                                  "level": "WARNING"})
+    settings.ALLOWED_HOSTS = ["127.0.0.1", "localhost"]
+    django.setup()
+
+
+def make_isin(number: int, country: str = "CZ") -> str:
+    """
+        Well formed ISIN with given serial number
+    """
+    from bonds_api.isin import get_check_digit
+
+    payload = "%s%09d" % (country, number)
+    return payload + str(get_check_digit(payload))
+
+
+def generate_bonds(count: int, user_ids: List[int], seed: int = 42,
+                   start: int = 0) -> Iterator:
+    """
+        Generate unsaved bonds with serial numbers start..start + count
+        The first bonds are spread over all users, so each user has one
+    """
+    from bonds_api.models import Bond
+
+    rnd = random.Random("%s-%s" % (seed, start))
+    for number in range(start, start + count):
+        if number < len(user_ids):
+            user_id = user_ids[number]
+        else:
+            user_id = rnd.choice(user_ids)
+        purchase_date = START_DATE + timedelta(
+            seconds=rnd.randrange(10 * 365 * 24 * 3600))
+        maturity_date = purchase_date + timedelta(
+            days=rnd.randrange(365, 30 * 365))
+        frequency = rnd.choice("DWMY")
+        yield Bond(emmision_name="Bench bond %s" % number,
+                   isin=make_isin(number),
+                   value=round(rnd.uniform(1000, 100000), 2),
+                   interest=round(rnd.uniform(0, 8) /
+                                  PERIODS_PER_YEAR[frequency], 4),
+                   purchase_date=purchase_date,
+                   maturity_date=maturity_date,
+                   interest_payment_frequency=frequency,
+                   user_id=user_id)
+
+
+def generate_bond_data(rnd: random.Random, number: int) -> dict:
+    """
+        Request data of new bond for create endpoints
+    """
+    purchase_date = START_DATE + timedelta(
+        seconds=rnd.randrange(10 * 365 * 24 * 3600))
+    maturity_date = purchase_date + timedelta(days=rnd.randrange(365,
+                                                                 30 * 365))
+    frequency = rnd.choice("DWMY")
+    return {"emmision_name": "Bench bond %s" % number,
+            "isin": make_isin(number),
+            "value": round(rnd.uniform(1000, 100000), 2),
+            "interest": round(rnd.uniform(0, 8) /
+                              PERIODS_PER_YEAR[frequency], 4),
+            "purchase_date": purchase_date.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "maturity_date": maturity_date.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "interest_payment_frequency": FREQUENCY_NAMES[frequency]}
+
+
+def create_users(count: int) -> List[int]:
+    """
+        Create benchmark users (or reuse existing ones), return their ids
+        All of them have password PASSWORD
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+
+    names = ["%s%s" % (USER_PREFIX, i) for i in range(count)]
+    existing = set(User.objects.filter(username__in=names)
+                   .values_list("username", flat=True))
+    # password is hashed once for all users
+    password = make_password(PASSWORD)
+    User.objects.bulk_create([User(username=name, password=password)
+                              for name in names if name not in existing])
+    ids = dict(User.objects.filter(username__in=names)
+               .values_list("username", "id"))
+    return [ids[name] for name in names]
+
+
+def populate(bonds: int, users: int, seed: int = 42,
+             batch_size: int = 5000, verbose: bool = False) -> List[int]:
+    """
+        Create users and bonds, return ids of users
+        Database must not contain generated bonds yet
+    """
+    from django.db import transaction
+
+    from bonds_api.registry import iter_batches
+    from bonds_api.summary import rebuild_summary
+
+    user_ids = create_users(users)
+    created = 0
+    for batch in iter_batches(generate_bonds(bonds, user_ids, seed),
+                              batch_size):
+        with transaction.atomic():
+            type(batch[0]).objects.bulk_create(batch)
+        created += len(batch)
+        if verbose:
+            print("%s bonds created" % created, file=sys.stderr)
+    for user_id in user_ids:
+        rebuild_summary(user_id)
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bonds", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--database", help="SQLite file, created if needed")
+    args = parser.parse_args()
+
+    setup_django(database=args.database)
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+    start = time.perf_counter()
+    populate(args.bonds, args.users, args.seed, args.batch_size,
+             verbose=True)
+    print("%s bonds of %s users created in %.1f s" % (
+        args.bonds, args.users, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
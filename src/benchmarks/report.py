@@ -0,0 +1,128 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+"""
+JSON reports of benchmarks, so runs can be compared over time
+
+Compare two reports:
+    python benchmarks/report.py old.json new.json
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+
+from datetime import datetime
+from datetime import timezone
+from typing import Any, Dict, List, Optional
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+        Nearest rank percentile of sorted values
+    """
+    if not values:
+        return 0.0
+    rank = math.ceil(fraction * len(values)) - 1
+    return values[max(0, min(len(values) - 1, rank))]
+
+
+def summarize(latencies: List[float], errors: int,
+              elapsed: float) -> Dict[str, Any]:
+    """
+        Latency percentiles in milliseconds and throughput of requests
+        latencies are in seconds
+    """
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {"requests": count,
+            "errors": errors,
+            "throughput_rps": count / elapsed if elapsed else 0.0,
+            "mean_ms": sum(latencies) / count * 1000 if count else 0.0,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "max_ms": latencies[-1] * 1000 if count else 0.0}
+
+
+def get_environment() -> Dict[str, Any]:
+    """
+        Where and on which commit the benchmark was run
+    """
+    try:
+        commit: Optional[str] = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=SRC_DIR, capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()}
+
+
+def write_report(name: str, parameters: Dict[str, Any],
+                 results: Dict[str, Any], output: Optional[str]) -> None:
+    """
+        Write report as JSON to output file or to stdout
+    """
+    report = {"benchmark": name,
+              "environment": get_environment(),
+              "parameters": parameters,
+              "results": results}
+    if output:
+        with open(output, "w") as fp:
+            json.dump(report, fp, indent=2)
+            fp.write("\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """
+        Lines with change of every numeric result of two reports
+    """
+    lines = []
+
+    def walk(old_value, new_value, path):
+        if isinstance(new_value, dict):
+            for key in new_value:
+                if isinstance(old_value, dict) and key in old_value:
+                    walk(old_value[key], new_value[key], path + [key])
+        elif isinstance(new_value, (int, float)) and \
+                isinstance(old_value, (int, float)) and \
+                not isinstance(new_value, bool):
+            change = (new_value - old_value) / old_value * 100 \
+                if old_value else 0.0
+            lines.append("%-50s %12.3f %12.3f %+8.1f%%" % (
+                ".".join(path), old_value, new_value, change))
+
+    walk(old["results"], new["results"], [])
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("old")
+    parser.add_argument("new")
+    args = parser.parse_args()
+
+    with open(args.old) as fp:
+        old = json.load(fp)
+    with open(args.new) as fp:
+        new = json.load(fp)
+    print("%-50s %12s %12s %9s" % ("result", "old", "new", "change"))
+    for line in compare(old, new):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from settings import YTM_MAX_ITERATIONS
+from settings import YTM_TOLERANCE
+from bonds_api.valuation import get_numbers_of_payments
+
+# bisection is used where Newton method does not converge, yields
+# per period are searched between these bounds
+YTM_BRACKET = (-0.99, 10.0)
+BISECTION_ITERATIONS = 200
+
+
+def get_periods_per_year(frequency: np.ndarray) -> np.ndarray:
+    """
+        Number of interest payments per year, 0 for unknown frequency
+    """
+    frequency = np.asarray(frequency)
+    return np.select([frequency == "D", frequency == "W",
+                      frequency == "M", frequency == "Y"],
+                     [365.0, 52.0, 12.0, 1.0], 0.0)
+
+
+def get_remaining_payments(portfolio: Dict[str, np.ndarray],
+                           as_of: np.datetime64) -> np.ndarray:
+    """
+        Number of payments of bonds after as_of date
+    """
+    purchase_date = portfolio["purchase_date"]
+    total = get_numbers_of_payments(purchase_date,
+                                    portfolio["maturity_date"],
+                                    portfolio["frequency"])
+    elapsed = get_numbers_of_payments(purchase_date,
+                                      np.maximum(purchase_date, as_of),
+                                      portfolio["frequency"])
+    return np.clip(total - elapsed, 0, None)
+
+
+def price(coupon: np.ndarray, principal: np.ndarray, periods: np.ndarray,
+          rate: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+        Present value of bonds paying coupon at the end of each of periods
+        and principal with the last coupon, discounted by rate per period
+        Return present values and sums of period * discounted cash flow
+    """
+    periods = periods.astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        log_discount = -periods * np.log1p(rate)
+        discount = np.exp(log_discount)
+        # sum of discount factors of coupons, stable for small rates
+        annuity = np.where(rate == 0, periods, -np.expm1(log_discount) / rate)
+        # sum of period * discount factor of coupons
+        small = np.abs(rate * periods) < 1e-4
+        weighted_annuity = np.where(
+            small,
+            periods * (periods + 1) / 2 -
+            rate * periods * (periods + 1) * (2 * periods + 1) / 6,
+            ((1 + rate) * annuity - periods * discount) / rate)
+    present_value = coupon * annuity + principal * discount
+    weighted = coupon * weighted_annuity + periods * principal * discount
+    return present_value, weighted
+
+
+def solve_yield(coupon: np.ndarray, principal: np.ndarray,
+                periods: np.ndarray, target: np.ndarray,
+                max_iterations: int = YTM_MAX_ITERATIONS,
+                tolerance: float = YTM_TOLERANCE
+                ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+        Solve rate per period for which present value equals target price
+        Newton method runs on all bonds at once, bonds where it fails are
+        solved by bisection. Return rates and mask of solved bonds.
+    """
+    size = len(target)
+    rate = np.where(target > 0, coupon / np.where(target > 0, target, 1), 0)
+    solved = np.zeros(size, dtype=bool)
+    failed = np.zeros(size, dtype=bool)
+
+    for _ in range(max_iterations):
+        active = ~(solved | failed)
+        if not active.any():
+            break
+        current = rate[active]
+        present_value, weighted = price(coupon[active], principal[active],
+                                        periods[active], current)
+        derivative = -weighted / (1 + current)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = (present_value - target[active]) / derivative
+        new_rate = current - step
+
+        bad = ~np.isfinite(new_rate) | (new_rate <= -1)
+        done = ~bad & (np.abs(step) <= tolerance * (1 + np.abs(new_rate)))
+        rate[active] = np.where(bad, current, new_rate)
+        solved[np.flatnonzero(active)[done]] = True
+        failed[np.flatnonzero(active)[bad]] = True
+
+    # Newton method diverged or did not converge in time
+    rest = np.flatnonzero(~solved)
+    if len(rest):
+        rate[rest], solved[rest] = bisect_yield(
+            coupon[rest], principal[rest], periods[rest], target[rest])
+    return rate, solved
+
+
+def bisect_yield(coupon: np.ndarray, principal: np.ndarray,
+                 periods: np.ndarray, target: np.ndarray
+                 ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+        Vectorized bisection of present value == target over YTM_BRACKET
+        Present value must be decreasing in rate (positive cash flows)
+    """
+    low = np.full(len(target), YTM_BRACKET[0])
+    high = np.full(len(target), YTM_BRACKET[1])
+    value_low, _ = price(coupon, principal, periods, low)
+    value_high, _ = price(coupon, principal, periods, high)
+    bracketed = (value_low >= target) & (value_high <= target)
+
+    for _ in range(BISECTION_ITERATIONS):
+        middle = (low + high) / 2
+        value, _ = price(coupon, principal, periods, middle)
+        above = value > target
+        low = np.where(above, middle, low)
+        high = np.where(above, high, middle)
+    return (low + high) / 2, bracketed
+
+
+def analyze_portfolio(portfolio: Dict[str, np.ndarray], discount_rate: float,
+                      prices: Optional[np.ndarray],
+                      as_of: np.datetime64) -> Dict[str, np.ndarray]:
+    """
+        Present value, duration and yield to maturity of all bonds
+        discount_rate and yields are annual rates in percent compounded
+        with frequency of bond, prices default to value of bond
+        Bonds which can not be analyzed have error message set
+    """
+    value = portfolio["value"]
+    coupon = value * portfolio["interest"] / 100
+    periods_per_year = get_periods_per_year(portfolio["frequency"])
+    periods = get_remaining_payments(portfolio, as_of)
+    if prices is None:
+        prices = value
+    prices = np.asarray(prices, dtype=np.float64)
+
+    error = np.full(len(value), None, dtype=object)
+    error[prices <= 0] = "Price must be greater than 0"
+    error[periods == 0] = "Bond has no remaining payments"
+    error[periods_per_year == 0] = "Unknown interest payment frequency"
+    valid = error == None  # noqa: E711
+
+    safe_periods_per_year = np.where(valid, periods_per_year, 1.0)
+    rate = discount_rate / 100 / safe_periods_per_year
+    present_value, weighted = price(coupon, value, periods, rate)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        duration = weighted / present_value / safe_periods_per_year
+    modified_duration = duration / (1 + rate)
+
+    ytm = np.full(len(value), np.nan)
+    index = np.flatnonzero(valid)
+    rates, solved = solve_yield(coupon[index], value[index], periods[index],
+                                prices[index])
+    ytm[index] = rates * periods_per_year[index] * 100
+    unsolved = index[~solved]
+    ytm[unsolved] = np.nan
+    error[unsolved] = "Yield to maturity not found"
+
+    invalid = ~valid
+    present_value[invalid] = np.nan
+    duration[invalid] = np.nan
+    modified_duration[invalid] = np.nan
+    return {"present_value": present_value,
+            "duration": duration,
+            "modified_duration": modified_duration,
+            "ytm": ytm,
+            "error": error}
+
+
+def to_results(isin_list: List[str],
+               analytics: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """
+        Convert analytics arrays to list of dicts, NaN to None
+    """
+    columns = {key: [None if val != val else val for val in array.tolist()]
+               for key, array in analytics.items()}
+    return [{"isin": isin, **{key: column[i]
+                              for key, column in columns.items()}}
+            for i, isin in enumerate(isin_list)]
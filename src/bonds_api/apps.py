@@ -7,3 +7,8 @@ from django.apps import AppConfig
 class BondsApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "bonds_api"
+
+    def ready(self):
+        # receivers of signals of bonds
+        from bonds_api import response_cache  # noqa: F401
+        from bonds_api import versions  # noqa: F401
@@ -0,0 +1,106 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import asyncio
+
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.request import Request
+from rest_framework import status
+from django.http import HttpRequest
+from bonds_api.models import Bond
+from bonds_api.bond_views import BondListApiView
+from bonds_api.bond_views import BondDetailApiView
+from bonds_api.utils import avalidate_isin
+from bonds_api.utils import check_attributes
+from bonds_api.utils import check_permisions
+from settings import ISIN_VALIDATION_MODE
+
+
+class AsyncAPIView(APIView):
+    """
+        APIView whose handlers may be coroutines
+        Served by ASGI, request waiting for CDCP does not hold any thread.
+        Authentication and sync handlers run through sync_to_async, so
+        ORM is never touched from event loop. Under WSGI Django runs
+        the view in its own event loop
+    """
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(*args, **kwargs):
+            return await view(*args, **kwargs)
+        # keeps csrf_exempt and class of view
+        return update_wrapper(async_view, view)
+
+    async def dispatch(self, request: HttpRequest, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # authentication, permissions and throttling query database
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(),
+                                  self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args,
+                                                        **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args,
+                                               **kwargs)
+        return self.response
+
+
+class AsyncBondListApiView(AsyncAPIView, BondListApiView):
+
+    async def post(self, request: Request) -> Response:
+        """
+        Create the Bond with given json data
+        ISIN is validated against CDCP without blocking thread
+        ---
+        Params and Return viz post method of BondListApiView
+        """
+        data = check_attributes(request.data, check_isin=False)
+        if ISIN_VALIDATION_MODE == "deferred":
+            return await sync_to_async(self.defer)(request, data)
+        await avalidate_isin(data["isin"])
+        return await sync_to_async(self.create)(request, data)
+
+
+class AsyncBondDetailApiView(AsyncAPIView, BondDetailApiView):
+
+    async def patch(self, request: Request, bond_id: str) -> Response:
+        """
+        Methods updates some parameters of bond with given isin
+        New ISIN is validated against CDCP without blocking thread
+        ---
+        Params and Return viz patch method of BondDetailApiView
+        """
+        bond = await sync_to_async(
+            Bond.objects.filter(user=request.user.id, isin=bond_id).first)()
+        if not bond:
+            return Response("Bond not found", status=status.HTTP_404_NOT_FOUND)
+
+        check_permisions(request.user, bond.user_id)
+
+        data = check_attributes(request.data, bond, True, check_isin=False)
+        if "isin" in data:
+            await avalidate_isin(data["isin"])
+        return await sync_to_async(self.update)(bond, data)
@@ -5,11 +5,30 @@ from django.urls import path
 from bonds_api.bond_views import BondListApiView
 from bonds_api.bond_views import BondDetailApiView
 from bonds_api.bond_views import UserDetailApiView
+from bonds_api.bond_views import BondBulkApiView
+from bonds_api.bond_views import BondExportApiView
+from bonds_api.bond_views import BondCashflowApiView
+from bonds_api.bond_views import PortfolioCashflowApiView
+from bonds_api.bond_views import BondAnalyticsApiView
+from bonds_api.async_views import AsyncBondListApiView
+from bonds_api.async_views import AsyncBondDetailApiView
 
 urlpatterns = [
     path("api", BondListApiView.as_view(), name="bond-list"),
+    path("bulk/api", BondBulkApiView.as_view(), name="bond-bulk"),
+    path("export/<str:export_format>/api", BondExportApiView.as_view(),
+         name="bond-export"),
     path("detail/<str:bond_id>/api", BondDetailApiView.as_view(),
          name="bond-detail"),
+    path("detail/<str:bond_id>/cashflows/api",
+         BondCashflowApiView.as_view(), name="bond-cashflows"),
+    path("cashflows/api", PortfolioCashflowApiView.as_view(),
+         name="portfolio-cashflows"),
+    path("analytics/api", BondAnalyticsApiView.as_view(),
+         name="bond-analytics"),
+    path("async/api", AsyncBondListApiView.as_view(), name="bond-list-async"),
+    path("async/detail/<str:bond_id>/api", AsyncBondDetailApiView.as_view(),
+         name="bond-detail-async"),
     path("user/<int:user_id>/api", UserDetailApiView.as_view(),
          name="bond-user-detail"),
 ]
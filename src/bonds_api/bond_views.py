@@ -1,17 +1,57 @@
 #!python3
 # -*- codding: utf-8 -*-
 
+from collections import defaultdict
+from copy import copy
+from datetime import datetime
+from datetime import timezone
+from typing import Any, Dict, Iterable, List
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.request import Request
 from rest_framework import status
 from rest_framework import permissions
+from django.db import IntegrityError
+from django.http import StreamingHttpResponse
+from django.db import transaction
 from bonds_api.models import Bond
+from bonds_api.models import PortfolioSummary
+from bonds_api.summary import rebuild_summary
+from bonds_api.summary import get_counted_bonds
+from bonds_api.summary import update_summary
 from bonds_api.serializers import BondSerializer
+from bonds_api.serializers import serialize_bond_values
+from bonds_api.pagination import BondCursorPagination
+from bonds_api.importer import build_bond
+from bonds_api.isin_cache import get_isin_cache
+from bonds_api.profiling import timed
+from bonds_api.response_cache import cached
+from bonds_api.export import EXPORT_FORMATS
+from bonds_api.export import ExportContentNegotiation
+from bonds_api.export import iter_export
+from bonds_api.utils import InvalidAttributeException
+from bonds_api.utils import PermissionDeniedException
 from bonds_api.utils import check_attributes
 from bonds_api.utils import check_permisions
-from bonds_api.utils import get_number_of_payments
+from bonds_api.utils import validate_isins
+from bonds_api.utils import parse_datetime_param
+from bonds_api.utils import parse_limit_param
+from bonds_api.utils import parse_fields_param
+from bonds_api.cashflows import CASHFLOW_FIELDS
+from bonds_api.cashflows import get_cashflow_page
+from bonds_api.cashflows import iter_cashflows
+from bonds_api.cashflows import merge_cashflows
+from bonds_api.analytics import analyze_portfolio
+from bonds_api.analytics import to_results
+from bonds_api.valuation import load_portfolio
+from bonds_api.valuation import to_datetime64
+from bonds_api.versions import conditional
+from rest_framework.utils.urls import replace_query_param
+from settings import BULK_MAX_SIZE
+from settings import ISIN_VALIDATION_MODE
+from settings import CASHFLOW_PAGE_SIZE
+from settings import CASHFLOW_MAX_PAGE_SIZE
 
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
@@ -24,29 +64,72 @@ schema_view = get_schema_view(openapi.Info(
    public=True,
    permission_classes=(permissions.AllowAny,),)
 
+def apply_changes(bond: Bond, data: Dict[str, Any]) -> List[str]:
+    """
+        Set checked attributes which differ from bond
+        Return names of changed fields
+    """
+    attribute_list = Bond.get_attributes(Bond)
+    if any(key not in attribute_list for key in data):
+        raise InvalidAttributeException("Invalid attribute")
+
+    update_fields = []
+    for key, value in data.items():
+        if getattr(bond, key) != value:
+            setattr(bond, key, value)
+            update_fields.append(key)
+    return update_fields
+
+
+def group_by_owner(bonds: Iterable[Bond]) -> Dict[int, List[Bond]]:
+    owners: Dict[int, List[Bond]] = defaultdict(list)
+    for bond in bonds:
+        owners[bond.user_id].append(bond)
+    return owners
+
+
 class BondListApiView(APIView):
 
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional
+    @cached
     def get(self, request: Request) -> Response:
         """
-        List all the bonds items for loged user
+        List the bonds items for loged user ordered by maturity date
+        Bonds rejected by deferred validation are listed with their
+        validation status until user deletes them
         ---
         Params:
-            None
+                str cursor              - cursor of page from next or
+                                          previous link
+                int page_size           - number of bonds on page
+                str fields              - comma separated fields of bonds,
+                                          all by default
         Return:
             {
-                list [
-                    sturuct bond_data   - bond information viz post method
-                ]
+                sturuct {
+                    str next            - link to next page or null
+                    str previous        - link to previous page or null
+                    list results [
+                        sturuct bond_data - bond information viz post method
+                    ]
+                }
                 status_code             - status code
                 status                  - status message
             }
         """
-        bond_list = Bond.objects.filter(user=request.user.id)
-        serializer = BondSerializer(bond_list, many=True)
-
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        fields = parse_fields_param(request.query_params.get("fields"),
+                                    BondSerializer.Meta.fields)
+        # position of cursor is read from rows
+        bond_list = Bond.objects.filter(user=request.user.id) \
+            .values(*dict.fromkeys(["id", "maturity_date", *fields]))
+        paginator = BondCursorPagination()
+        page = paginator.paginate_queryset(bond_list, request, view=self)
+
+        with timed("serialize"):
+            data = serialize_bond_values(page, fields)
+        return paginator.get_paginated_response(data)
 
     def post(self, request: Request) -> Response:
         """
@@ -71,6 +154,9 @@ class BondListApiView(APIView):
                 sturuct bond_data       - data of new bond
                 status_code             - status code
                                           201 - bond created
+                                          202 - bond created, ISIN is
+                                                validated later (deferred
+                                                mode), viz validation_status
                                           400 - bad request mor info in status
                                                 message
                 status                  - status message
@@ -87,9 +173,27 @@ class BondListApiView(APIView):
              "interest_payment_frequency": "Yearly"}
 
         """
+        if ISIN_VALIDATION_MODE == "deferred":
+            return self.defer(request, check_attributes(request.data,
+                                                        check_isin=False))
+        return self.create(request, check_attributes(request.data))
 
-        data = check_attributes(request.data)
+    def defer(self, request: Request, data: Dict[str, Any]) -> Response:
+        """
+            Save bond without waiting for CDCP
+            Cached result of ISIN is used right away, otherwise bond
+            is pending until validate_bonds command validates it
+        """
+        valid = get_isin_cache().get(data["isin"])
+        if valid is False:
+            raise InvalidAttributeException("Invalid ISIN code")
+        return self.create(request, data, pending=valid is None)
 
+    def create(self, request: Request, data: Dict[str, Any],
+               pending: bool = False) -> Response:
+        """
+            Save bond of checked attributes
+        """
         data = {"emmision_name": data["emmision_name"],
                 "isin": data["isin"],
                 "value": data["value"],
@@ -97,12 +201,20 @@ class BondListApiView(APIView):
                 "purchase_date": data["purchase_date"],
                 "maturity_date": data["maturity_date"],
                 "interest_payment_frequency": data["interest_frequency"],
-                "user": request.user.id
                 }
         serializer = BondSerializer(data=data)
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            with transaction.atomic():
+                if pending:
+                    bond = serializer.save(
+                        user_id=request.user.id,
+                        validation_status=Bond.ValidationStatus.PENDING)
+                else:
+                    bond = serializer.save(user_id=request.user.id)
+                update_summary(bond.user_id, added=[bond])
+            return Response(serializer.data,
+                            status=status.HTTP_202_ACCEPTED if pending
+                            else status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -111,12 +223,15 @@ class BondDetailApiView(APIView):
 
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional
     def get(self, request: Request, bond_id: str) -> Response:
         """
         Methods return just one bond with given isin
         ---
         Params:
                 str isin                - ISIN
+                str fields              - comma separated fields of bond,
+                                          all by default
         Return:
             {
                 sturuct bond_data       - data of new bond
@@ -128,15 +243,18 @@ class BondDetailApiView(APIView):
             }
 
         """
-        bond = Bond.objects.filter(user=request.user.id,
-                                   isin=bond_id).first()
+        fields = parse_fields_param(request.query_params.get("fields"),
+                                    BondSerializer.Meta.fields)
+        bond = Bond.objects.filter(user=request.user.id, isin=bond_id) \
+            .values(*dict.fromkeys(["user", *fields])).first()
 
         if not bond:
             return Response("Bond not found", status=status.HTTP_404_NOT_FOUND)
-        check_permisions(request.user, bond.user.id)
+        check_permisions(request.user, bond["user"])
 
-        serializer = BondSerializer(bond, many=False)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        with timed("serialize"):
+            data = serialize_bond_values([bond], fields)[0]
+        return Response(data, status=status.HTTP_200_OK)
 
     def patch(self, request: Request, bond_id: str) -> Response:
         """
@@ -170,22 +288,26 @@ class BondDetailApiView(APIView):
         if not bond:
             return Response("Bond not found", status=status.HTTP_404_NOT_FOUND)
 
-        check_permisions(request.user, bond.user.id)
-
-        attribute_list = Bond.get_attributes(Bond)
+        check_permisions(request.user, bond.user_id)
 
-        data = check_attributes(request.data, bond, True)
+        return self.update(bond, check_attributes(request.data, bond, True))
 
-        for key, value in data.items():
-            if key in attribute_list:
-                setattr(bond, key, value)
-            else:
-                return Response("Invalid attribute",
-                                status=status.HTTP_400_BAD_REQUEST)
-
-        bond.save()
-        serializer = BondSerializer(bond, many=False)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    def update(self, bond: Bond, data: Dict[str, Any]) -> Response:
+        """
+            Save checked attributes which differ from bond
+        """
+        old_bond = copy(bond)
+        update_fields = apply_changes(bond, data)
+
+        # write just changed columns
+        if update_fields:
+            with transaction.atomic():
+                bond.save(update_fields=update_fields)
+                update_summary(bond.user_id, added=[bond],
+                               removed=[old_bond])
+        with timed("serialize"):
+            data = BondSerializer(bond, many=False).data
+        return Response(data, status=status.HTTP_200_OK)
 
     def delete(self, request: Request, bond_id: str) -> Response:
         """
@@ -206,8 +328,11 @@ class BondDetailApiView(APIView):
                                    isin=bond_id).first()
         if not bond:
             return Response("Bond not found", status=status.HTTP_404_NOT_FOUND)
-        check_permisions(request.user, bond.user.id)
-        bond.delete()
+        check_permisions(request.user, bond.user_id)
+        with transaction.atomic():
+            old_bond = copy(bond)
+            bond.delete()
+            update_summary(old_bond.user_id, removed=[old_bond])
         return Response("Bond deleted", status=status.HTTP_200_OK)
 
 
@@ -215,9 +340,12 @@ class UserDetailApiView(APIView):
 
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional
+    @cached
     def get(self, request: Request, user_id: int) -> Response:
         """
         Methods some statistics about given user
+        Bonds rejected by deferred validation are not counted
         ---
         Params:
                 int user_id             - user id
@@ -239,34 +367,566 @@ class UserDetailApiView(APIView):
         """
         check_permisions(request.user, user_id)
 
-        bond_list = Bond.objects.filter(user=user_id)
-        if not bond_list:
+        summary = PortfolioSummary.objects.select_related("next_maturity") \
+            .filter(user_id=user_id).first()
+        if summary is None:
+            summary = rebuild_summary(user_id)
+        if not summary.count:
             return Response("User not found", status=status.HTTP_404_NOT_FOUND)
 
-        total_interest = 0
-        total_value = 0
-        future_value = 0
-        next_maturity = None
+        with timed("serialize"):
+            next_maturity = BondSerializer(summary.next_maturity,
+                                           many=False).data
 
-        for bond in bond_list:
-            total_interest += bond.interest
-            total_value += bond.value
-            if next_maturity is None or \
-                    next_maturity.maturity_date > bond.maturity_date:
-                next_maturity = bond
+        data = {"avg_interest": summary.avg_interest,
+                "future_value": summary.future_value,
+                "total_value": summary.total_value,
+                "next_maturity": next_maturity}
 
-            number_of_payments = get_number_of_payments(
-                bond.purchase_date, bond.maturity_date,
-                bond.interest_payment_frequency)
+        return Response(data, status=status.HTTP_200_OK)
 
-            future_value += bond.value * (1.0 + bond.interest / 100) ** \
-                number_of_payments
 
-        serializer = BondSerializer(next_maturity, many=False)
+class BondCashflowApiView(APIView):
 
-        data = {"avg_interest": total_interest / len(bond_list),
-                "future_value": future_value,
-                "total_value": total_value,
-                "next_maturity": serializer.data}
+    permission_classes = [permissions.IsAuthenticated]
 
-        return Response(data, status=status.HTTP_200_OK)
+    def get(self, request: Request, bond_id: str) -> Response:
+        """
+        Methods return coupon payments of bond with given isin
+        ---
+        Params:
+                str isin                - ISIN
+                str from                - first date of payments
+                                          YYYY-MM-DD or YYYY-MM-DDTHH:MM:SSZ
+                str to                  - last date of payments
+                int limit               - number of payments on page
+        Return:
+            {
+                sturuct {
+                    str next            - link to next page or null
+                    list results [
+                        sturuct {
+                            str isin            - ISIN
+                            str date            - date of payment
+                            int number          - number of payment
+                            float coupon        - interest paid
+                            float principal     - principal paid
+                            float amount        - coupon + principal
+                        }
+                    ]
+                }
+                status_code             - status code
+                                          200 - OK
+                                          400 - Bad request
+                                          404 - Not Found
+                status                  - status message
+            }
+        """
+        bond = Bond.objects.filter(user=request.user.id,
+                                   isin=bond_id).first()
+        if not bond:
+            return Response("Bond not found", status=status.HTTP_404_NOT_FOUND)
+        check_permisions(request.user, bond.user_id)
+
+        start = parse_datetime_param(request.query_params.get("from"), "from")
+        end = parse_datetime_param(request.query_params.get("to"), "to")
+        limit = parse_limit_param(request.query_params.get("limit"),
+                                  CASHFLOW_PAGE_SIZE, CASHFLOW_MAX_PAGE_SIZE)
+
+        page, next_cashflow = get_cashflow_page(
+            iter_cashflows(bond, start, end), limit)
+
+        next_link = None
+        if next_cashflow:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), "from",
+                next_cashflow["date"].isoformat())
+        return Response({"next": next_link, "results": page},
+                        status=status.HTTP_200_OK)
+
+
+class PortfolioCashflowApiView(APIView):
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request: Request) -> Response:
+        """
+        Methods return coupon payments of all bonds of loged user
+        ordered by date and ISIN
+        Bonds rejected by deferred validation are skipped
+        ---
+        Params:
+                str from                - first date of payments
+                                          YYYY-MM-DD or YYYY-MM-DDTHH:MM:SSZ
+                str isin                - first ISIN of payments on from
+                                          date, set by next link
+                str to                  - last date of payments
+                int limit               - number of payments on page
+        Return:
+            {
+                sturuct {
+                    str next            - link to next page or null
+                    list results [
+                        sturuct payment - viz get method of
+                                          BondCashflowApiView
+                    ]
+                }
+                status_code             - status code
+                                          200 - OK
+                                          400 - Bad request
+                status                  - status message
+            }
+        """
+        start = parse_datetime_param(request.query_params.get("from"), "from")
+        end = parse_datetime_param(request.query_params.get("to"), "to")
+        limit = parse_limit_param(request.query_params.get("limit"),
+                                  CASHFLOW_PAGE_SIZE, CASHFLOW_MAX_PAGE_SIZE)
+
+        bond_list = get_counted_bonds(request.user.id) \
+            .only(*CASHFLOW_FIELDS)
+        if start is not None:
+            bond_list = bond_list.filter(maturity_date__gte=start)
+        if end is not None:
+            bond_list = bond_list.filter(purchase_date__lte=end)
+
+        page, next_cashflow = get_cashflow_page(
+            merge_cashflows(bond_list, start, end,
+                            request.query_params.get("isin")), limit)
+
+        next_link = None
+        if next_cashflow:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), "from",
+                next_cashflow["date"].isoformat())
+            next_link = replace_query_param(next_link, "isin",
+                                            next_cashflow["isin"])
+        return Response({"next": next_link, "results": page},
+                        status=status.HTTP_200_OK)
+
+
+class BondExportApiView(APIView):
+
+    permission_classes = [permissions.IsAuthenticated]
+    content_negotiation_class = ExportContentNegotiation
+
+    def get(self, request: Request, export_format: str) -> Response:
+        """
+        Stream all bonds of loged user ordered by maturity date
+        ---
+        Params:
+                str export_format       - ndjson or csv
+                str fields              - comma separated fields of bonds,
+                                          all by default
+        Return:
+            {
+                ndjson or csv stream    - bond information viz get method
+                                          of BondListApiView
+                status_code             - status code
+                                          200 - OK
+                                          404 - Unknown format
+                status                  - status message
+            }
+        """
+        if export_format not in EXPORT_FORMATS:
+            return Response("Unknown format", status=status.HTTP_404_NOT_FOUND)
+
+        fields = parse_fields_param(request.query_params.get("fields"),
+                                    BondSerializer.Meta.fields)
+        bond_list = Bond.objects.filter(user=request.user.id) \
+            .order_by("maturity_date", "id")
+        response = StreamingHttpResponse(
+            iter_export(bond_list, export_format, fields),
+            content_type=EXPORT_FORMATS[export_format])
+        response["Content-Disposition"] = \
+            'attachment; filename="bonds.%s"' % export_format
+        return response
+
+
+class BondBulkApiView(APIView):
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request: Request) -> Response:
+        """
+        Create many bonds at once
+        ISINs are validated concurrently, each distinct ISIN just once,
+        valid bonds are created in one transaction
+        ---
+        Params:
+            [
+                sturuct bond_data       - bond information viz post method
+                                          of BondListApiView
+            ]
+        Return:
+            {
+                list [
+                    {
+                        int index       - index of bond in request
+                        str isin        - ISIN
+                        str status      - created or error
+                        sturuct bond    - data of new bond
+                        str error       - reason why bond was not created
+                    }
+                ]
+                status_code             - status code
+                                          201 - all bonds created
+                                          207 - some bonds created
+                                          400 - no bond created
+                                          409 - bond with ISIN was created
+                                                by another request
+                status                  - status message
+            }
+        """
+        self.check_list(request.data)
+
+        results = []
+        bonds = {}
+
+        # check attributes without request to CDCP
+        for index, item in enumerate(request.data):
+            isin = item.get("isin") if isinstance(item, dict) else None
+            result = {"index": index, "isin": isin, "status": "created"}
+            results.append(result)
+            try:
+                bond = build_bond(item, request.user.id)
+                if isin in bonds:
+                    raise InvalidAttributeException(
+                        "Duplicate ISIN in request")
+            except InvalidAttributeException as e:
+                result["error"] = e.message
+            else:
+                bonds[isin] = bond
+
+        # validate each ISIN just once, concurrently
+        existing = set(Bond.objects.filter(isin__in=bonds.keys())
+                       .values_list("isin", flat=True))
+        errors = validate_isins(isin for isin in bonds
+                                if isin not in existing)
+        for result in results:
+            isin = result["isin"]
+            if "error" in result:
+                pass
+            elif isin in existing:
+                result["error"] = "Bond with this ISIN already exists"
+            elif errors[isin]:
+                result["error"] = errors[isin]
+
+        valid = []
+        for result in results:
+            if "error" in result:
+                result["status"] = "error"
+            else:
+                valid.append(result)
+
+        try:
+            with transaction.atomic():
+                created = Bond.objects.bulk_create(
+                    [bonds[result["isin"]] for result in valid])
+                if created:
+                    update_summary(request.user.id, added=created)
+        except IntegrityError:
+            return Response("Bond with ISIN was created by another request",
+                            status=status.HTTP_409_CONFLICT)
+
+        with timed("serialize"):
+            bond_data_list = BondSerializer(created, many=True).data
+        for result, bond_data in zip(valid, bond_data_list):
+            result["bond"] = bond_data
+
+        return Response(results, status=self.get_status(
+            results, valid, status.HTTP_201_CREATED))
+
+    def patch(self, request: Request) -> Response:
+        """
+        Update many bonds at once
+        Bonds are loaded by one query, permissions are checked once
+        per owner, changed bonds are saved in one transaction
+        ---
+        Params:
+            [
+                sturuct {
+                    str isin            - ISIN of bond
+                    ...                 - changed attributes viz patch
+                                          method of BondDetailApiView
+                }
+            ]
+        Return:
+            {
+                list [
+                    {
+                        int index       - index of bond in request
+                        str isin        - ISIN
+                        str status      - updated or error
+                        sturuct bond    - data of updated bond
+                        str error       - reason why bond was not updated
+                    }
+                ]
+                status_code             - status code
+                                          200 - all bonds updated
+                                          207 - some bonds updated
+                                          400 - no bond updated
+                status                  - status message
+            }
+        """
+        self.check_list(request.data)
+
+        results = []
+        changes = {}
+        for index, item in enumerate(request.data):
+            isin = item.get("isin") if isinstance(item, dict) else None
+            result = {"index": index, "isin": isin, "status": "updated"}
+            results.append(result)
+            if not isinstance(isin, str):
+                result["error"] = "Bond data with ISIN expected"
+            elif isin in changes:
+                result["error"] = "Duplicate ISIN in request"
+            else:
+                changes[isin] = {key: value for key, value in item.items()
+                                 if key != "isin"}
+
+        bonds = self.load_bonds(request, results)
+
+        valid = []
+        changed = []
+        old_bonds = []
+        update_fields = set()
+        for result in results:
+            if "error" in result:
+                continue
+            bond = bonds[result["isin"]]
+            try:
+                data = check_attributes(changes[result["isin"]], bond, True)
+                old_bond = copy(bond)
+                fields = apply_changes(bond, data)
+            except InvalidAttributeException as e:
+                result["error"] = e.message
+            except (TypeError, AttributeError):
+                result["error"] = "Invalid or missing attribute"
+            else:
+                valid.append(result)
+                if fields:
+                    changed.append(bond)
+                    old_bonds.append(old_bond)
+                    update_fields.update(fields)
+
+        for result in results:
+            if "error" in result:
+                result["status"] = "error"
+
+        # write just changed columns of changed bonds
+        if changed:
+            old_owners = group_by_owner(old_bonds)
+            with transaction.atomic():
+                Bond.objects.bulk_update(changed, sorted(update_fields))
+                for user_id, user_bonds in group_by_owner(changed).items():
+                    update_summary(user_id, added=user_bonds,
+                                   removed=old_owners[user_id])
+
+        with timed("serialize"):
+            bond_data_list = BondSerializer(
+                [bonds[result["isin"]] for result in valid], many=True).data
+        for result, bond_data in zip(valid, bond_data_list):
+            result["bond"] = bond_data
+
+        return Response(results, status=self.get_status(
+            results, valid, status.HTTP_200_OK))
+
+    def delete(self, request: Request) -> Response:
+        """
+        Delete many bonds at once
+        Bonds are loaded by one query, permissions are checked once
+        per owner, bonds are deleted by one statement
+        ---
+        Params:
+            [
+                str isin                - ISIN of bond
+            ]
+        Return:
+            {
+                list [
+                    {
+                        int index       - index of ISIN in request
+                        str isin        - ISIN
+                        str status      - deleted or error
+                        str error       - reason why bond was not deleted
+                    }
+                ]
+                status_code             - status code
+                                          200 - all bonds deleted
+                                          207 - some bonds deleted
+                                          400 - no bond deleted
+                status                  - status message
+            }
+        """
+        self.check_list(request.data)
+
+        results = []
+        isins = set()
+        for index, isin in enumerate(request.data):
+            result = {"index": index, "isin": isin, "status": "deleted"}
+            results.append(result)
+            if not isinstance(isin, str):
+                result["isin"] = None
+                result["error"] = "ISIN expected"
+            elif isin in isins:
+                result["error"] = "Duplicate ISIN in request"
+            isins.add(result["isin"])
+
+        bonds = self.load_bonds(request, results)
+
+        valid = []
+        for result in results:
+            if "error" in result:
+                result["status"] = "error"
+            else:
+                valid.append(result)
+
+        deleted = [bonds[result["isin"]] for result in valid]
+        if deleted:
+            with transaction.atomic():
+                Bond.objects.filter(id__in=[bond.id for bond in deleted]) \
+                    .delete()
+                for user_id, user_bonds in group_by_owner(deleted).items():
+                    update_summary(user_id, removed=user_bonds)
+
+        return Response(results, status=self.get_status(
+            results, valid, status.HTTP_200_OK))
+
+    @staticmethod
+    def check_list(data: Any) -> None:
+        if not isinstance(data, list):
+            raise InvalidAttributeException("List of bonds expected")
+        if len(data) > BULK_MAX_SIZE:
+            raise InvalidAttributeException(
+                "Too many bonds, maximum is %s" % BULK_MAX_SIZE)
+
+    @staticmethod
+    def load_bonds(request: Request,
+                   results: List[Dict[str, Any]]) -> Dict[str, Bond]:
+        """
+            Load bonds of results without error by one query
+            Error is set to results whose bond is missing or belongs
+            to user without permission, permissions are checked once
+            per owner
+        """
+        bonds = {bond.isin: bond for bond in Bond.objects.filter(
+            isin__in=[result["isin"] for result in results
+                      if "error" not in result])}
+
+        permitted: Dict[int, bool] = {}
+        for user_id in group_by_owner(bonds.values()):
+            try:
+                check_permisions(request.user, user_id)
+                permitted[user_id] = True
+            except PermissionDeniedException:
+                permitted[user_id] = False
+
+        for result in results:
+            if "error" in result:
+                continue
+            bond = bonds.get(result["isin"])
+            if bond is None:
+                result["error"] = "Bond not found"
+            elif not permitted[bond.user_id]:
+                result["error"] = "Permission denied"
+        return bonds
+
+    @staticmethod
+    def get_status(results: List[Dict[str, Any]],
+                   valid: List[Dict[str, Any]], success: int) -> int:
+        if len(valid) == len(results):
+            return success
+        elif valid:
+            return status.HTTP_207_MULTI_STATUS
+        return status.HTTP_400_BAD_REQUEST
+
+
+class BondAnalyticsApiView(APIView):
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request: Request) -> Response:
+        """
+        Price all bonds of loged user against market discount rate
+        and solve yield to maturity from prices
+        Rates are annual in percent, compounded with interest payment
+        frequency of bond, remaining payments are counted from as_of
+        Bonds rejected by deferred validation are skipped
+        ---
+        Params:
+            {
+                float discount_rate     - market discount rate
+                dict prices             - price of bond by ISIN,
+                                          value of bond by default
+                str as_of               - date of pricing, now by default
+                                          YYYY-MM-DD or YYYY-MM-DDTHH:MM:SSZ
+            }
+        Return:
+            {
+                sturuct {
+                    float total_present_value - present value of priced bonds
+                    float duration      - present value weighted Macaulay
+                                          duration of priced bonds in years
+                    list results [
+                        sturuct {
+                            str isin            - ISIN
+                            float present_value - present value at
+                                                  discount rate
+                            float duration      - Macaulay duration in years
+                            float modified_duration - modified duration
+                            float ytm           - yield to maturity of price
+                            str error           - why bond was not priced
+                        }
+                    ]
+                }
+                status_code             - status code
+                                          200 - OK
+                                          400 - Bad request
+                status                  - status message
+            }
+        """
+        data = request.data
+        if not isinstance(data, dict):
+            return Response("Analytics parameters expected",
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            discount_rate = float(data["discount_rate"])
+        except (KeyError, TypeError, ValueError):
+            return Response("Invalid or missing discount_rate",
+                            status=status.HTTP_400_BAD_REQUEST)
+        if discount_rate <= -100:
+            return Response("Invalid discount_rate",
+                            status=status.HTTP_400_BAD_REQUEST)
+        prices = data.get("prices") or {}
+        if not isinstance(prices, dict):
+            return Response("Prices must be object of ISIN: price",
+                            status=status.HTTP_400_BAD_REQUEST)
+        as_of = parse_datetime_param(data.get("as_of"), "as_of") or \
+            datetime.now(timezone.utc)
+
+        portfolio = load_portfolio(
+            get_counted_bonds(request.user.id)
+            .order_by("maturity_date", "id"), extra_fields=["isin"])
+        isin_list = portfolio["isin"].tolist()
+        try:
+            price_list = [float(prices.get(isin, value)) for isin, value
+                          in zip(isin_list, portfolio["value"].tolist())]
+        except (TypeError, ValueError):
+            return Response("Invalid price",
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        analytics = analyze_portfolio(portfolio, discount_rate,
+                                      price_list, to_datetime64([as_of])[0])
+
+        priced = analytics["error"] == None  # noqa: E711
+        present_value = analytics["present_value"][priced]
+        total_present_value = float(present_value.sum())
+        duration = None
+        if total_present_value:
+            duration = float((present_value *
+                              analytics["duration"][priced]).sum() /
+                             total_present_value)
+        return Response({"total_present_value": total_present_value,
+                         "duration": duration,
+                         "results": to_results(isin_list, analytics)},
+                        status=status.HTTP_200_OK)
@@ -0,0 +1,122 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import calendar
+import heapq
+
+from datetime import datetime
+from datetime import timedelta
+from itertools import dropwhile
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bonds_api.models import Bond
+from bonds_api.utils import get_number_of_payments
+
+CASHFLOW_FIELDS = ["isin", "purchase_date", "maturity_date", "value",
+                   "interest", "interest_payment_frequency"]
+
+
+def add_periods(date: datetime, frequency: str, count: int) -> datetime:
+    """
+        Move date by count periods of interest payment frequency
+        Day of month is clamped to the end of shorter months
+    """
+    if frequency == "D":
+        return date + timedelta(days=count)
+    if frequency == "W":
+        return date + timedelta(weeks=count)
+    if frequency == "Y":
+        count *= 12
+    month = date.month - 1 + count
+    year = date.year + month // 12
+    month = month % 12 + 1
+    day = min(date.day, calendar.monthrange(year, month)[1])
+    return date.replace(year=year, month=month, day=day)
+
+
+def iter_cashflows(bond: Bond, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+    """
+        Generate coupon payments of bond in date order
+        Payment k is k periods after purchase date, the last one is paid
+        at maturity date together with principal. Only payments between
+        start and end (both inclusive) are generated
+        Bond without whole period pays just principal at maturity
+    """
+    frequency = bond.interest_payment_frequency
+    number_of_payments = get_number_of_payments(
+        bond.purchase_date, bond.maturity_date, frequency)
+    coupon = bond.value * bond.interest / 100
+
+    if number_of_payments <= 0:
+        # no whole period, just principal is paid back
+        if (start is None or bond.maturity_date >= start) and \
+                (end is None or bond.maturity_date <= end):
+            yield {"isin": bond.isin,
+                   "date": bond.maturity_date,
+                   "number": 0,
+                   "coupon": 0.0,
+                   "principal": bond.value,
+                   "amount": bond.value}
+        return
+
+    first = 1
+    if start is not None and start > bond.purchase_date:
+        # jump close to start instead of generating skipped payments
+        first = max(1, get_number_of_payments(bond.purchase_date, start,
+                                               frequency))
+        while first > 1 and \
+                add_periods(bond.purchase_date, frequency, first - 1) >= start:
+            first -= 1
+
+    for number in range(first, number_of_payments + 1):
+        if number == number_of_payments:
+            date = bond.maturity_date
+            principal = bond.value
+        else:
+            date = min(add_periods(bond.purchase_date, frequency, number),
+                       bond.maturity_date)
+            principal = 0.0
+        if start is not None and date < start:
+            continue
+        if end is not None and date > end:
+            return
+        yield {"isin": bond.isin,
+               "date": date,
+               "number": number,
+               "coupon": coupon,
+               "principal": principal,
+               "amount": coupon + principal}
+
+
+def merge_cashflows(bonds: Iterable[Bond], start: Optional[datetime] = None,
+                    end: Optional[datetime] = None,
+                    start_isin: Optional[str] = None
+                    ) -> Iterator[Dict[str, Any]]:
+    """
+        Merge payments of all bonds lazily in (date, isin) order
+        Payments at start date of bonds with ISIN lower than start_isin
+        are skipped, so iteration can be resumed after any payment
+    """
+    merged = heapq.merge(*(iter_cashflows(bond, start, end)
+                           for bond in bonds),
+                         key=lambda cashflow: (cashflow["date"],
+                                               cashflow["isin"]))
+    if start is None or start_isin is None:
+        return merged
+    return dropwhile(lambda cashflow: cashflow["date"] == start and
+                     cashflow["isin"] < start_isin, merged)
+
+
+def get_cashflow_page(cashflows: Iterator[Dict[str, Any]], limit: int
+                      ) -> Tuple[List[Dict[str, Any]],
+                                 Optional[Dict[str, Any]]]:
+    """
+        Take limit payments from iterator
+        Return them with the first payment of next page (or None)
+    """
+    page = list(islice(cashflows, limit + 1))
+    if len(page) > limit:
+        return page[:limit], page[limit]
+    return page, None
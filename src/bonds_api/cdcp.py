@@ -0,0 +1,451 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import asyncio
+import random
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from weakref import WeakKeyDictionary
+
+import requests
+from asgiref.sync import sync_to_async
+from requests.adapters import HTTPAdapter
+
+from settings import CDCP_URL
+from settings import CDCP_CONNECT_TIMEOUT
+from settings import CDCP_READ_TIMEOUT
+from settings import CDCP_POOL_SIZE
+from settings import CDCP_ASYNC_MAX_CONNECTIONS
+from settings import CDCP_MAX_RETRIES
+from settings import CDCP_RETRY_BACKOFF
+from settings import CDCP_RETRY_BACKOFF_MAX
+from settings import CDCP_BREAKER_WINDOW
+from settings import CDCP_BREAKER_MIN_CALLS
+from settings import CDCP_BREAKER_ERROR_RATE
+from settings import CDCP_BREAKER_RESET_TIMEOUT
+from settings import CDCP_COALESCE_MAX_KEYS
+from settings import CDCP_COALESCE_TIMEOUT
+from bonds_api.profiling import timed
+from bonds_api.metrics import record_cdcp_coalesced
+from bonds_api.metrics import record_cdcp_rejected
+from bonds_api.metrics import record_cdcp_request
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CDCPUnavailableException(Exception):
+    """
+        Custom exception for CDCP which is not able to answer
+    """
+    def __init__(self, message="CDCP is unavailable", *args, **kwargs):
+        self.message = message
+        super().__init__(message, *args, **kwargs)
+
+
+class CircuitBreaker:
+    """
+        Circuit breaker over sliding window of last calls
+        Circuit opens when error rate in window crosses the threshold,
+        after reset timeout one trial call is allowed (half open state)
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, window: int = CDCP_BREAKER_WINDOW,
+                 min_calls: int = CDCP_BREAKER_MIN_CALLS,
+                 error_rate: float = CDCP_BREAKER_ERROR_RATE,
+                 reset_timeout: float = CDCP_BREAKER_RESET_TIMEOUT):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.reset_timeout = reset_timeout
+        self._results: deque = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and \
+                    time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """
+            Return True if call to upstream may be done
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and \
+                    time.monotonic() - self._opened_at >= self.reset_timeout:
+                # let just one trial call through
+                self._state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._results.clear()
+            self._results.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._results.append(False)
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            failures = self._results.count(False)
+            if len(self._results) >= self.min_calls and \
+                    failures / len(self._results) >= self.error_rate:
+                self._open()
+
+    def _open(self) -> None:
+        logger.warning("CDCP circuit breaker opened")
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+
+
+class Flight:
+    """
+        Lookup in flight, waiters are woken up by done event
+    """
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[Exception] = None
+
+
+class SingleFlight:
+    """
+        Coalescing of concurrent lookups of the same key
+        The first caller calls function, callers which come while it is
+        in flight wait for its result instead of calling it again. Number
+        of keys in flight is bounded by max_keys, further keys are looked
+        up without coalescing. Waiters give up after timeout with
+        CDCPUnavailableException. Threads and coroutines of one event
+        loop are coalesced separately
+    """
+    def __init__(self, max_keys: int = CDCP_COALESCE_MAX_KEYS,
+                 timeout: float = CDCP_COALESCE_TIMEOUT):
+        self.max_keys = max_keys
+        self.timeout = timeout
+        self.saved = 0
+        self._flights: Dict[str, Flight] = {}
+        # futures are bound to event loop
+        self._futures: WeakKeyDictionary = WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def do(self, key: str, function: Callable, *args) -> Any:
+        """
+            Return result of function(*args) called once for concurrent
+            callers of the same key
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None and len(self._flights) < self.max_keys
+            if leader:
+                flight = self._flights[key] = Flight()
+            elif flight is not None:
+                self.saved += 1
+        if flight is None:
+            return function(*args)
+
+        if not leader:
+            record_cdcp_coalesced()
+            with timed("cdcp"):
+                if not flight.done.wait(self.timeout):
+                    raise CDCPUnavailableException(
+                        "Timeout of waiting for CDCP")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = function(*args)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    async def ado(self, key: str, function: Callable, *args) -> Any:
+        """
+            Async variant of do for coroutine function
+        """
+        loop = asyncio.get_running_loop()
+        futures = self._futures.get(loop)
+        if futures is None:
+            futures = self._futures[loop] = {}
+        future = futures.get(key)
+        if future is not None:
+            with self._lock:
+                self.saved += 1
+            record_cdcp_coalesced()
+            try:
+                # cancelled waiter does not cancel lookup of others
+                return await asyncio.wait_for(asyncio.shield(future),
+                                              self.timeout)
+            except asyncio.TimeoutError:
+                raise CDCPUnavailableException("Timeout of waiting for CDCP")
+        if len(futures) >= self.max_keys:
+            return await function(*args)
+
+        future = futures[key] = loop.create_future()
+        # error without waiters is not logged as never retrieved
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            result = await function(*args)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del futures[key]
+        return result
+
+
+class CDCPClient:
+    """
+        Client for CDCP API of issued ISINs
+        Uses keep-alive connection pool, timeouts, bounded retries with
+        jitter and circuit breaker
+    """
+    def __init__(self, url: str = CDCP_URL,
+                 connect_timeout: float = CDCP_CONNECT_TIMEOUT,
+                 read_timeout: float = CDCP_READ_TIMEOUT,
+                 pool_size: int = CDCP_POOL_SIZE,
+                 max_retries: int = CDCP_MAX_RETRIES,
+                 backoff: float = CDCP_RETRY_BACKOFF,
+                 backoff_max: float = CDCP_RETRY_BACKOFF_MAX,
+                 breaker: Optional[CircuitBreaker] = None,
+                 single_flight: Optional[SingleFlight] = None):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.single_flight = single_flight if single_flight is not None \
+            else SingleFlight()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                              max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def is_issued(self, isin: str) -> bool:
+        """
+            Return True if ISIN is issued, False if CDCP does not know it
+            Concurrent lookups of the same ISIN share one request
+            Raises CDCPUnavailableException when CDCP can not answer
+        """
+        return self.single_flight.do(isin, self._is_issued, isin)
+
+    def _is_issued(self, isin: str) -> bool:
+        if not self.breaker.allow():
+            record_cdcp_rejected()
+            raise CDCPUnavailableException("CDCP circuit breaker is open")
+
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self._get_delay(attempt))
+            start = time.perf_counter()
+            try:
+                with timed("cdcp"):
+                    result = self.session.get(self.url + isin,
+                                              timeout=self.timeout)
+            except requests.RequestException as e:
+                record_cdcp_request("exception", time.perf_counter() - start)
+                error = str(e)
+                continue
+            duration = time.perf_counter() - start
+
+            if result.status_code == 200:
+                record_cdcp_request("issued", duration)
+                self.breaker.record_success()
+                return True
+            if 400 <= result.status_code < 500:
+                # CDCP answered, ISIN is just not valid
+                record_cdcp_request("not_issued", duration)
+                self.breaker.record_success()
+                logger.info("ISIN code %s is not issued: %s", isin,
+                            result.text)
+                return False
+            record_cdcp_request("error", duration)
+            error = "HTTP %s" % result.status_code
+
+        self.breaker.record_failure()
+        logger.warning("CDCP request for %s failed: %s", isin, error)
+        raise CDCPUnavailableException()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _get_delay(self, attempt: int) -> float:
+        # exponential backoff with full jitter
+        return random.uniform(0, min(self.backoff_max,
+                                     self.backoff * 2 ** (attempt - 1)))
+
+
+class AsyncCDCPClient:
+    """
+        Client for CDCP API for async views
+        Requests are sent by keep-alive connection pool of requests in
+        threads of the client, so they do not block event loop or threads
+        of sync views. Number of requests in flight is bounded by
+        max_connections. Timeouts, retries and circuit breaker (shared
+        with sync client) work as in CDCPClient, backoff does not block
+        any thread
+    """
+    def __init__(self, url: str = CDCP_URL,
+                 connect_timeout: float = CDCP_CONNECT_TIMEOUT,
+                 read_timeout: float = CDCP_READ_TIMEOUT,
+                 max_connections: int = CDCP_ASYNC_MAX_CONNECTIONS,
+                 max_retries: int = CDCP_MAX_RETRIES,
+                 backoff: float = CDCP_RETRY_BACKOFF,
+                 backoff_max: float = CDCP_RETRY_BACKOFF_MAX,
+                 breaker: Optional[CircuitBreaker] = None,
+                 single_flight: Optional[SingleFlight] = None):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.single_flight = single_flight if single_flight is not None \
+            else SingleFlight()
+        # semaphores are bound to event loop
+        self._semaphores: WeakKeyDictionary = WeakKeyDictionary()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=max_connections, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # threads are started when needed, default executor of event loop
+        # would bound requests in flight by its size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_connections, thread_name_prefix="cdcp-async")
+        self._session_get = sync_to_async(self.session.get,
+                                          thread_sensitive=False,
+                                          executor=self._executor)
+
+    _get_delay = CDCPClient._get_delay
+
+    async def is_issued(self, isin: str) -> bool:
+        """
+            Return True if ISIN is issued, False if CDCP does not know it
+            Concurrent lookups of the same ISIN share one request
+            Raises CDCPUnavailableException when CDCP can not answer
+        """
+        return await self.single_flight.ado(isin, self._is_issued, isin)
+
+    async def _is_issued(self, isin: str) -> bool:
+        if not self.breaker.allow():
+            record_cdcp_rejected()
+            raise CDCPUnavailableException("CDCP circuit breaker is open")
+
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self._get_delay(attempt))
+            start = time.perf_counter()
+            try:
+                with timed("cdcp"):
+                    result = await self._get(self.url + isin)
+            except requests.RequestException as e:
+                record_cdcp_request("exception", time.perf_counter() - start)
+                error = str(e)
+                continue
+            duration = time.perf_counter() - start
+
+            if result.status_code == 200:
+                record_cdcp_request("issued", duration)
+                self.breaker.record_success()
+                return True
+            if 400 <= result.status_code < 500:
+                # CDCP answered, ISIN is just not valid
+                record_cdcp_request("not_issued", duration)
+                self.breaker.record_success()
+                logger.info("ISIN code %s is not issued: %s", isin,
+                            result.text)
+                return False
+            record_cdcp_request("error", duration)
+            error = "HTTP %s" % result.status_code
+
+        self.breaker.record_failure()
+        logger.warning("CDCP request for %s failed: %s", isin, error)
+        raise CDCPUnavailableException()
+
+    async def _get(self, url: str) -> requests.Response:
+        """
+            Send GET request by session in thread of client
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = \
+                asyncio.Semaphore(self.max_connections)
+        async with semaphore:
+            return await self._session_get(url, timeout=self.timeout)
+
+    def close(self) -> None:
+        self.session.close()
+        self._executor.shutdown(wait=False)
+
+
+_cdcp_client: Optional[CDCPClient] = None
+_cdcp_client_lock = threading.Lock()
+
+
+def get_cdcp_client() -> CDCPClient:
+    """
+        Return process wide CDCP client configured in settings
+    """
+    global _cdcp_client
+    if _cdcp_client is None:
+        with _cdcp_client_lock:
+            if _cdcp_client is None:
+                _cdcp_client = CDCPClient()
+    return _cdcp_client
+
+
+_async_cdcp_client: Optional[AsyncCDCPClient] = None
+
+
+def get_async_cdcp_client() -> AsyncCDCPClient:
+    """
+        Return process wide async CDCP client configured in settings
+        Circuit breaker and coalescing of lookups (counter of saved
+        requests) are shared with client of sync views
+    """
+    global _async_cdcp_client
+    if _async_cdcp_client is None:
+        client = get_cdcp_client()
+        with _cdcp_client_lock:
+            if _async_cdcp_client is None:
+                _async_cdcp_client = AsyncCDCPClient(
+                    breaker=client.breaker,
+                    single_flight=client.single_flight)
+    return _async_cdcp_client
@@ -0,0 +1,59 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from collections import defaultdict
+from typing import Dict, List
+
+from django.db import transaction
+
+from settings import BULK_VALIDATION_WORKERS
+from settings import VALIDATION_BATCH_SIZE
+from bonds_api.models import Bond
+from bonds_api.summary import update_summary
+from bonds_api.utils import validate_isins
+from bonds_api.versions import bump_versions
+
+
+def validate_pending(batch_size: int = VALIDATION_BATCH_SIZE,
+                     workers: int = BULK_VALIDATION_WORKERS
+                     ) -> Dict[str, int]:
+    """
+        Validate ISINs of oldest pending bonds against CDCP
+        Pending bonds are queue of deferred mode, they are marked valid
+        or rejected. Rejected bonds are removed from statistics of their
+        owners. Raises CDCPUnavailableException when CDCP can not
+        answer, bonds stay pending then and are validated again.
+        Return counts of valid and rejected bonds, zeros when none is pending
+    """
+    pending = list(Bond.objects
+                   .filter(validation_status=Bond.ValidationStatus.PENDING)
+                   .order_by("id")
+                   .values_list("id", "isin", "user_id")[:batch_size])
+    errors = validate_isins((isin for _, isin, _ in pending),
+                            max_workers=workers, fail_unavailable=True)
+
+    results: Dict[str, List[int]] = {Bond.ValidationStatus.VALID: [],
+                                     Bond.ValidationStatus.REJECTED: []}
+    for bond_id, isin, _ in pending:
+        results[Bond.ValidationStatus.REJECTED if errors[isin]
+                else Bond.ValidationStatus.VALID].append(bond_id)
+    with transaction.atomic():
+        # counted bonds are removed from statistics in their pending state
+        rejected: Dict[int, List[Bond]] = defaultdict(list)
+        for bond in Bond.objects.select_for_update().filter(
+                id__in=results[Bond.ValidationStatus.REJECTED],
+                validation_status=Bond.ValidationStatus.PENDING):
+            rejected[bond.user_id].append(bond)
+        for validation_status, bond_ids in results.items():
+            if bond_ids:
+                # bonds deleted meanwhile are just not updated
+                Bond.objects.filter(
+                    id__in=bond_ids,
+                    validation_status=Bond.ValidationStatus.PENDING) \
+                    .update(validation_status=validation_status)
+        for user_id, user_bonds in rejected.items():
+            update_summary(user_id, removed=user_bonds)
+        # status is part of bond data
+        bump_versions(user_id for _, _, user_id in pending)
+    return {"valid": len(results[Bond.ValidationStatus.VALID]),
+            "rejected": len(results[Bond.ValidationStatus.REJECTED])}
@@ -0,0 +1,88 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import csv
+
+from itertools import islice
+from typing import Iterator, List
+
+from django.db.models import QuerySet
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.utils.encoders import JSONEncoder
+
+from settings import EXPORT_CHUNK_SIZE
+from bonds_api.serializers import BondSerializer
+from bonds_api.serializers import serialize_bond_values
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+class ExportContentNegotiation(BaseContentNegotiation):
+    """
+        Format of export is given by URL, so Accept header of client
+        (text/csv, application/x-ndjson,...) is not checked against
+        renderers, which render just error responses
+    """
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class Echo:
+    """
+        File-like object which returns written value instead of storing it
+    """
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_bond_data(queryset: QuerySet,
+                   chunk_size: int = EXPORT_CHUNK_SIZE,
+                   fields: List[str] = BondSerializer.Meta.fields
+                   ) -> Iterator[dict]:
+    """
+        Serialize bonds chunk by chunk, so just one chunk is in memory
+        Just selected fields are read from database
+    """
+    iterator = queryset.values(*fields).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield from serialize_bond_values(chunk, fields)
+
+
+def iter_ndjson(queryset: QuerySet,
+                fields: List[str] = BondSerializer.Meta.fields
+                ) -> Iterator[str]:
+    """
+        Stream bonds as JSON lines
+    """
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for bond_data in iter_bond_data(queryset, fields=fields):
+        yield encoder.encode(bond_data) + "\n"
+
+
+def iter_csv(queryset: QuerySet,
+             fields: List[str] = BondSerializer.Meta.fields
+             ) -> Iterator[str]:
+    """
+        Stream bonds as CSV with header
+    """
+    writer = csv.DictWriter(Echo(), fieldnames=fields)
+    yield writer.writerow(dict(zip(fields, fields)))
+    for bond_data in iter_bond_data(queryset, fields=fields):
+        yield writer.writerow(bond_data)
+
+
+def iter_export(queryset: QuerySet, export_format: str,
+                fields: List[str] = BondSerializer.Meta.fields
+                ) -> Iterator[str]:
+    if export_format == "csv":
+        return iter_csv(queryset, fields)
+    return iter_ndjson(queryset, fields)
@@ -0,0 +1,83 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import csv
+import json
+import re
+
+from typing import Any, Dict, IO, Iterator, Optional
+
+CHUNK_SIZE = 64 * 1024
+SEPARATORS_RE = re.compile(r"[\s,\[\]]*")
+# record cut by end of chunk fails within last characters of buffer
+# (longest token -Infinity, \uXXXX escape), or as unterminated string
+TRUNCATED_TAIL = 16
+
+
+def is_truncated(error: json.JSONDecodeError, length: int) -> bool:
+    """
+        Check if decoding failed just because buffer of given length
+        ends inside of record
+    """
+    return error.msg.startswith("Unterminated string") or \
+        length - error.pos <= TRUNCATED_TAIL
+
+
+def iter_json_records(fp: IO[str],
+                      chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+        Stream objects from JSON array or JSON lines file
+        Only about one chunk of file is kept in memory, malformed record
+        raises ValueError with its offset as soon as it is read
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    # offset of buffer in file
+    offset = 0
+    pos = 0
+    eof = False
+    while True:
+        # skip whitespaces and array delimiters
+        pos = SEPARATORS_RE.match(buffer, pos).end()
+        if pos < len(buffer):
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                # otherwise record continues in next chunk
+                if eof or not is_truncated(e, len(buffer)):
+                    raise ValueError(
+                        "Invalid JSON record at offset %s: %s at offset %s"
+                        % (offset + pos, e.msg, offset + e.pos))
+            else:
+                pos = end
+                yield record
+                continue
+        elif eof:
+            return
+        chunk = fp.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        offset += pos
+        pos = 0
+
+
+def iter_csv_records(fp: IO[str]) -> Iterator[Dict[str, Any]]:
+    """
+        Stream rows of CSV file with header
+    """
+    yield from csv.DictReader(fp)
+
+
+def iter_records(fp: IO[str], file_format: Optional[str] = None,
+                 name: str = "") -> Iterator[Dict[str, Any]]:
+    """
+        Stream records from JSON or CSV file
+        Format is guessed from file name when not given
+    """
+    if file_format is None:
+        file_format = "csv" if name.lower().endswith(".csv") else "json"
+    if file_format == "csv":
+        return iter_csv_records(fp)
+    if file_format == "json":
+        return iter_json_records(fp)
+    raise ValueError("Unknown file format: %s" % file_format)
@@ -0,0 +1,121 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from rest_framework import serializers
+
+from settings import BULK_VALIDATION_WORKERS
+from bonds_api.models import Bond
+from bonds_api.serializers import ChoiceField
+from bonds_api.summary import update_summary
+from bonds_api.utils import InvalidAttributeException
+from bonds_api.utils import check_attributes
+from bonds_api.utils import validate_isins
+
+FREQUENCY_FIELD = ChoiceField(choices=Bond.PaymentFrequency.choices)
+# numbers are strings in CSV files
+NUMBER_FIELDS = ["value", "interest"]
+
+# row number, ISIN, reason
+Rejection = Tuple[int, Optional[str], str]
+
+
+def build_bond(item: Any, user_id: int) -> Bond:
+    """
+        Unsaved bond of item checked by rules of check_attributes
+        Format of ISIN is checked, but it is not validated against CDCP
+        Raises InvalidAttributeException with reason of rejection
+    """
+    try:
+        if not isinstance(item, dict):
+            raise InvalidAttributeException("Bond data expected")
+        data = check_attributes(item, check_isin=False)
+        bond = Bond(emmision_name=data["emmision_name"],
+                    isin=data["isin"],
+                    value=data["value"],
+                    interest=data["interest"],
+                    purchase_date=data["purchase_date"],
+                    maturity_date=data["maturity_date"],
+                    interest_payment_frequency=FREQUENCY_FIELD
+                    .to_internal_value(data["interest_frequency"]),
+                    user_id=user_id)
+        # owner is known user, checking it would query database per bond
+        bond.clean_fields(exclude=["user"])
+    except (serializers.ValidationError, ValidationError) as e:
+        raise InvalidAttributeException("Invalid attribute: %s" % e)
+    except (TypeError, AttributeError):
+        raise InvalidAttributeException("Invalid or missing attribute")
+    return bond
+
+
+def parse_numbers(record: Any) -> Any:
+    """
+        Convert numbers of CSV row, invalid ones are left for
+        check_attributes to report
+    """
+    if not isinstance(record, dict):
+        return record
+    record = dict(record)
+    for field in NUMBER_FIELDS:
+        value = record.get(field)
+        if isinstance(value, str):
+            try:
+                record[field] = float(value)
+            except ValueError:
+                pass
+    return record
+
+
+def import_batch(rows: List[Tuple[int, Any]], user_id: int,
+                 workers: int = BULK_VALIDATION_WORKERS
+                 ) -> Tuple[Dict[str, int], List[Rejection]]:
+    """
+        Create bonds of user from numbered rows of file
+        Distinct ISINs are validated concurrently, valid bonds are created
+        in one transaction. Bonds which user already has are skipped,
+        so batch imported before failure can be imported again.
+        Raises CDCPUnavailableException when CDCP can not answer
+        Return counts of created and skipped bonds and rejected rows
+    """
+    rejections: List[Rejection] = []
+    bonds: Dict[str, Tuple[int, Bond]] = {}
+    for number, record in rows:
+        isin = record.get("isin") if isinstance(record, dict) else None
+        try:
+            bond = build_bond(parse_numbers(record), user_id)
+            if isin in bonds:
+                raise InvalidAttributeException("Duplicate ISIN in file")
+        except InvalidAttributeException as e:
+            rejections.append((number, isin, e.message))
+        else:
+            bonds[isin] = (number, bond)
+
+    owners = dict(Bond.objects.filter(isin__in=bonds.keys())
+                  .values_list("isin", "user_id"))
+    errors = validate_isins((isin for isin in bonds if isin not in owners),
+                            max_workers=workers, fail_unavailable=True)
+
+    skipped = 0
+    valid = []
+    for isin, (number, bond) in bonds.items():
+        if owners.get(isin) == user_id:
+            skipped += 1
+        elif isin in owners:
+            rejections.append((number, isin,
+                               "Bond with this ISIN already exists"))
+        elif errors[isin]:
+            rejections.append((number, isin, errors[isin]))
+        else:
+            valid.append(bond)
+
+    if valid:
+        with transaction.atomic():
+            created = Bond.objects.bulk_create(valid)
+            update_summary(user_id, added=created)
+
+    rejections.sort()
+    return {"created": len(valid), "skipped": skipped,
+            "rejected": len(rejections)}, rejections
@@ -0,0 +1,69 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import re
+
+from typing import Optional
+
+ISIN_RE = re.compile(r"^[A-Z]{2}[A-Z0-9]{9}[0-9]$")
+
+# ISIN format is defined by ISO 6166
+# ISO 3166-1 alpha-2 codes and special prefixes used by ISIN agencies
+COUNTRY_CODES = frozenset("""
+    AD AE AF AG AI AL AM AO AQ AR AS AT AU AW AX AZ BA BB BD BE BF BG BH BI
+    BJ BL BM BN BO BQ BR BS BT BV BW BY BZ CA CC CD CF CG CH CI CK CL CM CN
+    CO CR CU CV CW CX CY CZ DE DJ DK DM DO DZ EC EE EG EH ER ES ET FI FJ FK
+    FM FO FR GA GB GD GE GF GG GH GI GL GM GN GP GQ GR GS GT GU GW GY HK HM
+    HN HR HT HU ID IE IL IM IN IO IQ IR IS IT JE JM JO JP KE KG KH KI KM KN
+    KP KR KW KY KZ LA LB LC LI LK LR LS LT LU LV LY MA MC MD ME MF MG MH MK
+    ML MM MN MO MP MQ MR MS MT MU MV MW MX MY MZ NA NC NE NF NG NI NL NO NP
+    NR NU NZ OM PA PE PF PG PH PK PL PM PN PR PS PT PW PY QA RE RO RS RU RW
+    SA SB SC SD SE SG SH SI SJ SK SL SM SN SO SR SS ST SV SX SY SZ TC TD TF
+    TG TH TJ TK TL TM TN TO TR TT TV TW TZ UA UG UM US UY UZ VA VC VE VG VI
+    VN VU WF WS YE YT ZA ZM ZW
+    XS EU XA XB XC XD
+""".split())
+
+
+# letters are converted to numbers A=10,...,Z=35
+CHAR_DIGITS = {char: str(int(char, 36))
+               for char in "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"}
+# digit after Luhn doubling
+DOUBLED = [0, 2, 4, 6, 8, 1, 3, 5, 7, 9]
+
+
+def get_check_digit(payload: str) -> int:
+    """
+        Calculate check digit of first 11 characters of ISIN
+        Letters are converted to digits and Luhn algorithm is applied
+    """
+    digits = "".join([CHAR_DIGITS[char] for char in payload])
+    # rightmost digit of payload is doubled
+    total = sum(DOUBLED[int(digit)] for digit in digits[-1::-2]) + \
+        sum(int(digit) for digit in digits[-2::-2])
+    return (10 - total % 10) % 10
+
+
+def get_isin_error(isin: Optional[str]) -> Optional[str]:
+    """
+        Check structure, country prefix and check digit of ISIN
+        Return description of error or None for well formed ISIN
+    """
+    if not isinstance(isin, str):
+        return "ISIN must be a string"
+    if len(isin) != 12:
+        return "ISIN must have 12 characters"
+    if not ISIN_RE.match(isin):
+        return "ISIN must contain only upper case letters and digits"
+    if isin[:2] not in COUNTRY_CODES:
+        return "Unknown country code %s" % isin[:2]
+    if get_check_digit(isin[:11]) != int(isin[11]):
+        return "Invalid check digit"
+    return None
+
+
+def is_valid_isin(isin: Optional[str]) -> bool:
+    """
+        Return True if ISIN is well formed
+    """
+    return get_isin_error(isin) is None
@@ -0,0 +1,186 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import threading
+import time
+
+from abc import ABC
+from abc import abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+
+from settings import ISIN_CACHE_BACKEND
+from settings import ISIN_CACHE_ALIAS
+from settings import ISIN_CACHE_MAX_SIZE
+from settings import ISIN_CACHE_POSITIVE_TTL
+from settings import ISIN_CACHE_NEGATIVE_TTL
+
+
+class ISINCache(ABC):
+    """
+        Base class for caches of ISIN validation results
+        Valid and invalid ISINs are kept for different time (TTL)
+    """
+    def __init__(self, positive_ttl: float = ISIN_CACHE_POSITIVE_TTL,
+                 negative_ttl: float = ISIN_CACHE_NEGATIVE_TTL):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, isin: str) -> Optional[bool]:
+        """
+            Return cached validation result or None if ISIN is not cached
+        """
+        result = self._get(isin)
+        with self._stats_lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def set(self, isin: str, valid: bool) -> None:
+        """
+            Store validation result of ISIN
+        """
+        ttl = self.positive_ttl if valid else self.negative_ttl
+        self._set(isin, valid, ttl)
+
+    async def aget(self, isin: str) -> Optional[bool]:
+        """
+            Async variant of get, backend is called in thread
+        """
+        return await sync_to_async(self.get)(isin)
+
+    async def aset(self, isin: str, valid: bool) -> None:
+        """
+            Async variant of set, backend is called in thread
+        """
+        await sync_to_async(self.set)(isin, valid)
+
+    def stats(self) -> Dict[str, int]:
+        """
+            Return hit/miss counters of cache
+        """
+        with self._stats_lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        """
+            Remove all cached results and reset counters
+        """
+        self._clear()
+        with self._stats_lock:
+            self.hits = 0
+            self.misses = 0
+
+    @abstractmethod
+    def _get(self, isin: str) -> Optional[bool]:
+        pass
+
+    @abstractmethod
+    def _set(self, isin: str, valid: bool, ttl: float) -> None:
+        pass
+
+    @abstractmethod
+    def _clear(self) -> None:
+        pass
+
+
+class LocalISINCache(ISINCache):
+    """
+        In-process cache with size-bounded LRU eviction
+    """
+    def __init__(self, max_size: int = ISIN_CACHE_MAX_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Tuple[bool, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def aget(self, isin: str) -> Optional[bool]:
+        # memory is never waited for
+        return self.get(isin)
+
+    async def aset(self, isin: str, valid: bool) -> None:
+        self.set(isin, valid)
+
+    def _get(self, isin: str) -> Optional[bool]:
+        with self._lock:
+            item = self._data.get(isin)
+            if item is None:
+                return None
+            valid, expires = item
+            if expires <= time.monotonic():
+                del self._data[isin]
+                return None
+            self._data.move_to_end(isin)
+            return valid
+
+    def _set(self, isin: str, valid: bool, ttl: float) -> None:
+        with self._lock:
+            self._data[isin] = (valid, time.monotonic() + ttl)
+            self._data.move_to_end(isin)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DjangoISINCache(ISINCache):
+    """
+        Cache stored in Django cache framework, so it can be shared
+        by all workers (memcached, redis, database,...)
+        Size of cache is bounded by configuration of cache backend
+    """
+    key_prefix = "bonds_api:isin:"
+
+    def __init__(self, alias: str = ISIN_CACHE_ALIAS, **kwargs):
+        super().__init__(**kwargs)
+        self.alias = alias
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def _get(self, isin: str) -> Optional[bool]:
+        return self._cache.get(self.key_prefix + isin)
+
+    def _set(self, isin: str, valid: bool, ttl: float) -> None:
+        self._cache.set(self.key_prefix + isin, valid, timeout=ttl)
+
+    def _clear(self) -> None:
+        # whole alias is cleared, so ISINs have dedicated cache
+        # (ISIN_CACHE_ALIAS), other caches are not touched
+        self._cache.clear()
+
+
+_isin_cache: Optional[ISINCache] = None
+_isin_cache_lock = threading.Lock()
+
+
+def get_isin_cache() -> ISINCache:
+    """
+        Return process wide ISIN cache configured in settings
+    """
+    global _isin_cache
+    if _isin_cache is None:
+        with _isin_cache_lock:
+            if _isin_cache is None:
+                if ISIN_CACHE_BACKEND == "django":
+                    _isin_cache = DjangoISINCache()
+                elif ISIN_CACHE_BACKEND == "local":
+                    _isin_cache = LocalISINCache()
+                else:
+                    raise ValueError("Unknown ISIN cache backend: %s" %
+                                     ISIN_CACHE_BACKEND)
+    return _isin_cache
@@ -0,0 +1,19 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from django.core.management.base import BaseCommand
+
+from settings import METRICS_DIR
+from bonds_api.metrics import clear_metrics_dir
+
+
+class Command(BaseCommand):
+    help = "Remove values of previous run of server from METRICS_DIR, " \
+           "run it before worker processes are started"
+
+    def handle(self, *args, **options):
+        if METRICS_DIR is None:
+            self.stdout.write("METRICS_DIR is not set")
+            return
+        clear_metrics_dir(METRICS_DIR)
+        self.stdout.write("Cleared %s" % METRICS_DIR)
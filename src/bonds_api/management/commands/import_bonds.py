@@ -0,0 +1,155 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import json
+import os
+import time
+
+from itertools import islice
+from typing import Any, Dict, Optional
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from settings import BULK_VALIDATION_WORKERS
+from settings import CDCP_POOL_SIZE
+from settings import IMPORT_BATCH_SIZE
+from bonds_api.cdcp import CDCPUnavailableException
+from bonds_api.file_readers import iter_records
+from bonds_api.importer import import_batch
+from bonds_api.registry import iter_batches
+
+COUNTERS = ["rows", "created", "skipped", "rejected"]
+
+
+class Command(BaseCommand):
+    help = "Import bonds of user from JSON or CSV file in format of bond " \
+           "endpoint, file is streamed in batches and import can be " \
+           "resumed from checkpoint after failure"
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="file of bonds")
+        parser.add_argument("--user", required=True,
+                            help="username of owner of bonds")
+        parser.add_argument("--format", choices=["json", "csv"],
+                            help="format of file, guessed from name "
+                                 "when not given")
+        parser.add_argument("--batch-size", type=int,
+                            default=IMPORT_BATCH_SIZE)
+        # more threads than connections of CDCP client would just wait
+        parser.add_argument("--workers", type=int,
+                            default=min(BULK_VALIDATION_WORKERS,
+                                        CDCP_POOL_SIZE),
+                            help="number of threads validating ISINs")
+        parser.add_argument("--checkpoint",
+                            help="progress file, FILE.checkpoint by default")
+        parser.add_argument("--rejects",
+                            help="JSON lines file of rejected rows, "
+                                 "FILE.rejects by default")
+        parser.add_argument("--restart", action="store_true",
+                            help="ignore checkpoint and import whole file")
+
+    def handle(self, *args, **options):
+        path = options["file"]
+        checkpoint_path = options["checkpoint"] or path + ".checkpoint"
+        rejects_path = options["rejects"] or path + ".rejects"
+        if options["batch_size"] < 1 or options["workers"] < 1:
+            raise CommandError("Batch size and workers must be positive")
+
+        user_id = User.objects.filter(username=options["user"]) \
+            .values_list("id", flat=True).first()
+        if user_id is None:
+            raise CommandError("Unknown user %s" % options["user"])
+
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            raise CommandError("Can not import %s: %s" % (path, e))
+        # checkpoint is valid just for the same file
+        source = {"file": os.path.abspath(path), "size": stat.st_size,
+                  "mtime": stat.st_mtime, "user": user_id}
+
+        checkpoint = None
+        if not options["restart"]:
+            checkpoint = self.read_checkpoint(checkpoint_path, source)
+        if checkpoint is None:
+            checkpoint = dict(source, rejects_size=0,
+                              **{name: 0 for name in COUNTERS})
+        else:
+            self.stdout.write("Resuming after %s rows" % checkpoint["rows"])
+
+        start = time.perf_counter()
+        imported = 0
+        try:
+            with open(path, newline="", encoding="utf-8") as fp, \
+                    open(rejects_path, "a+", encoding="utf-8") as rejects:
+                # rejections written after last checkpoint are written again
+                if os.path.getsize(rejects_path) > checkpoint["rejects_size"]:
+                    rejects.truncate(checkpoint["rejects_size"])
+                records = iter_records(fp, options["format"], path)
+                rows = enumerate(islice(records, checkpoint["rows"], None),
+                                 checkpoint["rows"] + 1)
+                for batch in iter_batches(rows, options["batch_size"]):
+                    stats, rejections = import_batch(
+                        batch, user_id, workers=options["workers"])
+                    for number, isin, reason in rejections:
+                        rejects.write(json.dumps({"row": number,
+                                                  "isin": isin,
+                                                  "error": reason}) + "\n")
+                    rejects.flush()
+
+                    imported += len(batch)
+                    checkpoint["rows"] += len(batch)
+                    for name, value in stats.items():
+                        checkpoint[name] += value
+                    checkpoint["rejects_size"] = rejects.tell()
+                    self.write_checkpoint(checkpoint_path, checkpoint)
+                    self.stdout.write(self.format_progress(
+                        checkpoint, imported, time.perf_counter() - start))
+        except CDCPUnavailableException as e:
+            raise CommandError("%s, run command again to resume import "
+                               "after %s rows" % (e.message,
+                                                  checkpoint["rows"]))
+        except (OSError, ValueError) as e:
+            raise CommandError("Can not import %s after %s rows: %s" %
+                               (path, checkpoint["rows"], e))
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write("Done, " + self.format_progress(
+            checkpoint, imported, time.perf_counter() - start))
+        if checkpoint["rejected"]:
+            self.stdout.write("Rejected rows are in %s" % rejects_path)
+
+    @staticmethod
+    def read_checkpoint(path: str,
+                        source: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, encoding="utf-8") as fp:
+                checkpoint = json.load(fp)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            raise CommandError("Can not read checkpoint %s: %s" % (path, e))
+        if any(checkpoint.get(key) != value for key, value in source.items()):
+            raise CommandError("Checkpoint %s belongs to another file or "
+                               "user, use --restart to import whole file" %
+                               path)
+        return checkpoint
+
+    @staticmethod
+    def write_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+        temporary = path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as fp:
+            json.dump(checkpoint, fp)
+        # checkpoint is never partially written
+        os.replace(temporary, path)
+
+    @staticmethod
+    def format_progress(checkpoint: Dict[str, Any], imported: int,
+                        elapsed: float) -> str:
+        return "%s, rows per second: %.0f" % (
+            ", ".join("%s: %s" % (name, checkpoint[name])
+                      for name in COUNTERS),
+            imported / elapsed if elapsed else 0.0)
@@ -0,0 +1,46 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from settings import ISIN_REGISTRY_BATCH_SIZE
+from bonds_api.file_readers import iter_records
+from bonds_api.registry import load_registry
+from bonds_api.registry import prune_registry
+
+
+class Command(BaseCommand):
+    help = "Load snapshot of CDCP registry of issued ISINs (JSON or CSV) " \
+           "into local mirror"
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="snapshot file")
+        parser.add_argument("--format", choices=["json", "csv"],
+                            help="format of file, guessed from name "
+                                 "when not given")
+        parser.add_argument("--batch-size", type=int,
+                            default=ISIN_REGISTRY_BATCH_SIZE)
+        parser.add_argument("--isin-field", default="isin")
+        parser.add_argument("--name-field", default="name")
+        parser.add_argument("--full", action="store_true",
+                            help="snapshot contains whole registry, delete "
+                                 "ISINs missing in it")
+
+    def handle(self, *args, **options):
+        loaded_at = timezone.now()
+        try:
+            with open(options["file"], newline="", encoding="utf-8") as fp:
+                records = iter_records(fp, options["format"], options["file"])
+                stats = load_registry(records, loaded_at,
+                                      batch_size=options["batch_size"],
+                                      isin_field=options["isin_field"],
+                                      name_field=options["name_field"])
+        except (OSError, ValueError) as e:
+            raise CommandError("Can not load %s: %s" % (options["file"], e))
+
+        if options["full"]:
+            stats["deleted"] = prune_registry(loaded_at)
+
+        self.stdout.write(", ".join("%s: %s" % item for item in stats.items()))
@@ -0,0 +1,60 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import transaction
+
+from bonds_api.models import Bond
+from bonds_api.models import PortfolioSummary
+from bonds_api.summary import check_summary
+from bonds_api.summary import rebuild_summary
+from bonds_api.versions import bump_versions
+
+
+class Command(BaseCommand):
+    help = "Rebuild portfolio summaries of users from their bonds or " \
+           "check stored summaries for drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true",
+                            help="only report summaries which differ from "
+                                 "bonds, fails when drift is found")
+        parser.add_argument("--user", type=int, action="append",
+                            help="id of user, may be repeated")
+
+    def handle(self, *args, **options):
+        user_ids = options["user"]
+        if not user_ids:
+            user_ids = set(Bond.objects.values_list("user_id", flat=True)
+                           .distinct())
+            user_ids |= set(PortfolioSummary.objects
+                            .values_list("user_id", flat=True))
+            user_ids = sorted(user_ids)
+
+        if not options["check"]:
+            for user_id in user_ids:
+                with transaction.atomic():
+                    rebuild_summary(user_id)
+                    # statistics of user endpoint may change
+                    bump_versions([user_id])
+            self.stdout.write("Rebuilt summaries of %s users" %
+                              len(user_ids))
+            return
+
+        drifted = 0
+        for user_id in user_ids:
+            summary = PortfolioSummary.objects \
+                .filter(user_id=user_id).first()
+            if summary is None:
+                summary = PortfolioSummary(user_id=user_id)
+            drift = check_summary(summary)
+            if drift:
+                drifted += 1
+                for field, (stored, computed) in drift.items():
+                    self.stdout.write("user %s: %s stored %s, computed %s" %
+                                      (user_id, field, stored, computed))
+        if drifted:
+            raise CommandError("Summaries of %s users drifted" % drifted)
+        self.stdout.write("Summaries of %s users are consistent" %
+                          len(user_ids))
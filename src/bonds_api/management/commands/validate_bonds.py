@@ -0,0 +1,70 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import close_old_connections
+
+from settings import BULK_VALIDATION_WORKERS
+from settings import CDCP_POOL_SIZE
+from settings import VALIDATION_BATCH_SIZE
+from settings import VALIDATION_POLL_INTERVAL
+from settings import VALIDATION_RETRY_DELAY
+from bonds_api.cdcp import CDCPUnavailableException
+from bonds_api.deferred import validate_pending
+
+
+class Command(BaseCommand):
+    help = "Validate ISINs of bonds created in deferred mode, runs until " \
+           "stopped and waits for new pending bonds"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="validate pending bonds and exit")
+        parser.add_argument("--batch-size", type=int,
+                            default=VALIDATION_BATCH_SIZE)
+        # more threads than connections of CDCP client would just wait
+        parser.add_argument("--workers", type=int,
+                            default=min(BULK_VALIDATION_WORKERS,
+                                        CDCP_POOL_SIZE),
+                            help="number of threads validating ISINs")
+        parser.add_argument("--interval", type=float,
+                            default=VALIDATION_POLL_INTERVAL,
+                            help="seconds to wait when no bond is pending")
+        parser.add_argument("--retry-delay", type=float,
+                            default=VALIDATION_RETRY_DELAY,
+                            help="seconds to wait when CDCP is unavailable")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1 or options["workers"] < 1:
+            raise CommandError("Batch size and workers must be positive")
+
+        totals = {"valid": 0, "rejected": 0}
+        while True:
+            # connection of long running worker may be closed by database
+            close_old_connections()
+            try:
+                counts = validate_pending(options["batch_size"],
+                                          options["workers"])
+            except CDCPUnavailableException as e:
+                if options["once"]:
+                    raise CommandError("%s, bonds stay pending" % e.message)
+                self.stderr.write("%s, retry in %s seconds" %
+                                  (e.message, options["retry_delay"]))
+                time.sleep(options["retry_delay"])
+                continue
+
+            if counts["valid"] or counts["rejected"]:
+                for name, value in counts.items():
+                    totals[name] += value
+                self.stdout.write("valid: %s, rejected: %s" %
+                                  (counts["valid"], counts["rejected"]))
+            elif options["once"]:
+                break
+            else:
+                time.sleep(options["interval"])
+
+        self.stdout.write("Done, valid: %s, rejected: %s" %
+                          (totals["valid"], totals["rejected"]))
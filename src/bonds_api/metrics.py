@@ -0,0 +1,455 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import asyncio
+import atexit
+import bisect
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest
+from django.http import HttpResponse
+from django.http import HttpResponseForbidden
+
+from settings import METRICS_ALLOWED_IPS
+from settings import METRICS_ENABLED
+from settings import METRICS_DIR
+from settings import METRICS_FLUSH_INTERVAL
+from settings import METRICS_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+# name -> (type, help)
+METRICS = {
+    "bonds_http_requests_total": (
+        "counter", "Number of requests by route, method and status"),
+    "bonds_http_errors_total": (
+        "counter", "Number of requests which ended by server error"),
+    "bonds_http_request_duration_seconds": (
+        "histogram", "Latency of requests by route and method"),
+    "bonds_cdcp_request_duration_seconds": (
+        "histogram", "Latency of CDCP requests by outcome"),
+    "bonds_cdcp_rejected_total": (
+        "counter", "Number of CDCP requests rejected by circuit breaker"),
+    "bonds_cdcp_coalesced_total": (
+        "counter", "Number of CDCP requests saved by waiting for the same "
+                   "lookup in flight"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# file of METRICS_DIR with summed values of exited processes
+ARCHIVE_FILE = "archive.json"
+LOCK_FILE = "metrics.lock"
+
+
+class MetricsRegistry:
+    """
+        Counters and histograms of this process
+        Values are updated under lock which is never held across I/O.
+        With METRICS_DIR set, snapshot of values is written to file
+        of process by background thread every METRICS_FLUSH_INTERVAL
+        seconds (not by requests), so metrics endpoint can sum values
+        of all worker processes
+        On exit, values of process are added to archive of directory and
+        its file is removed, files of processes which did not exit cleanly
+        are archived by the first flush of next process
+    """
+    def __init__(self, directory: Optional[str] = METRICS_DIR,
+                 buckets: Tuple[float, ...] = METRICS_BUCKETS) -> None:
+        self.directory = directory
+        self.buckets = tuple(buckets)
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            # values of parent process are not values of worker
+            os.register_at_fork(after_in_child=self._reset)
+        if directory is not None:
+            # forked workers inherit it, they close their own file
+            atexit.register(self.close)
+
+    def _reset(self) -> None:
+        # locks of parent may be held by its other threads at fork
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = defaultdict(float)
+        # bucket counts (not cumulative) followed by sum and count
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        self._archived_dead = False
+        self._file_name = "%s-%s.json" % (os.getpid(), uuid.uuid4().hex)
+        # thread of parent is not running in child, it starts its own
+        self._flusher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def _start_flusher(self) -> None:
+        if self.directory is None or self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop,
+                                             name="metrics-flush",
+                                             daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        stopped = self._stopped
+        while not stopped.wait(METRICS_FLUSH_INTERVAL):
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning("Metrics were not written: %s", e)
+
+    def inc(self, name: str, labels: Labels, value: float = 1.0) -> None:
+        with self._lock:
+            self.counters[(name, labels)] += value
+        self._start_flusher()
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = \
+                    [0.0] * (len(self.buckets) + 3)
+            histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+        self._start_flusher()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"counters": [[name, labels, value] for (name, labels),
+                                 value in self.counters.items()],
+                    "histograms": [[name, labels, list(values)]
+                                   for (name, labels), values
+                                   in self.histograms.items()]}
+
+    def flush(self) -> None:
+        """
+            Write snapshot of values to file of process in directory
+        """
+        if self.directory is None:
+            return
+        with self._flush_lock:
+            if not self._archived_dead:
+                self._archived_dead = True
+                archive_dead_processes(self.directory)
+            write_snapshot(os.path.join(self.directory, self._file_name),
+                           self.snapshot())
+
+    def close(self) -> None:
+        """
+            Add values of process to archive of directory and remove its
+            file, so latest values are not lost and files of exited
+            processes do not pile up
+        """
+        self._stopped.set()
+        if self._flusher is not None:
+            # file is not written again after it was archived
+            self._flusher.join()
+        if self.directory is None or not os.path.isdir(self.directory):
+            return
+        self.flush()
+        archive_files(self.directory,
+                      [os.path.join(self.directory, self._file_name)])
+
+    def collect(self) -> Dict[str, Any]:
+        """
+            Values of all processes (or of this one without directory)
+        """
+        if self.directory is None:
+            return merge_snapshots([self.snapshot()])
+        self.flush()
+        # files are not archived meanwhile, so values are not counted
+        # twice or missed
+        with locked(self.directory, fcntl.LOCK_SH):
+            snapshots = [read_snapshot(path) for path in glob.glob(
+                os.path.join(self.directory, "*.json"))]
+        return merge_snapshots([snapshot for snapshot in snapshots
+                                if snapshot is not None])
+
+
+def write_snapshot(path: str, data: Dict[str, Any]) -> None:
+    temporary = "%s.%s.tmp" % (path, threading.get_ident())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(temporary, "w") as fp:
+        json.dump(data, fp)
+    # readers never see partially written file
+    os.replace(temporary, path)
+
+
+def read_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        # file of process removed meanwhile
+        return None
+
+
+@contextmanager
+def locked(directory: str, operation: int) -> Iterator[None]:
+    """
+        Lock files of directory, shared for reading (fcntl.LOCK_SH)
+        or exclusive for archiving (fcntl.LOCK_EX)
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), "a") as fp:
+        fcntl.flock(fp, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(fp, fcntl.LOCK_UN)
+
+
+def archive_files(directory: str, paths: List[str]) -> None:
+    """
+        Add values of files of processes to archive and remove files
+    """
+    archive = os.path.join(directory, ARCHIVE_FILE)
+    with locked(directory, fcntl.LOCK_EX):
+        snapshots = [read_snapshot(path) for path in [archive] + paths]
+        values = merge_snapshots([snapshot for snapshot in snapshots
+                                  if snapshot is not None])
+        write_snapshot(archive, {
+            "counters": [[name, labels, value] for (name, labels), value
+                         in values["counters"].items()],
+            "histograms": [[name, labels, histogram] for (name, labels),
+                           histogram in values["histograms"].items()]})
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # process of other user
+        return True
+    return True
+
+
+def mark_process_dead(pid: int, directory: Optional[str] = METRICS_DIR
+                      ) -> None:
+    """
+        Archive values of exited process, e.g. from child_exit hook of
+        gunicorn, so values of killed worker are kept
+    """
+    if directory is None:
+        return
+    archive_files(directory, glob.glob(os.path.join(directory,
+                                                    "%s-*.json" % pid)))
+
+
+def archive_dead_processes(directory: str) -> None:
+    """
+        Archive values of processes which are not running anymore
+    """
+    paths = []
+    for path in glob.glob(os.path.join(directory, "*-*.json")):
+        pid = os.path.basename(path).split("-", 1)[0]
+        if pid.isdigit() and not is_running(int(pid)):
+            paths.append(path)
+    if paths:
+        archive_files(directory, paths)
+
+
+def clear_metrics_dir(directory: Optional[str] = METRICS_DIR) -> None:
+    """
+        Remove values of previous run of server, must be called before
+        workers are started (clear_metrics command, on_starting hook
+        of gunicorn)
+    """
+    if directory is None or not os.path.isdir(directory):
+        return
+    with locked(directory, fcntl.LOCK_EX):
+        for path in glob.glob(os.path.join(directory, "*.json")) + \
+                glob.glob(os.path.join(directory, "*.tmp")):
+            os.remove(path)
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+        Sum values of snapshots of processes
+    """
+    counters: Dict[Tuple[str, Labels], float] = defaultdict(float)
+    histograms: Dict[Tuple[str, Labels], List[float]] = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot["counters"]:
+            counters[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, values in snapshot["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            if key not in histograms:
+                histograms[key] = list(values)
+            else:
+                histograms[key] = [a + b for a, b
+                                   in zip(histograms[key], values)]
+    return {"counters": counters, "histograms": histograms}
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n") \
+        .replace('"', '\\"')
+
+
+def format_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (key, escape(str(value)))
+                             for key, value in pairs)
+
+
+def format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def format_bound(bound: float) -> str:
+    # the same "le" values as official client, so series of processes
+    # exported by other means do not split
+    if bound == float("inf"):
+        return "+Inf"
+    return repr(float(bound))
+
+
+def render_metrics(values: Dict[str, Any],
+                   buckets: Tuple[float, ...] = METRICS_BUCKETS) -> str:
+    """
+        Prometheus text exposition format of collected values
+    """
+    series: Dict[str, List[str]] = defaultdict(list)
+    for (name, labels), value in sorted(values["counters"].items()):
+        series[name].append("%s%s %s" % (name, format_labels(labels),
+                                          format_number(value)))
+    for (name, labels), histogram in sorted(values["histograms"].items()):
+        cumulative = 0.0
+        for bound, count in zip(list(buckets) + [float("inf")],
+                                histogram[:-2]):
+            cumulative += count
+            series[name].append("%s_bucket%s %s" % (
+                name, format_labels(labels, (("le", format_bound(bound)),)),
+                format_number(cumulative)))
+        series[name].append("%s_sum%s %s" % (name, format_labels(labels),
+                                             format_number(histogram[-2])))
+        series[name].append("%s_count%s %s" % (name, format_labels(labels),
+                                               format_number(histogram[-1])))
+
+    lines = []
+    for name, (metric_type, help_text) in METRICS.items():
+        lines.append("# HELP %s %s" % (name, help_text))
+        lines.append("# TYPE %s %s" % (name, metric_type))
+        lines.extend(series.get(name, []))
+    return "\n".join(lines) + "\n"
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MetricsRegistry:
+    """
+        Return process wide metrics registry configured in settings
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+    return _registry
+
+
+def record_cdcp_request(outcome: str, duration: float) -> None:
+    """
+        Record CDCP request, outcome is issued, not_issued, error
+        (server error) or exception (timeout, connection error)
+    """
+    if METRICS_ENABLED:
+        get_registry().observe("bonds_cdcp_request_duration_seconds",
+                               (("outcome", outcome),), duration)
+
+
+def record_cdcp_rejected() -> None:
+    if METRICS_ENABLED:
+        get_registry().inc("bonds_cdcp_rejected_total", ())
+
+
+def record_cdcp_coalesced() -> None:
+    if METRICS_ENABLED:
+        get_registry().inc("bonds_cdcp_coalesced_total", ())
+
+
+class MetricsMiddleware:
+    """
+        Count requests and measure their latency per route
+        Route is name of matched URL pattern
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        if not METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.registry = get_registry()
+        if asyncio.iscoroutinefunction(get_response):
+            # served by ASGI, viz django.utils.deprecation.MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def record(self, request: HttpRequest, response: HttpResponse,
+               duration: float) -> None:
+        match = request.resolver_match
+        route = match.url_name if match is not None and match.url_name \
+            else "unmatched"
+        labels = (("route", route), ("method", request.method))
+        self.registry.observe("bonds_http_request_duration_seconds",
+                              labels, duration)
+        self.registry.inc("bonds_http_requests_total",
+                          labels + (("status", str(response.status_code)),))
+        if response.status_code >= 500:
+            self.registry.inc("bonds_http_errors_total", labels)
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+        Metrics of all worker processes in Prometheus text format
+        Just clients of METRICS_ALLOWED_IPS are allowed
+    """
+    if METRICS_ALLOWED_IPS is not None and \
+            request.META.get("REMOTE_ADDR") not in METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    registry = get_registry()
+    return HttpResponse(render_metrics(registry.collect(), registry.buckets),
+                        content_type="text/plain; version=0.0.4; "
+                                     "charset=utf-8")
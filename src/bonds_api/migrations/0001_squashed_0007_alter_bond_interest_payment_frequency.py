@@ -0,0 +1,43 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    # Migrations 0001-0007 were applied to existing databases before
+    # migrations were kept in repository, this one replaces them
+    replaces = [
+        ('bonds_api', '0001_initial'),
+        ('bonds_api', '0002_auto_20240616_1247'),
+        ('bonds_api', '0003_alter_bond_isin'),
+        ('bonds_api', '0004_alter_bond_interest_payment_frequency'),
+        ('bonds_api', '0005_alter_bond_interest_payment_frequency'),
+        ('bonds_api', '0006_alter_bond_interest_payment_frequency'),
+        ('bonds_api', '0007_alter_bond_interest_payment_frequency'),
+    ]
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bond',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('isin', models.CharField(max_length=12, unique=True)),
+                ('emmision_name', models.CharField(max_length=180)),
+                ('value', models.FloatField()),
+                ('interest', models.FloatField()),
+                ('purchase_date', models.DateTimeField()),
+                ('maturity_date', models.DateTimeField()),
+                ('interest_payment_frequency', models.CharField(choices=[('D', 'Daily'), ('W', 'Weekly'), ('M', 'Monthly'), ('Y', 'Yearly')], max_length=1)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
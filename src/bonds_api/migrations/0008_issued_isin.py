@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonds_api', '0001_squashed_0007_alter_bond_interest_payment_frequency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssuedISIN',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('isin', models.CharField(max_length=12, unique=True)),
+                ('name', models.CharField(blank=True, max_length=180)),
+                ('loaded_at', models.DateTimeField()),
+            ],
+        ),
+    ]
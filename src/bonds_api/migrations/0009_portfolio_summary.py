@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bonds_api', '0008_issued_isin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('total_interest', models.FloatField(default=0.0)),
+                ('total_value', models.FloatField(default=0.0)),
+                ('future_value', models.FloatField(default=0.0)),
+                ('next_maturity_date', models.DateTimeField(blank=True, null=True)),
+                ('next_maturity', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='bonds_api.bond')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='portfolio_summary', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonds_api', '0009_portfolio_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bond',
+            index=models.Index(fields=['user', 'isin'], name='bond_user_isin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bond',
+            index=models.Index(fields=['user', 'maturity_date', 'id'], name='bond_user_maturity_idx'),
+        ),
+    ]
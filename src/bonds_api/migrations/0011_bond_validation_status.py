@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bonds_api', '0010_bond_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bond',
+            name='validation_status',
+            field=models.CharField(choices=[('P', 'Pending'), ('V', 'Valid'), ('R', 'Rejected')], default='V', max_length=1),
+        ),
+        migrations.AddIndex(
+            model_name='bond',
+            index=models.Index(condition=models.Q(('validation_status', 'P')), fields=['id'], name='bond_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bonds_api', '0011_bond_validation_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+                ('modified_at', models.DateTimeField()),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='portfolio_version', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
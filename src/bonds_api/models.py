@@ -2,6 +2,7 @@
 # -*- codding: utf-8 -*-
 
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 
 
@@ -12,6 +13,11 @@ class Bond(models.Model):
         MONTHLY = "M", 'Monthly'
         YEARLY = "Y", 'Yearly'
 
+    class ValidationStatus(models.TextChoices):
+        PENDING = "P", 'Pending'
+        VALID = "V", 'Valid'
+        REJECTED = "R", 'Rejected'
+
     isin: models.CharField = models.CharField(max_length=12, unique=True)
     emmision_name: models.CharField = models.CharField(max_length=180)
     value: models.FloatField = models.FloatField()
@@ -21,6 +27,25 @@ class Bond(models.Model):
     interest_payment_frequency: models.CharField = models.CharField(
         max_length=1, choices=PaymentFrequency.choices)
     user: models.ForeignKey = models.ForeignKey(User, on_delete=models.CASCADE)
+    # result of validation of ISIN against CDCP, bonds created in deferred
+    # mode are pending until validate_bonds command validates them
+    validation_status: models.CharField = models.CharField(
+        max_length=1, choices=ValidationStatus.choices,
+        default=ValidationStatus.VALID)
+
+    class Meta:
+        indexes = [
+            # detail endpoints look bond up by (user, isin)
+            models.Index(fields=["user", "isin"],
+                         name="bond_user_isin_idx"),
+            # list pages and nearest maturity are ordered by
+            # (maturity_date, id) within user
+            models.Index(fields=["user", "maturity_date", "id"],
+                         name="bond_user_maturity_idx"),
+            # queue of pending bonds, the rest of table is not indexed
+            models.Index(fields=["id"], name="bond_pending_idx",
+                         condition=Q(validation_status="P")),
+        ]
 
     def __str__(self) -> str:
         return self.emmision_name
@@ -29,6 +54,59 @@ class Bond(models.Model):
     def get_attributes(cls) -> list[str]:
         field_list = []
         for field in cls._meta.fields:
-            if field.name not in ("id", "isin", "user"):
+            if field.name not in ("id", "isin", "user",
+                                  "validation_status"):
                 field_list.append(field.name)
         return field_list
+
+
+class IssuedISIN(models.Model):
+    """
+        Local mirror of CDCP registry of issued ISINs
+        Loaded by load_cdcp_registry management command
+    """
+    isin: models.CharField = models.CharField(max_length=12, unique=True)
+    name: models.CharField = models.CharField(max_length=180, blank=True)
+    loaded_at: models.DateTimeField = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return self.isin
+
+
+class PortfolioSummary(models.Model):
+    """
+        Statistics of user's bonds
+        Updated in the same transaction as bonds of user
+    """
+    user: models.OneToOneField = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="portfolio_summary")
+    count: models.IntegerField = models.IntegerField(default=0)
+    total_interest: models.FloatField = models.FloatField(default=0.0)
+    total_value: models.FloatField = models.FloatField(default=0.0)
+    future_value: models.FloatField = models.FloatField(default=0.0)
+    next_maturity: models.ForeignKey = models.ForeignKey(
+        Bond, null=True, blank=True, on_delete=models.SET_NULL,
+        related_name="+")
+    next_maturity_date: models.DateTimeField = models.DateTimeField(
+        null=True, blank=True)
+
+    def __str__(self) -> str:
+        return "Portfolio of %s" % self.user_id
+
+    @property
+    def avg_interest(self) -> float:
+        return self.total_interest / self.count if self.count else 0.0
+
+
+class PortfolioVersion(models.Model):
+    """
+        Version of user's bonds, incremented with every change of them
+        Kept also when user has no bonds, so version never goes back
+    """
+    user: models.OneToOneField = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="portfolio_version")
+    version: models.BigIntegerField = models.BigIntegerField(default=0)
+    modified_at: models.DateTimeField = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return "Portfolio version %s of %s" % (self.version, self.user_id)
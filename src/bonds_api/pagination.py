@@ -0,0 +1,123 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import base64
+import json
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, List, Optional
+
+from django.db.models import Q
+from django.db.models import QuerySet
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from settings import BOND_LIST_PAGE_SIZE
+from settings import BOND_LIST_MAX_PAGE_SIZE
+from bonds_api.utils import InvalidAttributeException
+
+
+class BondCursorPagination(BasePagination):
+    """
+        Keyset pagination of bonds over stable ordering (maturity_date, id)
+        Page is read with index range scan, so its cost does not grow
+        with number of bonds before it (no OFFSET)
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = BOND_LIST_PAGE_SIZE
+    max_page_size = BOND_LIST_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request,
+                          view: Any = None) -> List[Any]:
+        self.request = request
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            reverse = False
+        else:
+            maturity_date, pk, reverse = cursor
+            if reverse:
+                queryset = queryset.filter(
+                    Q(maturity_date__lt=maturity_date) |
+                    Q(maturity_date=maturity_date, id__lt=pk))
+            else:
+                queryset = queryset.filter(
+                    Q(maturity_date__gt=maturity_date) |
+                    Q(maturity_date=maturity_date, id__gt=pk))
+
+        if reverse:
+            queryset = queryset.order_by("-maturity_date", "-id")
+        else:
+            queryset = queryset.order_by("maturity_date", "id")
+
+        # one more row tells if there is another page
+        page = list(queryset[:size + 1])
+        has_more = len(page) > size
+        page = page[:size]
+        if reverse:
+            page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = page
+        return page
+
+    def get_paginated_response(self, data: Any) -> Response:
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            size = int(request.query_params.get(self.page_size_query_param,
+                                                self.page_size))
+        except ValueError:
+            raise InvalidAttributeException("Invalid page size")
+        if size < 1:
+            raise InvalidAttributeException("Invalid page size")
+        return min(size, self.max_page_size)
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], True)
+
+    def encode_cursor(self, bond: Any, reverse: bool) -> str:
+        if isinstance(bond, dict):
+            # row of values() queryset
+            position = {"m": bond["maturity_date"].isoformat(),
+                        "i": bond["id"]}
+        else:
+            position = {"m": bond.maturity_date.isoformat(), "i": bond.id}
+        if reverse:
+            position["r"] = 1
+        cursor = base64.urlsafe_b64encode(
+            json.dumps(position, separators=(",", ":")).encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request: Request) -> Optional[tuple]:
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return (datetime.fromisoformat(position["m"]),
+                    int(position["i"]), bool(position.get("r")))
+        except (TypeError, ValueError, KeyError):
+            raise InvalidAttributeException("Invalid cursor")
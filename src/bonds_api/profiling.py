@@ -0,0 +1,229 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from collections import defaultdict
+from contextlib import ExitStack
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from asgiref.sync import async_to_sync
+from asgiref.sync import sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpRequest
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from settings import PROFILING_ENABLED
+from settings import PROFILING_HEADER
+from settings import PROFILING_DUMP_DIR
+
+logger = logging.getLogger(__name__)
+
+# order of metrics in Server-Timing header
+TIMINGS = ["db", "cdcp", "serialize", "render", "total"]
+
+
+class RequestProfile:
+    """
+        Time spent in parts of one request, in seconds
+        Parts may be timed from more threads (concurrent CDCP calls),
+        their times are summed
+    """
+    def __init__(self) -> None:
+        self.durations: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, name: str, duration: float) -> None:
+        with self._lock:
+            self.durations[name] += duration
+            self.counts[name] += 1
+
+    def query_wrapper(self, execute: Callable, sql: str, params: Any,
+                      many: bool, context: Dict) -> Any:
+        """
+            Database execute wrapper timing every query
+        """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add("db", time.perf_counter() - start)
+
+    def server_timing(self) -> str:
+        """
+            Value of Server-Timing header, durations in milliseconds
+        """
+        metrics = []
+        for name in TIMINGS:
+            if name not in self.durations:
+                continue
+            metric = "%s;dur=%.2f" % (name, self.durations[name] * 1000)
+            if name in ("db", "cdcp"):
+                metric += ';desc="%s calls"' % self.counts[name]
+            metrics.append(metric)
+        return ", ".join(metrics)
+
+    def as_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        for name in TIMINGS:
+            data["%s_ms" % name] = round(self.durations.get(name, 0.0) *
+                                         1000, 3)
+        data["db_queries"] = self.counts.get("db", 0)
+        data["cdcp_calls"] = self.counts.get("cdcp", 0)
+        return data
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = \
+    ContextVar("current_profile", default=None)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """
+        Add time of block to profile of current request, if it is profiled
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+
+
+class ProfilingMiddleware:
+    """
+        Profile requests with PROFILING_HEADER set by staff users
+        Time of database queries, CDCP calls, serialization and rendering
+        is returned in Server-Timing header and logged as JSON line,
+        header value "cprofile" also dumps cProfile stats of request
+        to PROFILING_DUMP_DIR (file name is in X-Profile-Dump header)
+        Request is profiled just when user of session or credentials
+        checked by default authentication classes is staff, user
+        authenticated by view is checked again after request and profile
+        of request which turns out not to be made by staff user is dropped
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        if not PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # served by ASGI, viz django.utils.deprecation.MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        mode = request.META.get(PROFILING_HEADER)
+        if not mode or not self.may_be_staff(request):
+            return self.get_response(request)
+        return self.profile(request, mode, self.get_response)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        mode = request.META.get(PROFILING_HEADER)
+        # user of session is read from database
+        if not mode or not await sync_to_async(self.may_be_staff)(request):
+            return await self.get_response(request)
+        # profiled request is handled in thread of sync ORM calls, so its
+        # queries go through wrappers of connections of that thread
+        return await sync_to_async(self.profile)(
+            request, mode, async_to_sync(self.get_response))
+
+    @staticmethod
+    def may_be_staff(request: HttpRequest) -> bool:
+        """
+            Check if request is made by staff user before it is handled,
+            so other users can not make server profile their requests
+        """
+        # user of session is resolved by AuthenticationMiddleware
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return user.is_staff
+        # credentials are checked as by views, which check them again
+        authenticators = [authenticator() for authenticator
+                          in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        try:
+            user = Request(request, authenticators=authenticators).user
+        except APIException:
+            return False
+        return user.is_authenticated and user.is_staff
+
+    def profile(self, request: HttpRequest, mode: str,
+                get_response: Callable) -> HttpResponse:
+        profile = RequestProfile()
+        profiler = cProfile.Profile() if mode == "cprofile" else None
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.query_wrapper))
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    response = get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            _current_profile.reset(token)
+        profile.add("total", time.perf_counter() - start)
+
+        user = getattr(request, "user", None)
+        if user is None or not user.is_staff:
+            return response
+
+        response["Server-Timing"] = profile.server_timing()
+        data = {"method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "user": user.id,
+                **profile.as_dict()}
+        if profiler is not None:
+            data["dump"] = self.dump(profiler)
+            response["X-Profile-Dump"] = data["dump"]
+        logger.info(json.dumps(data))
+        return response
+
+    def process_template_response(self, request: HttpRequest,
+                                  response: HttpResponse) -> HttpResponse:
+        # DRF responses are rendered after view returned
+        if _current_profile.get() is not None:
+            render = response.render
+
+            def timed_render() -> HttpResponse:
+                with timed("render"):
+                    return render()
+            response.render = timed_render
+        return response
+
+    @staticmethod
+    def dump(profiler: cProfile.Profile) -> str:
+        """
+            Write cProfile stats to PROFILING_DUMP_DIR, return file name
+        """
+        os.makedirs(PROFILING_DUMP_DIR, exist_ok=True)
+        name = "%s-%s.prof" % (time.strftime("%Y%m%d-%H%M%S"),
+                               uuid.uuid4().hex[:8])
+        profiler.dump_stats(os.path.join(PROFILING_DUMP_DIR, name))
+        return name
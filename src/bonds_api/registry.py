@@ -0,0 +1,103 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List
+
+from django.db import transaction
+
+from settings import ISIN_REGISTRY_BATCH_SIZE
+from bonds_api.isin import get_isin_error
+from bonds_api.models import IssuedISIN
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def iter_batches(records: Iterable[Any], batch_size: int) -> Iterator[List]:
+    """
+        Split stream of records to lists of batch_size records
+    """
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def is_issued_locally(isin: str) -> bool:
+    """
+        Check ISIN in local mirror of CDCP registry
+    """
+    return IssuedISIN.objects.filter(isin=isin).exists()
+
+
+def load_registry(records: Iterable[Dict[str, Any]], loaded_at: datetime,
+                  batch_size: int = ISIN_REGISTRY_BATCH_SIZE,
+                  isin_field: str = "isin",
+                  name_field: str = "name") -> Dict[str, int]:
+    """
+        Insert new and update changed ISINs of registry snapshot
+        Records are processed in batches, every batch in own transaction
+        Names of fields are case insensitive
+    """
+    isin_field = isin_field.lower()
+    name_field = name_field.lower()
+    stats = {"created": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+
+    for batch in iter_batches(records, batch_size):
+        names = {}
+        for record in batch:
+            record = {str(key).lower(): val for key, val in record.items()}
+            isin = record.get(isin_field)
+            if get_isin_error(isin):
+                logger.info("Skipping invalid ISIN %s", isin)
+                stats["skipped"] += 1
+                continue
+            names[isin] = str(record.get(name_field) or "")[:180]
+
+        with transaction.atomic():
+            _load_batch(names, loaded_at, stats)
+
+    return stats
+
+
+def _load_batch(names: Dict[str, str], loaded_at: datetime,
+                stats: Dict[str, int]) -> None:
+    existing = {issued.isin: issued for issued in
+                IssuedISIN.objects.filter(isin__in=names.keys())
+                .only("id", "isin", "name")}
+
+    new = []
+    changed = []
+    unchanged = []
+    for isin, name in names.items():
+        issued = existing.get(isin)
+        if issued is None:
+            new.append(IssuedISIN(isin=isin, name=name, loaded_at=loaded_at))
+        elif issued.name != name:
+            issued.name = name
+            issued.loaded_at = loaded_at
+            changed.append(issued)
+        else:
+            unchanged.append(isin)
+
+    IssuedISIN.objects.bulk_create(new)
+    IssuedISIN.objects.bulk_update(changed, ["name", "loaded_at"])
+    # remember that ISIN is still in registry
+    IssuedISIN.objects.filter(isin__in=unchanged).update(loaded_at=loaded_at)
+
+    stats["created"] += len(new)
+    stats["updated"] += len(changed)
+    stats["unchanged"] += len(unchanged)
+
+
+def prune_registry(loaded_at: datetime) -> int:
+    """
+        Delete ISINs which were not in snapshot loaded at loaded_at
+    """
+    deleted, _ = IssuedISIN.objects.filter(loaded_at__lt=loaded_at).delete()
+    return deleted
@@ -0,0 +1,66 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from typing import Any
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.renderers import JSONRenderer
+
+# optional packages, renderers are enabled in settings just when they are
+# installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+        JSON renderer using orjson, which encodes several times faster
+        than json module, used just for ?format=orjson
+        Output is compact UTF-8 JSON as of JSONRenderer, types unknown to
+        orjson (dates, lazy strings,...) are encoded by encoder of
+        JSONRenderer, but it is not byte for byte the same:
+        - floats in exponent form are written as 1e16 and 1e-7 instead
+          of 1e+16 and 1e-07 (the same numbers)
+        - NaN and infinity are rendered as null instead of raising error
+    """
+    format = "orjson"
+
+    def render(self, data: Any, accepted_media_type: str = None,
+               renderer_context: dict = None) -> bytes:
+        if data is None:
+            return b""
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        # orjson indents just by two spaces (browsable API)
+        if self.get_indent(accepted_media_type or "",
+                           renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        content = orjson.dumps(data, default=self.encoder_class().default,
+                               option=option)
+        # escaped by JSONRenderer, so JSON can be embedded in JavaScript
+        return content.replace("\u2028".encode(), b"\\u2028") \
+            .replace("\u2029".encode(), b"\\u2029")
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+        MessagePack renderer, compact binary format for clients which
+        send Accept: application/msgpack or ?format=msgpack
+    """
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+    encoder_class = JSONRenderer.encoder_class
+
+    def render(self, data: Any, accepted_media_type: str = None,
+               renderer_context: dict = None) -> bytes:
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=self.encoder_class().default,
+                             use_bin_type=True)
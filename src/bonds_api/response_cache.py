@@ -0,0 +1,152 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import hashlib
+import time
+import uuid
+
+from functools import partial
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+
+from settings import RESPONSE_CACHE_ENABLED
+from settings import RESPONSE_CACHE_ALIAS
+from settings import RESPONSE_CACHE_TTL
+from settings import RESPONSE_CACHE_LOCK_TIMEOUT
+from settings import RESPONSE_CACHE_LOCK_WAIT
+from bonds_api.models import Bond
+from bonds_api.utils import check_permisions
+from bonds_api.versions import get_version
+
+KEY_PREFIX = "bonds_api:response:"
+# seconds between checks of entry rendered by other worker
+POLL_INTERVAL = 0.05
+
+# status code, content type, body
+Entry = Tuple[int, str, bytes]
+
+
+def get_generation(user_id: int) -> str:
+    """
+        Return cache generation of user's responses
+    """
+    cache = caches[RESPONSE_CACHE_ALIAS]
+    key = "%sgeneration:%s" % (KEY_PREFIX, user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # random, so evicted generation never returns
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        generation = cache.get(key, "")
+    return generation
+
+
+def invalidate_responses(user_id: int) -> None:
+    """
+        Make cached responses of user unreachable, they expire later
+    """
+    caches[RESPONSE_CACHE_ALIAS].set("%sgeneration:%s" % (KEY_PREFIX,
+                                                          user_id),
+                                     uuid.uuid4().hex, timeout=None)
+
+
+@receiver(post_save, sender=Bond)
+@receiver(post_delete, sender=Bond)
+def bond_changed(sender, instance: Bond, **kwargs) -> None:
+    """
+        Bond changed also outside views (admin, shell, commands)
+        Responses are invalidated again after commit, so response
+        rendered meanwhile from data before commit is not kept
+    """
+    invalidate_responses(instance.user_id)
+    transaction.on_commit(partial(invalidate_responses, instance.user_id))
+
+
+def wait_for(key: str) -> Optional[Entry]:
+    """
+        Wait for entry rendered by worker holding lock
+    """
+    cache = caches[RESPONSE_CACHE_ALIAS]
+    deadline = time.monotonic() + RESPONSE_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def cached(method: Callable) -> Callable:
+    """
+        Cache rendered responses of view of user's bonds
+        Key consists of view, owner (user_id argument of view or logged
+        user), portfolio version and cache generation of owner, query
+        parameters and media type, so any change of owner's bonds makes
+        owner's entries unreachable. Missing entry is rendered by one
+        worker only (stampede protection), worker which waited for it
+        too long renders it itself. Browsable API is not cached, its
+        pages contain CSRF token
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        if not RESPONSE_CACHE_ENABLED or \
+                isinstance(request.accepted_renderer, BrowsableAPIRenderer):
+            return method(self, request, *args, **kwargs)
+
+        user_id = kwargs.get("user_id", request.user.id)
+        check_permisions(request.user, user_id)
+        # already read by conditional
+        version = getattr(request, "portfolio_version", None)
+        if version is None:
+            version, _ = get_version(user_id)
+        digest = hashlib.sha1(repr(
+            (sorted(request.query_params.lists()),
+             request.accepted_media_type)).encode()).hexdigest()
+        key = "%s%s:%s:%s:%s:%s" % (KEY_PREFIX, method.__qualname__,
+                                    user_id, version,
+                                    get_generation(user_id), digest)
+
+        cache = caches[RESPONSE_CACHE_ALIAS]
+        entry = cache.get(key)
+        if entry is None:
+            lock_key = key + ":lock"
+            locked = cache.add(lock_key, 1,
+                               timeout=RESPONSE_CACHE_LOCK_TIMEOUT)
+            if not locked:
+                entry = wait_for(key)
+            if entry is None:
+                try:
+                    return render_to_cache(
+                        self, key, method(self, request, *args, **kwargs),
+                        request, *args, **kwargs)
+                finally:
+                    if locked:
+                        cache.delete(lock_key)
+
+        status_code, content_type, content = entry
+        return HttpResponse(content, status=status_code,
+                            content_type=content_type)
+    return wrapper
+
+
+def render_to_cache(view, key: str, response: HttpResponse, request,
+                    *args, **kwargs) -> HttpResponse:
+    """
+        Render successful response of view and store it under key
+    """
+    if not isinstance(response, Response) or response.status_code != 200:
+        return response
+    response = view.finalize_response(request, response, *args, **kwargs)
+    response.render()
+    caches[RESPONSE_CACHE_ALIAS].set(
+        key, (response.status_code, response["Content-Type"],
+              response.content), timeout=RESPONSE_CACHE_TTL)
+    return response
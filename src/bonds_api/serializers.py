@@ -2,12 +2,26 @@
 # -*- codding: utf-8 -*-
 
 # todo/todo_api/serializers.py
+from datetime import timezone as dt_timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.utils import timezone
 from rest_framework import serializers
+from settings import USE_TZ
 from bonds_api.models import Bond
 
 
 class ChoiceField(serializers.ChoiceField):
 
+    def _set_choices(self, choices):
+        super()._set_choices(choices)
+        # label -> value, the first value wins for duplicate labels
+        self.label_to_value = {}
+        for key, val in self._choices.items():
+            self.label_to_value.setdefault(val, key)
+
+    choices = property(serializers.ChoiceField._get_choices, _set_choices)
+
     def to_representation(self, obj):
         if obj == "" and self.allow_blank:
             return obj
@@ -21,18 +35,86 @@ class ChoiceField(serializers.ChoiceField):
         if data == "" and self.allow_blank:
             return ""
 
-        for key, val in self._choices.items():
-            if val == data:
-                return key
-        self.fail('invalid_choice', input=data)
+        try:
+            return self.label_to_value[data]
+        except (KeyError, TypeError):
+            self.fail('invalid_choice', input=data)
 
 
 class BondSerializer(serializers.ModelSerializer):
     interest_payment_frequency = ChoiceField(
         choices=Bond.PaymentFrequency.choices)
+    validation_status = ChoiceField(choices=Bond.ValidationStatus.choices,
+                                    read_only=True)
 
     class Meta:
         model = Bond
         fields = ["emmision_name", "isin", "value", "interest",
                   "purchase_date", "maturity_date", "user",
-                  "interest_payment_frequency"]
+                  "interest_payment_frequency", "validation_status"]
+        # owner is set by view, so it is not fetched from database
+        read_only_fields = ["user"]
+
+
+FREQUENCY_LABELS = dict(Bond.PaymentFrequency.choices)
+STATUS_LABELS = dict(Bond.ValidationStatus.choices)
+UTC_ZONES = (dt_timezone.utc, timezone.utc)
+
+
+def serialize_bond_values(rows: Iterable[Dict[str, Any]],
+                          fields: Optional[List[str]] = None
+                          ) -> List[Dict[str, Any]]:
+    """
+        Read only BondSerializer of values() rows
+        Output is the same as of BondSerializer(many=True), but dicts are
+        built directly without field objects of ModelSerializer
+        parametr fields selects fields of output (all by default), rows
+        must contain just them
+    """
+    # the same conversion of dates as BondSerializer, time zone is
+    # resolved once per call instead of once per value
+    date_field = serializers.DateTimeField(
+        default_timezone=timezone.get_current_timezone() if USE_TZ else None)
+    date_to_representation = date_field.to_representation
+    if getattr(date_field, "timezone", None) in UTC_ZONES:
+        # dates are read from database in UTC, conversion to UTC
+        # would not change them
+        def date_to_representation(value, convert=date_to_representation):
+            if value.tzinfo in UTC_ZONES:
+                return value.isoformat()[:-6] + "Z"
+            return convert(value)
+    labels = FREQUENCY_LABELS
+    if fields is not None and fields != BondSerializer.Meta.fields:
+        converters = {
+            "emmision_name": lambda row: str(row["emmision_name"]),
+            "isin": lambda row: str(row["isin"]),
+            "value": lambda row: float(row["value"]),
+            "interest": lambda row: float(row["interest"]),
+            "purchase_date":
+            lambda row: date_to_representation(row["purchase_date"]),
+            "maturity_date":
+            lambda row: date_to_representation(row["maturity_date"]),
+            "user": lambda row: row["user"],
+            "interest_payment_frequency":
+            lambda row: labels.get(row["interest_payment_frequency"]) or
+            "Undefined",
+            "validation_status":
+            lambda row: STATUS_LABELS.get(row["validation_status"]) or
+            "Undefined",
+        }
+        selected = [(field, converters[field]) for field in fields]
+        return [{field: convert(row) for field, convert in selected}
+                for row in rows]
+    # literal dict of all fields is faster than converters
+    return [{"emmision_name": str(row["emmision_name"]),
+             "isin": str(row["isin"]),
+             "value": float(row["value"]),
+             "interest": float(row["interest"]),
+             "purchase_date": date_to_representation(row["purchase_date"]),
+             "maturity_date": date_to_representation(row["maturity_date"]),
+             "user": row["user"],
+             "interest_payment_frequency":
+             labels.get(row["interest_payment_frequency"]) or "Undefined",
+             "validation_status":
+             STATUS_LABELS.get(row["validation_status"]) or "Undefined"}
+            for row in rows]
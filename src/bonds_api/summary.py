@@ -0,0 +1,162 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from typing import Any, Dict, Iterable
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import QuerySet
+from django.db.models import Sum
+
+from bonds_api.models import Bond
+from bonds_api.models import PortfolioSummary
+from bonds_api.utils import get_number_of_payments
+from bonds_api.valuation import get_portfolio_future_value
+from bonds_api.valuation import load_portfolio
+from bonds_api.versions import bump_versions
+
+SUMMARY_FIELDS = ["count", "total_interest", "total_value", "future_value",
+                  "next_maturity", "next_maturity_date"]
+
+
+def get_future_value(bond: Bond) -> float:
+    """
+        Future value of bond at maturity date
+    """
+    number_of_payments = get_number_of_payments(
+        bond.purchase_date, bond.maturity_date,
+        bond.interest_payment_frequency)
+    return bond.value * (1.0 + bond.interest / 100) ** number_of_payments
+
+
+def get_counted_bonds(user_id: int) -> QuerySet:
+    """
+        Bonds of user counted in statistics and analytics
+        Bonds rejected by deferred validation are not counted,
+        pending ones are counted until they are rejected
+    """
+    return Bond.objects.filter(user=user_id) \
+        .exclude(validation_status=Bond.ValidationStatus.REJECTED)
+
+
+def is_counted(bond: Bond) -> bool:
+    return bond.validation_status != Bond.ValidationStatus.REJECTED
+
+
+def compute_summary(user_id: int) -> Dict[str, Any]:
+    """
+        Compute statistics of user's bonds from scratch
+    """
+    bond_list = get_counted_bonds(user_id)
+    stats = bond_list.aggregate(count=Count("id"),
+                                total_interest=Sum("interest"),
+                                total_value=Sum("value"))
+
+    next_maturity = bond_list.order_by("maturity_date", "id").first()
+
+    # future value needs number of payments of every bond
+    future_value = get_portfolio_future_value(load_portfolio(bond_list))
+
+    return {"count": stats["count"],
+            "total_interest": stats["total_interest"] or 0.0,
+            "total_value": stats["total_value"] or 0.0,
+            "future_value": future_value,
+            "next_maturity": next_maturity,
+            "next_maturity_date": next_maturity and
+            next_maturity.maturity_date}
+
+
+def rebuild_summary(user_id: int) -> PortfolioSummary:
+    """
+        Recompute and store statistics of user's bonds
+        Summary of user without bonds is not stored
+    """
+    data = compute_summary(user_id)
+    if not data["count"]:
+        PortfolioSummary.objects.filter(user_id=user_id).delete()
+        return PortfolioSummary(user_id=user_id, **data)
+
+    summary, _ = PortfolioSummary.objects.update_or_create(
+        user_id=user_id, defaults=data)
+    return summary
+
+
+def update_summary(user_id: int, added: Iterable[Bond] = (),
+                   removed: Iterable[Bond] = ()) -> PortfolioSummary:
+    """
+        Update statistics of user's bonds after bonds were changed
+        and increment version of user's portfolio
+        Must be called in transaction after changes were written,
+        changed bond is passed as removed (old state) and added (new state),
+        rejected bonds are skipped as they are not counted
+    """
+    added = [bond for bond in added if is_counted(bond)]
+    removed = [bond for bond in removed if is_counted(bond)]
+    with transaction.atomic():
+        bump_versions([user_id])
+        summary = PortfolioSummary.objects.select_for_update() \
+            .filter(user_id=user_id).first()
+        if summary is None:
+            # bonds created before summary existed must be counted too
+            return rebuild_summary(user_id)
+
+        summary.count += len(added) - len(removed)
+        for bond in added:
+            summary.total_interest += bond.interest
+            summary.total_value += bond.value
+            summary.future_value += get_future_value(bond)
+        for bond in removed:
+            summary.total_interest -= bond.interest
+            summary.total_value -= bond.value
+            summary.future_value -= get_future_value(bond)
+
+        removed_ids = {bond.id for bond in removed}
+        # deleted nearest bond is already unset by on_delete
+        if summary.next_maturity_id is None or \
+                summary.next_maturity_id in removed_ids or \
+                any(bond.id is None for bond in added):
+            # nearest bond is gone or changed, ask database
+            next_maturity = get_counted_bonds(user_id) \
+                .order_by("maturity_date", "id") \
+                .only("id", "maturity_date").first()
+            summary.next_maturity = next_maturity
+            summary.next_maturity_date = next_maturity and \
+                next_maturity.maturity_date
+        else:
+            for bond in added:
+                if summary.next_maturity_date is None or \
+                        (bond.maturity_date, bond.id) < \
+                        (summary.next_maturity_date,
+                         summary.next_maturity_id):
+                    summary.next_maturity_id = bond.id
+                    summary.next_maturity_date = bond.maturity_date
+
+        if summary.count <= 0:
+            summary.delete()
+            return PortfolioSummary(user_id=user_id)
+
+        summary.save(update_fields=SUMMARY_FIELDS)
+        return summary
+
+
+def check_summary(summary: PortfolioSummary,
+                  rel_tol: float = 1e-9) -> Dict[str, Any]:
+    """
+        Compare stored summary with statistics computed from scratch
+        Return dict of drifted fields: name -> (stored, computed)
+    """
+    data = compute_summary(summary.user_id)
+    data["next_maturity"] = data["next_maturity"] and data["next_maturity"].id
+    stored = {field: getattr(summary, field) for field in data
+              if field != "next_maturity"}
+    stored["next_maturity"] = summary.next_maturity_id
+
+    drift = {}
+    for field, value in data.items():
+        if isinstance(value, float):
+            if abs(stored[field] - value) > \
+                    rel_tol * max(abs(stored[field]), abs(value), 1.0):
+                drift[field] = (stored[field], value)
+        elif stored[field] != value:
+            drift[field] = (stored[field], value)
+    return drift
@@ -1,15 +1,27 @@
 #!python3
 # -*- codding: utf-8 -*-
 
-import requests
-
-from settings import CDCP_URL
+from settings import CDCP_DEGRADED_MODE
+from settings import ISIN_REGISTRY
+from settings import ISIN_REGISTRY_REMOTE_FALLBACK
+from settings import BULK_VALIDATION_WORKERS
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from datetime import datetime
+from datetime import timezone
+from django.db import connections
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
 from bonds_api.models import Bond
-from typing import Dict, Any
+from bonds_api.isin_cache import get_isin_cache
+from bonds_api.cdcp import CDCPUnavailableException
+from bonds_api.cdcp import get_cdcp_client
+from bonds_api.cdcp import get_async_cdcp_client
+from bonds_api.isin import get_isin_error
+from bonds_api.registry import is_issued_locally
+from typing import Dict, Any, Iterable, List, Optional
 
 import logging
 
@@ -46,15 +58,23 @@ def custom_exception_handler(exc: Exception, context: dict) -> Response:
         logger.info(exc.message)
         return Response(exc.message, status=status.HTTP_400_BAD_REQUEST)
 
+    if isinstance(exc, CDCPUnavailableException):
+        logger.warning(exc.message)
+        return Response(exc.message,
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
     response = exception_handler(exc, context)
     return response
 
 
 def check_attributes(data: Dict[str, Any], bond: Bond = None,
-                     update: bool = False) -> Dict[str, Any]:
+                     update: bool = False,
+                     check_isin: bool = True) -> Dict[str, Any]:
     """
         Check if the attributes are valid
         parametr update determines if all attributes are required
+        parametr check_isin determines if ISIN is validated against CDCP,
+        otherwise just its format is checked
     """
     res = {}
 
@@ -63,12 +83,14 @@ def check_attributes(data: Dict[str, Any], bond: Bond = None,
     if not update or emmision_name is not None:
         res["emmision_name"] = emmision_name
 
+    # dates are converted to UTC as stored in database, so summary
+    # updated from them is the same as computed from database
     # check if purchase date is valid
     purchase_dt = data.get("purchase_date")
     if not update or purchase_dt is not None:
         try:
-            res["purchase_date"] = datetime.strptime(purchase_dt,
-                                                     "%Y-%m-%dT%H:%M:%S%z")
+            res["purchase_date"] = datetime.strptime(
+                purchase_dt, "%Y-%m-%dT%H:%M:%S%z").astimezone(timezone.utc)
         except ValueError as e:
             raise InvalidAttributeException(
                 "Invalid purchase date: %s" % str(e))
@@ -79,8 +101,8 @@ def check_attributes(data: Dict[str, Any], bond: Bond = None,
     maturity_dt = data.get("maturity_date")
     if not update or maturity_dt is not None:
         try:
-            res["maturity_date"] = datetime.strptime(maturity_dt,
-                                                     "%Y-%m-%dT%H:%M:%S%z")
+            res["maturity_date"] = datetime.strptime(
+                maturity_dt, "%Y-%m-%dT%H:%M:%S%z").astimezone(timezone.utc)
         except ValueError as e:
             raise InvalidAttributeException(
                 "Invalid maturity date: %s" % str(e))
@@ -112,12 +134,10 @@ def check_attributes(data: Dict[str, Any], bond: Bond = None,
     # check if ISIN code is valid
     isin = data.get("isin")
     if not update or isin is not None:
-        url = CDCP_URL + isin
-        # validate aginst CDCP
-        result = requests.request("GET", url)
-        if result.status_code != 200:
-            logger.warning("ISIN code %s is not valid: %s", isin, result.text)
-            raise InvalidAttributeException("Invalid ISIN code")
+        if check_isin:
+            validate_isin(isin)
+        else:
+            check_isin_format(isin)
         res["isin"] = isin
 
     # check if interest payment frequency is valid
@@ -144,6 +164,121 @@ def check_attributes(data: Dict[str, Any], bond: Bond = None,
     return res
 
 
+def check_isin_format(isin: str) -> None:
+    """
+        Check format and check digit of ISIN code without request to CDCP
+    """
+    error = get_isin_error(isin)
+    if error:
+        raise InvalidAttributeException("Invalid ISIN code: %s" % error)
+
+
+def validate_isin(isin: str, fail_unavailable: bool = False) -> None:
+    """
+        Validate ISIN code against CDCP
+        Malformed ISINs are rejected locally without request to CDCP,
+        in mirror mode local copy of CDCP registry is checked first,
+        results are cached, so repeated ISINs do not hit CDCP again
+        Raises CDCPUnavailableException when CDCP can not answer,
+        unless degraded mode accepts ISIN, parametr fail_unavailable
+        determines if it is raised also in degraded mode
+    """
+    check_isin_format(isin)
+
+    if ISIN_REGISTRY == "mirror":
+        if is_issued_locally(isin):
+            return
+        if not ISIN_REGISTRY_REMOTE_FALLBACK:
+            logger.warning("ISIN code %s is not in registry mirror", isin)
+            raise InvalidAttributeException("Invalid ISIN code")
+
+    isin_cache = get_isin_cache()
+    valid = isin_cache.get(isin)
+    if valid is None:
+        # validate aginst CDCP
+        try:
+            valid = get_cdcp_client().is_issued(isin)
+        except CDCPUnavailableException:
+            if CDCP_DEGRADED_MODE != "accept" or fail_unavailable:
+                raise
+            # degraded mode, result is not cached
+            logger.warning("ISIN code %s accepted without validation", isin)
+            return
+        isin_cache.set(isin, valid)
+
+    if not valid:
+        logger.warning("ISIN code %s is not valid", isin)
+        raise InvalidAttributeException("Invalid ISIN code")
+
+
+async def avalidate_isin(isin: str) -> None:
+    """
+        Async variant of validate_isin for async views
+        CDCP is asked without blocking thread, mirror is checked
+        through sync_to_async
+    """
+    check_isin_format(isin)
+
+    if ISIN_REGISTRY == "mirror":
+        if await sync_to_async(is_issued_locally)(isin):
+            return
+        if not ISIN_REGISTRY_REMOTE_FALLBACK:
+            logger.warning("ISIN code %s is not in registry mirror", isin)
+            raise InvalidAttributeException("Invalid ISIN code")
+
+    isin_cache = get_isin_cache()
+    valid = await isin_cache.aget(isin)
+    if valid is None:
+        try:
+            valid = await get_async_cdcp_client().is_issued(isin)
+        except CDCPUnavailableException:
+            if CDCP_DEGRADED_MODE != "accept":
+                raise
+            logger.warning("ISIN code %s accepted without validation", isin)
+            return
+        await isin_cache.aset(isin, valid)
+
+    if not valid:
+        logger.warning("ISIN code %s is not valid", isin)
+        raise InvalidAttributeException("Invalid ISIN code")
+
+
+def validate_isins(isin_list: Iterable[str],
+                   max_workers: int = BULK_VALIDATION_WORKERS,
+                   fail_unavailable: bool = False
+                   ) -> Dict[str, Optional[str]]:
+    """
+        Validate distinct ISIN codes concurrently in bounded thread pool
+        Return dict ISIN -> error message, None for valid ISIN
+        parametr fail_unavailable determines if CDCPUnavailableException
+        is raised instead of being error of ISIN, also in degraded mode
+    """
+    def validate(isin: str) -> Optional[str]:
+        try:
+            validate_isin(isin, fail_unavailable)
+        except InvalidAttributeException as e:
+            return e.message
+        except CDCPUnavailableException as e:
+            if fail_unavailable:
+                raise
+            return e.message
+        finally:
+            # connection of worker thread would be left open otherwise
+            connections.close_all()
+        return None
+
+    isin_list = list(dict.fromkeys(isin_list))
+    if not isin_list:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(isin_list)),
+                            thread_name_prefix="isin-validation") as executor:
+        # context of request (its profile) is passed to workers
+        futures = [executor.submit(copy_context().run, validate, isin)
+                   for isin in isin_list]
+        return {isin: future.result()
+                for isin, future in zip(isin_list, futures)}
+
+
 def get_number_of_payments(start_date: datetime, end_date: datetime,
                            frequency: str) -> int:
     """
@@ -162,6 +297,56 @@ def get_number_of_payments(start_date: datetime, end_date: datetime,
         return 0
 
 
+def parse_datetime_param(value: Optional[str],
+                         name: str) -> Optional[datetime]:
+    """
+        Parse ISO date or datetime from query parameter
+        Datetime without time zone is taken as UTC
+    """
+    if value is None or value == "":
+        return None
+    try:
+        result = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError as e:
+        raise InvalidAttributeException("Invalid %s: %s" % (name, str(e)))
+    if result.tzinfo is None:
+        result = result.replace(tzinfo=timezone.utc)
+    return result
+
+
+def parse_limit_param(value: Optional[str], default: int,
+                      maximum: int) -> int:
+    """
+        Parse number of items on page from query parameter
+    """
+    if value is None or value == "":
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidAttributeException("Invalid limit: %s" % value)
+    if limit < 1:
+        raise InvalidAttributeException("Invalid limit: %s" % value)
+    return min(limit, maximum)
+
+
+def parse_fields_param(value: Optional[str],
+                       allowed: List[str]) -> List[str]:
+    """
+        Parse comma separated fields of response from query parameter
+        All allowed fields are returned when parameter is not given,
+        fields are ordered as allowed ones
+    """
+    if value is None or value == "":
+        return list(allowed)
+    fields = {field.strip() for field in value.split(",")} - {""}
+    unknown = fields - set(allowed)
+    if unknown or not fields:
+        raise InvalidAttributeException(
+            "Invalid fields: %s" % (", ".join(sorted(unknown)) or value))
+    return [field for field in allowed if field in fields]
+
+
 def check_permisions(user: Any, user_id: int) -> None:
     """
     Check if the user has permissions to access the data
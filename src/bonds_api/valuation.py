@@ -0,0 +1,142 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from typing import Dict, Sequence
+
+import numpy as np
+
+from django.db import connections
+from django.db.models import BigIntegerField
+from django.db.models import Func
+from django.db.models import QuerySet
+
+VALUATION_FIELDS = ["value", "interest", "purchase_date", "maturity_date",
+                    "interest_payment_frequency"]
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+NAIVE_EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def to_datetime64(dates: Sequence[datetime]) -> np.ndarray:
+    """
+        Convert datetimes to datetime64 array
+        Aware datetimes are converted to UTC, as they come from database
+    """
+    epoch = EPOCH if dates and dates[0].tzinfo is not None else NAIVE_EPOCH
+    # integer microseconds are exact, unlike timestamps
+    return np.fromiter(((date - epoch) // MICROSECOND for date in dates),
+                       dtype=np.int64, count=len(dates)) \
+        .view("datetime64[us]")
+
+
+class EpochMicroseconds(Func):
+    """
+        Microseconds of datetime column since 1970-01-01 (UTC as dates are
+        stored in UTC), so dates are read without datetime objects
+        Supported by SQLite and PostgreSQL, see EPOCH_VENDORS
+    """
+    output_field = BigIntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # stored as text "YYYY-MM-DD HH:MM:SS[.ffffff]", seconds and
+        # padded fraction are read separately, so microseconds are exact
+        # unlike of julianday()
+        template = "(CAST(strftime('%%%%s', substr(%(expressions)s, 1, 19)) " \
+                   "AS INTEGER) * 1000000 + " \
+                   "CAST(substr(%(expressions)s || '.000000', 21, 6) " \
+                   "AS INTEGER))"
+        return self.as_sql(compiler, connection, template=template,
+                           **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        template = "(EXTRACT(EPOCH FROM %(expressions)s) * 1000000)::bigint"
+        return self.as_sql(compiler, connection, template=template,
+                           **extra_context)
+
+
+EPOCH_VENDORS = {"sqlite", "postgresql"}
+
+
+def load_portfolio(queryset: QuerySet,
+                   extra_fields: Sequence[str] = ()) -> Dict[str, np.ndarray]:
+    """
+        Read bonds of queryset as column arrays
+        Extra fields are returned as object arrays
+    """
+    fields: list = VALUATION_FIELDS + list(extra_fields)
+    epoch_dates = connections[queryset.db].vendor in EPOCH_VENDORS
+    if epoch_dates:
+        # conversion of datetimes one by one would take longer than
+        # whole valuation
+        fields[2:4] = [EpochMicroseconds(field) for field in fields[2:4]]
+    rows = list(queryset.values_list(*fields))
+    if not rows:
+        columns: Sequence = [[] for _ in fields]
+    else:
+        columns = list(zip(*rows))
+    if epoch_dates:
+        purchase_date = np.array(columns[2], dtype=np.int64) \
+            .view("datetime64[us]")
+        maturity_date = np.array(columns[3], dtype=np.int64) \
+            .view("datetime64[us]")
+    else:
+        purchase_date = to_datetime64(columns[2])
+        maturity_date = to_datetime64(columns[3])
+    portfolio = {"value": np.array(columns[0], dtype=np.float64),
+                 "interest": np.array(columns[1], dtype=np.float64),
+                 "purchase_date": purchase_date,
+                 "maturity_date": maturity_date,
+                 "frequency": np.array(columns[4], dtype="U1")}
+    for field, column in zip(extra_fields, columns[len(VALUATION_FIELDS):]):
+        portfolio[field] = np.array(column, dtype=object)
+    return portfolio
+
+
+def get_numbers_of_payments(purchase_date: np.ndarray,
+                            maturity_date: np.ndarray,
+                            frequency: np.ndarray) -> np.ndarray:
+    """
+        Vectorized get_number_of_payments
+        Dates are datetime64 arrays, frequency array of codes D, W, M, Y
+    """
+    purchase_date = np.asarray(purchase_date, dtype="datetime64[us]")
+    maturity_date = np.asarray(maturity_date, dtype="datetime64[us]")
+    frequency = np.asarray(frequency)
+
+    # floor division, the same as timedelta.days
+    days = (maturity_date - purchase_date) // np.timedelta64(1, "D")
+    # months since 1970-01, years are derived from them
+    maturity_month = maturity_date.astype("datetime64[M]").astype(np.int64)
+    purchase_month = purchase_date.astype("datetime64[M]").astype(np.int64)
+    months = maturity_month - purchase_month
+    years = maturity_month // 12 - purchase_month // 12
+
+    return np.select([frequency == "D", frequency == "W",
+                      frequency == "M", frequency == "Y"],
+                     [days, days // 7, months, years], 0).astype(np.int64)
+
+
+def get_future_values(value: np.ndarray, interest: np.ndarray,
+                      number_of_payments: np.ndarray) -> np.ndarray:
+    """
+        Future values of bonds at maturity date
+    """
+    value = np.asarray(value, dtype=np.float64)
+    interest = np.asarray(interest, dtype=np.float64)
+    return value * (1.0 + interest / 100) ** number_of_payments
+
+
+def get_portfolio_future_value(portfolio: Dict[str, np.ndarray]) -> float:
+    """
+        Sum of future values of bonds loaded by load_portfolio
+    """
+    number_of_payments = get_numbers_of_payments(portfolio["purchase_date"],
+                                                 portfolio["maturity_date"],
+                                                 portfolio["frequency"])
+    return float(get_future_values(portfolio["value"], portfolio["interest"],
+                                   number_of_payments).sum())
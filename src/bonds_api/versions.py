@@ -0,0 +1,103 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from datetime import datetime
+from functools import partial
+from functools import wraps
+from typing import Callable, Iterable, Optional, Tuple
+
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.cache import patch_cache_control
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+
+from bonds_api.models import Bond
+from bonds_api.models import PortfolioVersion
+from bonds_api.utils import check_permisions
+
+
+def bump_versions(user_ids: Iterable[int]) -> None:
+    """
+        Increment portfolio versions of users after their bonds changed
+        Must be called in transaction which changed bonds
+    """
+    now = timezone.now()
+    for user_id in sorted(set(user_ids)):
+        versions = PortfolioVersion.objects.filter(user_id=user_id)
+        if versions.update(version=F("version") + 1, modified_at=now):
+            continue
+        try:
+            with transaction.atomic():
+                PortfolioVersion.objects.create(user_id=user_id, version=1,
+                                                modified_at=now)
+        except IntegrityError:
+            # created by concurrent transaction meanwhile
+            versions.update(version=F("version") + 1, modified_at=now)
+
+
+@receiver(post_save, sender=Bond)
+@receiver(post_delete, sender=Bond)
+def bond_changed(sender, instance: Bond, raw: bool = False,
+                 **kwargs) -> None:
+    """
+        Bond changed also outside views (admin, shell, commands), so ETag
+        of stale response does not match
+        Version is incremented after commit, changes made by views
+        increment it once more, which does not matter
+    """
+    # owner may not be loaded yet by loaddata
+    if raw:
+        return
+    transaction.on_commit(partial(bump_versions, [instance.user_id]))
+
+
+def get_version(user_id: int) -> Tuple[int, Optional[datetime]]:
+    """
+        Return portfolio version of user and time of its last change,
+        version 0 for user whose bonds were never changed
+    """
+    row = PortfolioVersion.objects.filter(user_id=user_id) \
+        .values_list("version", "modified_at").first()
+    return row or (0, None)
+
+
+def conditional(method: Callable) -> Callable:
+    """
+        Conditional GET of view of user's bonds
+        Response depends just on bonds of owner (user_id argument of view
+        or logged user), so its ETag and Last-Modified are derived from
+        portfolio version. When client has current version, 304 is
+        returned without querying and serializing bonds
+        If-Modified-Since is not answered, Last-Modified has resolution
+        of seconds and would miss change made in the same second
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        user_id = kwargs.get("user_id", request.user.id)
+        # version of other user is not disclosed
+        check_permisions(request.user, user_id)
+
+        version, modified_at = get_version(user_id)
+        # cached response is looked up by version too
+        request.portfolio_version = version
+        etag = 'W/"%s-%s"' % (user_id, version)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = method(self, request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if modified_at:
+                response["Last-Modified"] = http_date(
+                    modified_at.timestamp())
+        # responses differ by user and by renderer
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ["Accept"])
+        return response
+    return wrapper
@@ -13,6 +13,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 from typing import List
 
@@ -50,14 +51,26 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "EXCEPTION_HANDLER": "bonds_api.utils.custom_exception_handler",
+    # renderers of optional packages are used when they are installed,
+    # the first one is used when client accepts any media type, orjson
+    # just for ?format=orjson as its output differs from JSONRenderer
+    "DEFAULT_RENDERER_CLASSES": [
+        renderer for renderer, package in [
+            ("rest_framework.renderers.JSONRenderer", None),
+            ("bonds_api.renderers.ORJSONRenderer", "orjson"),
+            ("rest_framework.renderers.BrowsableAPIRenderer", None),
+            ("bonds_api.renderers.MessagePackRenderer", "msgpack"),
+        ] if package is None or find_spec(package) is not None],
 }
 
 MIDDLEWARE = [
+    "bonds_api.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "bonds_api.profiling.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -94,8 +107,145 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # ISIN validation results of "django" ISIN cache backend, it is cleared
+    # as whole, so it must not be shared with other caches
+    "isin": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "isin",
+    },
+    # rendered responses, file based cache
+    # ("django.core.cache.backends.filebased.FileBasedCache" with directory
+    # in "LOCATION") is shared by worker processes of one host
+    "responses": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "responses",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+
 CDCP_URL = "https://www.cdcp.cz/isbpublicjson/api/VydaneISINy?isin="
 
+# CDCP client
+# seconds
+CDCP_CONNECT_TIMEOUT = 3.05
+CDCP_READ_TIMEOUT = 5
+# number of keep-alive connections
+CDCP_POOL_SIZE = 10
+# number of concurrent connections of async views (ASGI)
+CDCP_ASYNC_MAX_CONNECTIONS = 100
+CDCP_MAX_RETRIES = 2
+# seconds, base and maximum of exponential backoff with jitter
+CDCP_RETRY_BACKOFF = 0.2
+CDCP_RETRY_BACKOFF_MAX = 2
+# circuit breaker opens when ratio of failed requests in last
+# CDCP_BREAKER_WINDOW requests crosses CDCP_BREAKER_ERROR_RATE and stays
+# open for CDCP_BREAKER_RESET_TIMEOUT seconds
+CDCP_BREAKER_WINDOW = 20
+CDCP_BREAKER_MIN_CALLS = 5
+CDCP_BREAKER_ERROR_RATE = 0.5
+CDCP_BREAKER_RESET_TIMEOUT = 30
+# concurrent lookups of the same ISIN in process wait for one CDCP request,
+# number of ISINs in flight and seconds of waiting for result are bounded
+CDCP_COALESCE_MAX_KEYS = 1000
+CDCP_COALESCE_TIMEOUT = 10
+# behaviour when CDCP is unavailable
+# "reject" - fail fast with 503, "accept" - accept ISIN without validation
+CDCP_DEGRADED_MODE = "reject"
+
+# Validation of ISINs against CDCP registry
+# "remote" - CDCP API, "mirror" - local mirror of registry loaded by
+# load_cdcp_registry management command
+ISIN_REGISTRY = "remote"
+# in mirror mode ISINs missing in mirror are checked in CDCP API
+ISIN_REGISTRY_REMOTE_FALLBACK = True
+ISIN_REGISTRY_BATCH_SIZE = 1000
+
+# Validation of ISINs of created bonds
+# "sync" - bond is saved after its ISIN is validated, "deferred" - bond is
+# saved as pending and 202 is returned, ISIN is validated later by
+# validate_bonds management command
+ISIN_VALIDATION_MODE = "sync"
+# number of pending bonds validated at once by validate_bonds command
+VALIDATION_BATCH_SIZE = 500
+# seconds, validate_bonds command waits when no bond is pending
+VALIDATION_POLL_INTERVAL = 5
+# seconds, validate_bonds command waits before retry when CDCP is unavailable
+VALIDATION_RETRY_DELAY = 30
+
+# Cache of ISIN validation results
+# "local" - in-process LRU cache, "django" - Django cache framework
+# (CACHES[ISIN_CACHE_ALIAS]) which can be shared by all workers, alias
+# must be dedicated to ISINs as it is cleared as whole
+ISIN_CACHE_BACKEND = "local"
+ISIN_CACHE_ALIAS = "isin"
+ISIN_CACHE_MAX_SIZE = 10000
+# seconds
+ISIN_CACHE_POSITIVE_TTL = 24 * 60 * 60
+ISIN_CACHE_NEGATIVE_TTL = 5 * 60
+
+# Cache of rendered responses of bond list and user endpoint
+# (CACHES[RESPONSE_CACHE_ALIAS]), entries of user are invalidated by every
+# change of user's bonds
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_ALIAS = "responses"
+# seconds
+RESPONSE_CACHE_TTL = 5 * 60
+# seconds, missing entry is rendered by one worker holding lock, others
+# wait for it at most RESPONSE_CACHE_LOCK_WAIT seconds
+RESPONSE_CACHE_LOCK_TIMEOUT = 30
+RESPONSE_CACHE_LOCK_WAIT = 2
+
+# Pagination of bond list
+BOND_LIST_PAGE_SIZE = 100
+BOND_LIST_MAX_PAGE_SIZE = 1000
+
+# Pagination of cash flow schedules
+CASHFLOW_PAGE_SIZE = 100
+CASHFLOW_MAX_PAGE_SIZE = 1000
+
+# Number of bonds read from database at once by export
+EXPORT_CHUNK_SIZE = 2000
+
+# Bulk endpoints
+# maximal number of bonds in one request
+BULK_MAX_SIZE = 10000
+# number of threads validating ISINs of one request
+BULK_VALIDATION_WORKERS = 16
+# number of rows of file imported by import_bonds command at once
+IMPORT_BATCH_SIZE = 1000
+
+# Profiling of requests of staff users, viz bonds_api.profiling
+PROFILING_ENABLED = False
+# request header X-Profile: 1 (or cprofile to dump cProfile stats)
+PROFILING_HEADER = "HTTP_X_PROFILE"
+PROFILING_DUMP_DIR = str(BASE_DIR / "profiles")
+
+# Prometheus metrics, viz bonds_api.metrics
+METRICS_ENABLED = True
+# directory shared by worker processes of one host, metrics endpoint
+# sums values of all of them, None for single process server, it should
+# be cleared by clear_metrics command before server is started
+METRICS_DIR = None
+# addresses of clients allowed to read metrics endpoint (Prometheus),
+# None allows all, endpoint must not be exposed publicly
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]
+# how often process writes its values to METRICS_DIR in seconds
+METRICS_FLUSH_INTERVAL = 1.0
+# upper bounds of latency histogram buckets in seconds
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+
+# Yield to maturity solver
+YTM_MAX_ITERATIONS = 50
+YTM_TOLERANCE = 1e-12
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
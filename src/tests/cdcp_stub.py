@@ -0,0 +1,86 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+
+class CDCPStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        isin = parse_qs(urlparse(self.path).query).get("isin", [""])[0]
+        with server.lock:
+            server.requests.append(isin)
+            server.clients.add(self.client_address)
+            status = server.statuses.pop(0) if server.statuses else None
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        if server.delay:
+            time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+        if status is None:
+            status = 200 if server.issue_all or isin in server.issued \
+                else 404
+        body = b"[]"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CDCPStubServer(ThreadingHTTPServer):
+    """
+        Local stub of CDCP API for tests
+        ISINs in issued answer 200, others 404 (all answer 200 with
+        issue_all), statuses are used for next requests before that,
+        delay slows down every answer, max_active is the highest number
+        of requests handled at once
+    """
+    daemon_threads = True
+    block_on_close = False
+
+    def __init__(self, issued=(), delay=0.0, issue_all=False):
+        super().__init__(("127.0.0.1", 0), CDCPStubHandler)
+        self.issued = set(issued)
+        self.issue_all = issue_all
+        self.delay = delay
+        self.statuses = []
+        self.requests = []
+        self.clients = set()
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+
+    def handle_error(self, request, client_address):
+        # client which gave up waiting is expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%s/api/VydaneISINy?isin=" % \
+            self.server_address[1]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,151 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import random
+
+from datetime import datetime
+from datetime import timezone
+
+import numpy as np
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from bonds_api.models import Bond
+from bonds_api.analytics import price
+from bonds_api.analytics import solve_yield
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def scalar_price(coupon, principal, periods, rate):
+    """
+        Discount every cash flow one by one
+    """
+    present_value = 0.0
+    weighted = 0.0
+    for period in range(1, periods + 1):
+        cashflow = coupon + (principal if period == periods else 0.0)
+        discounted = cashflow / (1 + rate) ** period
+        present_value += discounted
+        weighted += period * discounted
+    return present_value, weighted
+
+
+class AnalyticsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("test", "test")
+        self.client.force_authenticate(self.user)
+
+    def add_bond(self, isin, frequency, maturity_date, interest=2.0):
+        return Bond.objects.create(emmision_name="Bond", isin=isin,
+                                   value=100.0, interest=interest,
+                                   purchase_date=utc(2020, 1, 1),
+                                   maturity_date=maturity_date,
+                                   interest_payment_frequency=frequency,
+                                   user=self.user)
+
+    def test_price(self):
+        """
+        Ensure closed form price matches discounting of cash flows.
+        """
+        rnd = random.Random(42)
+        for _ in range(200):
+            args = (rnd.uniform(0, 10), rnd.uniform(1, 1000),
+                    rnd.randrange(1, 400), rnd.choice([0.0, 1e-9, 1e-6,
+                                                       rnd.uniform(-0.5, 1)]))
+            expected = scalar_price(*args)
+            result = price(*(np.array([arg]) for arg in args))
+            self.assertAlmostEqual(result[0][0] / expected[0], 1.0, places=9)
+            self.assertAlmostEqual(result[1][0] / expected[1], 1.0, places=7)
+
+    def test_solve_yield(self):
+        """
+        Ensure solved yields reprice bonds and bonds without solution
+        are reported.
+        """
+        rnd = random.Random(7)
+        size = 1000
+        coupon = np.array([rnd.uniform(0, 10) for _ in range(size)])
+        principal = np.full(size, 100.0)
+        periods = np.array([rnd.randrange(1, 400) for _ in range(size)])
+        rate = np.array([rnd.uniform(-0.02, 0.2) for _ in range(size)])
+        target, _ = price(coupon, principal, periods, rate)
+
+        result, solved = solve_yield(coupon, principal, periods, target)
+        self.assertTrue(solved.all())
+        repriced, _ = price(coupon, principal, periods, result)
+        np.testing.assert_allclose(repriced, target, rtol=1e-9)
+
+        # bisection finds the same yields
+        result, solved = solve_yield(coupon, principal, periods, target,
+                                     max_iterations=0)
+        self.assertTrue(solved.all())
+        np.testing.assert_allclose(result, rate, atol=1e-12)
+
+        # price is out of bisection bounds
+        result, solved = solve_yield(np.array([1.0]), np.array([100.0]),
+                                     np.array([5]), np.array([1e-20]),
+                                     max_iterations=0)
+        self.assertFalse(solved[0])
+
+    def test_analytics(self):
+        """
+        Ensure bonds are priced at discount rate and YTM of price is found.
+        """
+        self.add_bond("CZ0003551251", "Y", utc(2030, 1, 1))
+        self.add_bond("CZ0003551269", "M", utc(2025, 1, 1), interest=0.5)
+        self.add_bond("CZ0003551277", "Y", utc(2021, 1, 1))
+        url = reverse("bond-analytics")
+        response = self.client.post(url, {"discount_rate": 2.0,
+                                          "prices": {"CZ0003551251": 90.0},
+                                          "as_of": "2022-06-01"},
+                                    format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {result["isin"]: result
+                   for result in response.data["results"]}
+
+        # coupon equal to discount rate is priced at par
+        annual = results["CZ0003551251"]
+        self.assertAlmostEqual(annual["present_value"], 100.0)
+        self.assertIsNone(annual["error"])
+        # 90.0 is under par, so yield is over coupon
+        self.assertGreater(annual["ytm"], 2.0)
+        expected_ytm, _ = solve_yield(np.array([2.0]), np.array([100.0]),
+                                      np.array([8]), np.array([90.0]))
+        self.assertAlmostEqual(annual["ytm"], expected_ytm[0] * 100)
+        # Macaulay duration of par bond with 8 remaining years
+        expected_pv, weighted = scalar_price(2.0, 100.0, 8, 0.02)
+        self.assertAlmostEqual(annual["duration"], weighted / expected_pv)
+        self.assertAlmostEqual(annual["modified_duration"],
+                               weighted / expected_pv / 1.02)
+
+        # price defaults to value, monthly rate is compounded monthly
+        monthly = results["CZ0003551269"]
+        self.assertAlmostEqual(monthly["ytm"], 6.0)
+        expected_pv, _ = scalar_price(0.5, 100.0, 31, 0.02 / 12)
+        self.assertAlmostEqual(monthly["present_value"], expected_pv)
+
+        matured = results["CZ0003551277"]
+        self.assertEqual(matured["error"], "Bond has no remaining payments")
+        self.assertIsNone(matured["present_value"])
+        self.assertIsNone(matured["ytm"])
+
+        self.assertAlmostEqual(response.data["total_present_value"],
+                               annual["present_value"] +
+                               monthly["present_value"])
+
+    def test_analytics_invalid(self):
+        """
+        Ensure invalid parameters are rejected.
+        """
+        url = reverse("bond-analytics")
+        response = self.client.post(url, {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {"discount_rate": 1.0,
+                                          "prices": [1.0]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,171 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from rest_framework import status
+from bonds_api.models import Bond
+from bonds_api.models import PortfolioSummary
+from bonds_api.cdcp import AsyncCDCPClient
+from bonds_api.cdcp import CDCPClient
+from bonds_api.cdcp import CircuitBreaker
+from bonds_api.isin import get_check_digit
+from bonds_api.isin_cache import get_isin_cache
+
+from cdcp_stub import CDCPStubServer
+from unittest.mock import patch
+
+
+def make_isin(number: int) -> str:
+    payload = "CZ%09d" % number
+    return payload + str(get_check_digit(payload))
+
+
+def make_bond_data(isin: str) -> dict:
+    return {"emmision_name": "Bond %s" % isin,
+            "isin": isin,
+            "value": 11.5,
+            "interest": 2.8,
+            "purchase_date": "2024-06-16T12:00:00Z",
+            "maturity_date": "2025-06-16T12:00:00Z",
+            "interest_payment_frequency": "Yearly",
+            }
+
+
+class AsyncBondsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("test", "test")
+        self.client.force_login(self.user)
+        self.async_client.cookies = self.client.cookies
+        get_isin_cache().clear()
+
+    def use_stub(self, server: CDCPStubServer) -> None:
+        """
+            Send requests of sync and async views to CDCP stub
+        """
+        breaker = CircuitBreaker()
+        client = CDCPClient(url=server.url, backoff=0, max_retries=0,
+                            breaker=breaker)
+        self.addCleanup(client.close)
+        async_client = AsyncCDCPClient(url=server.url, backoff=0,
+                                       max_retries=0, breaker=breaker)
+        for target, value in (("bonds_api.utils.get_cdcp_client", client),
+                              ("bonds_api.utils.get_async_cdcp_client",
+                               async_client)):
+            patcher = patch(target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def post_all(self, url: str, isins: list) -> list:
+        return await asyncio.gather(*[
+            self.async_client.post(url, make_bond_data(isin),
+                                   content_type="application/json")
+            for isin in isins])
+
+    async def test_concurrency(self):
+        """
+        Ensure async view keeps requests in flight while CDCP is slow
+        and sync view handles them one by one.
+        """
+        number = 8
+        with CDCPStubServer(issue_all=True, delay=0.25) as server:
+            self.use_stub(server)
+            responses = await self.post_all(
+                reverse("bond-list-async"),
+                [make_isin(i) for i in range(number)])
+            self.assertEqual([response.status_code for response
+                              in responses],
+                             [status.HTTP_201_CREATED] * number)
+            self.assertEqual(server.max_active, number)
+
+            server.max_active = 0
+            responses = await self.post_all(
+                reverse("bond-list"),
+                [make_isin(i) for i in range(number, 2 * number)])
+            self.assertEqual([response.status_code for response
+                              in responses],
+                             [status.HTTP_201_CREATED] * number)
+            self.assertEqual(server.max_active, 1)
+
+        self.assertEqual(await sync_to_async(Bond.objects.count)(),
+                         2 * number)
+        summary = await sync_to_async(PortfolioSummary.objects.get)(
+            user=self.user)
+        self.assertEqual(summary.count, 2 * number)
+
+    async def test_create_invalid(self):
+        """
+        Ensure async view rejects unknown ISIN and unavailable CDCP.
+        """
+        with CDCPStubServer(issued=[make_isin(1)]) as server:
+            self.use_stub(server)
+            response = await self.async_client.post(
+                reverse("bond-list-async"), make_bond_data(make_isin(2)),
+                content_type="application/json")
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json(), "Invalid ISIN code")
+
+            server.statuses = [500]
+            response = await self.async_client.post(
+                reverse("bond-list-async"), make_bond_data(make_isin(1)),
+                content_type="application/json")
+            self.assertEqual(response.status_code,
+                             status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(await sync_to_async(Bond.objects.count)(), 0)
+
+        self.async_client.cookies.clear()
+        response = await self.async_client.post(
+            reverse("bond-list-async"), make_bond_data(make_isin(1)),
+            content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_update(self):
+        """
+        Ensure async view updates bond and validates its new ISIN.
+        """
+        with CDCPStubServer(issued=[make_isin(1), make_isin(3)]) as server:
+            self.use_stub(server)
+            response = await self.async_client.post(
+                reverse("bond-list-async"), make_bond_data(make_isin(1)),
+                content_type="application/json")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+            url = reverse("bond-detail-async", args=[make_isin(1)])
+            response = await self.async_client.patch(
+                url, {"isin": make_isin(2)}, content_type="application/json")
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json(), "Invalid ISIN code")
+
+            # ISIN of bond can not be changed
+            response = await self.async_client.patch(
+                url, {"isin": make_isin(3)}, content_type="application/json")
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json(), "Invalid attribute")
+
+            response = await self.async_client.patch(
+                url, {"value": 20.5}, content_type="application/json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()["value"], 20.5)
+
+            response = await self.async_client.patch(
+                reverse("bond-detail-async", args=[make_isin(3)]),
+                {"value": 30.5}, content_type="application/json")
+            self.assertEqual(response.status_code,
+                             status.HTTP_404_NOT_FOUND)
+
+            # sync methods are served by async view too
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()["value"], 20.5)
+
+        summary = await sync_to_async(PortfolioSummary.objects.get)(
+            user=self.user)
+        self.assertEqual(summary.total_value, 20.5)
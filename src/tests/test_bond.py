@@ -1,13 +1,22 @@
 #!python3
 # -*- codding: utf-8 -*-
 
+import csv
+import io
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
 
 from rest_framework import status
 from rest_framework.test import APITestCase
 from bonds_api.models import Bond
+from bonds_api.isin_cache import get_isin_cache
+from bonds_api.cdcp import CDCPUnavailableException
 
+from unittest.mock import Mock
 from unittest.mock import patch
 
 
@@ -15,6 +24,7 @@ class BondsTests(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user("test", "test")
         self.client.force_authenticate(self.user)
+        get_isin_cache().clear()
 
     def test_get_bond_list(self):
         """
@@ -26,7 +36,117 @@ class BondsTests(APITestCase):
         self.assertEqual(Bond.objects.count(), 1)
         self.assertEqual(Bond.objects.get().emmision_name, "Bond Valid ISIN")
 
-    @patch('bonds_api.utils.requests.request')
+    def test_get_bond_list_pages(self):
+        """
+        Ensure bond list is paginated by maturity date in both directions.
+        """
+        for i, year in enumerate([2030, 2026, 2028, 2026, 2027]):
+            Bond.objects.create(emmision_name="Bond %s" % i,
+                                isin="CZ%010d" % i,
+                                value=10.0, interest=2.0,
+                                purchase_date="2024-06-16T12:00:00Z",
+                                maturity_date="%s-06-16T12:00:00Z" % year,
+                                interest_payment_frequency="Y",
+                                user=self.user)
+        url = reverse("bond-list") + "?page_size=2"
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([bond["isin"][-1] for bond in
+                          response.data["results"]])
+            url = response.data["next"]
+        self.assertEqual(pages, [["1", "3"], ["4", "2"], ["0"]])
+
+        response = self.client.get(response.data["previous"])
+        self.assertEqual([bond["isin"][-1] for bond in
+                          response.data["results"]], ["4", "2"])
+        response = self.client.get(response.data["previous"])
+        self.assertEqual([bond["isin"][-1] for bond in
+                          response.data["results"]], ["1", "3"])
+        self.assertIsNone(response.data["previous"])
+
+        response = self.client.get(reverse("bond-list") + "?cursor=x")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_bonds(self):
+        """
+        Ensure bonds are exported as NDJSON and CSV.
+        """
+        self.test_add_bond()
+        bond_data = self.client.get(reverse("bond-list")).data["results"]
+
+        response = self.client.get(reverse("bond-export", args=["ndjson"]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], bond_data)
+
+        response = self.client.get(reverse("bond-export", args=["csv"]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.DictReader(io.StringIO(
+            b"".join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["isin"], "CZ0003551251")
+        self.assertEqual(rows[0]["interest_payment_frequency"], "Yearly")
+
+        response = self.client.get(reverse("bond-export", args=["xml"]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_accept(self):
+        """
+        Ensure export is not refused for Accept header of its format.
+        """
+        self.test_add_bond()
+        for export_format, media_type in [("csv", "text/csv"),
+                                          ("ndjson", "application/x-ndjson")]:
+            response = self.client.get(
+                reverse("bond-export", args=[export_format]),
+                HTTP_ACCEPT=media_type)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response["Content-Type"], media_type)
+            self.assertIn(b"CZ0003551251",
+                          b"".join(response.streaming_content))
+
+        response = self.client.get(reverse("bond-export", args=["xml"]),
+                                   HTTP_ACCEPT="text/csv")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse("bond-export", args=["csv"]),
+                                   {"fields": "x"}, HTTP_ACCEPT="text/csv")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), "Invalid fields: x")
+
+    def test_bond_fields(self):
+        """
+        Ensure just selected fields are read and returned.
+        """
+        self.test_add_bond()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("bond-list"),
+                                       {"fields": "value,isin"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"],
+                         [{"isin": "CZ0003551251", "value": 11.5}])
+        self.assertNotIn("emmision_name", queries[-1]["sql"])
+
+        response = self.client.get(
+            reverse("bond-detail", args=["CZ0003551251"]),
+            {"fields": "isin,maturity_date"})
+        self.assertEqual(response.data, {
+            "isin": "CZ0003551251",
+            "maturity_date": "2025-06-16T12:00:00Z"})
+
+        response = self.client.get(reverse("bond-export", args=["csv"]),
+                                   {"fields": "isin"})
+        self.assertEqual(b"".join(response.streaming_content).decode(),
+                         "isin\r\nCZ0003551251\r\n")
+
+        for fields in ["isin,user_id", ","]:
+            response = self.client.get(reverse("bond-list"),
+                                       {"fields": fields})
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+    @patch('bonds_api.cdcp.requests.Session.request')
     def test_add_bond(self, mock_request):
         """
         Ensure we can create a new account object.
@@ -45,7 +165,7 @@ class BondsTests(APITestCase):
         self.assertEqual(Bond.objects.count(), 1)
         self.assertEqual(Bond.objects.get().emmision_name, "Bond Valid ISIN")
 
-    @patch('bonds_api.utils.requests.request')
+    @patch('bonds_api.cdcp.requests.Session.request')
     def test_add_bond_invalid(self, mock_request):
         """
         Ensure we canot create a new account object with invalid ISIN.
@@ -64,6 +184,79 @@ class BondsTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(Bond.objects.count(), 0)
 
+    @patch('bonds_api.cdcp.requests.Session.request')
+    def test_add_bond_cached_isin(self, mock_request):
+        """
+        Ensure validated ISIN is not sent to CDCP again.
+        """
+        self.test_add_bond()
+        self.client.delete(reverse("bond-detail", args=["CZ0003551251"]))
+        self.test_add_bond()
+        mock_request.assert_not_called()
+        self.assertEqual(get_isin_cache().stats(), {"hits": 1, "misses": 1})
+
+    @patch('bonds_api.cdcp.requests.Session.request')
+    def test_add_bond_not_issued(self, mock_request):
+        """
+        Ensure well formed ISIN unknown to CDCP is rejected.
+        """
+        mock_request.return_value.status_code = 404
+        data = {"emmision_name": "Bond Not Issued ISIN",
+                "isin": "US0378331005",
+                "value": 11.5,
+                "interest": 2.8,
+                "purchase_date": "2024-06-16T12:00:00Z",
+                "maturity_date": "2025-06-16T12:00:00Z",
+                "interest_payment_frequency": "Yearly",
+                }
+        response = self.client.post(reverse("bond-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(mock_request.call_count, 1)
+        self.assertEqual(Bond.objects.count(), 0)
+
+    @patch('bonds_api.cdcp.requests.Session.request')
+    def test_add_bond_malformed_isin(self, mock_request):
+        """
+        Ensure malformed ISIN is rejected without request to CDCP.
+        """
+        data = {"emmision_name": "Bond Malformed ISIN",
+                "isin": "CZ000355125X",
+                "value": 11.5,
+                "interest": 2.8,
+                "purchase_date": "2024-06-16T12:00:00Z",
+                "maturity_date": "2025-06-16T12:00:00Z",
+                "interest_payment_frequency": "Yearly",
+                }
+        response = self.client.post(reverse("bond-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_request.assert_not_called()
+
+    @patch('bonds_api.utils.get_cdcp_client')
+    def test_add_bond_cdcp_unavailable(self, mock_client):
+        """
+        Ensure bond is not created when CDCP is unavailable.
+        """
+        mock_client.return_value.is_issued.side_effect = \
+            CDCPUnavailableException()
+        data = {"emmision_name": "Bond Valid ISIN",
+                "isin": "CZ0003551251",
+                "value": 11.5,
+                "interest": 2.8,
+                "purchase_date": "2024-06-16T12:00:00Z",
+                "maturity_date": "2025-06-16T12:00:00Z",
+                "interest_payment_frequency": "Yearly",
+                }
+        response = self.client.post(reverse("bond-list"), data, format="json")
+        self.assertEqual(response.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(Bond.objects.count(), 0)
+
+        with patch('bonds_api.utils.CDCP_DEGRADED_MODE', "accept"):
+            response = self.client.post(reverse("bond-list"), data,
+                                        format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(get_isin_cache().get("CZ0003551251"), None)
+
     def test_get_bond_detail(self):
         """
         Ensure we can get detail of bond.
@@ -107,3 +300,153 @@ class BondsTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(Bond.objects.count(), 1)
         self.assertEqual(Bond.objects.get().emmision_name, "Bond Valid ISIN")
+
+    @patch('bonds_api.cdcp.requests.Session.request')
+    def test_bulk_add_bonds(self, mock_request):
+        """
+        Ensure valid bonds of batch are created and errors are reported.
+        """
+        def cdcp_response(method, url, **kwargs):
+            response = Mock()
+            response.status_code = 404 if url.endswith("US0378331005") \
+                else 200
+            return response
+
+        mock_request.side_effect = cdcp_response
+        self.test_add_bond()
+        mock_request.reset_mock()
+        bond = {"emmision_name": "Bond Valid ISIN",
+                "value": 11.5,
+                "interest": 2.8,
+                "purchase_date": "2024-06-16T12:00:00Z",
+                "maturity_date": "2025-06-16T12:00:00Z",
+                "interest_payment_frequency": "Yearly",
+                }
+        isin_list = ["AU0000XVGZA3", "DE000BAY0017", "AU0000XVGZA3",
+                     "CZ0003551252", "US0378331005", "CZ0003551251"]
+        data = [dict(bond, isin=isin) for isin in isin_list]
+        data[1]["value"] = "x"
+        data.append(dict(bond, isin="GB0002634946"))
+
+        response = self.client.post(reverse("bond-bulk"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([item["status"] for item in response.data],
+                         ["created", "error", "error", "error", "error",
+                          "error", "created"])
+        self.assertEqual(response.data[0]["bond"]["isin"], "AU0000XVGZA3")
+        self.assertEqual(response.data[0]["bond"]["user"], self.user.id)
+        self.assertEqual(response.data[2]["error"],
+                         "Duplicate ISIN in request")
+        self.assertEqual(response.data[4]["error"], "Invalid ISIN code")
+        self.assertEqual(response.data[5]["error"],
+                         "Bond with this ISIN already exists")
+        self.assertEqual(Bond.objects.count(), 3)
+        # only distinct well formed ISINs not in database are sent to CDCP
+        self.assertEqual(mock_request.call_count, 3)
+
+    def create_bonds(self, isin_list, user):
+        for isin in isin_list:
+            Bond.objects.create(emmision_name="Bond %s" % isin, isin=isin,
+                                value=10.0, interest=2.0,
+                                purchase_date="2024-06-16T12:00:00Z",
+                                maturity_date="2030-06-16T12:00:00Z",
+                                interest_payment_frequency="Y", user=user)
+
+    def test_bulk_update_bonds(self):
+        """
+        Ensure bonds of batch are updated and errors are reported.
+        """
+        other = User.objects.create_user("other", "other")
+        self.create_bonds(["CZ0003551251", "AU0000XVGZA3"], self.user)
+        self.create_bonds(["US0378331005"], other)
+        data = [{"isin": "CZ0003551251", "value": 20.0, "interest": 3.0},
+                {"isin": "AU0000XVGZA3", "value": 10.0},
+                {"isin": "CZ0003551251", "value": 30.0},
+                {"isin": "US0378331005", "value": 30.0},
+                {"isin": "GB0002634946", "value": 30.0},
+                {"value": 30.0},
+                {"isin": "AU0000XVGZA3", "value": "x"}]
+
+        response = self.client.patch(reverse("bond-bulk"), data,
+                                     format="json")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([item["status"] for item in response.data],
+                         ["updated", "updated", "error", "error", "error",
+                          "error", "error"])
+        self.assertEqual(response.data[0]["bond"]["value"], 20.0)
+        self.assertEqual([item.get("error") for item in response.data[2:]],
+                         ["Duplicate ISIN in request", "Permission denied",
+                          "Bond not found", "Bond data with ISIN expected",
+                          "Duplicate ISIN in request"])
+        bond = Bond.objects.get(isin="CZ0003551251")
+        self.assertEqual((bond.value, bond.interest), (20.0, 3.0))
+        self.assertEqual(Bond.objects.get(isin="US0378331005").value, 10.0)
+
+        # staff may update bonds of other users
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.patch(reverse("bond-bulk"), data[3:4],
+                                     format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Bond.objects.get(isin="US0378331005").value, 30.0)
+
+        response = self.client.patch(reverse("bond-bulk"), data[6:],
+                                     format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(response.data[0]["error"].startswith(
+            "Invalid value"))
+
+    def test_bulk_delete_bonds(self):
+        """
+        Ensure bonds of batch are deleted and errors are reported.
+        """
+        other = User.objects.create_user("other", "other")
+        self.create_bonds(["CZ0003551251", "AU0000XVGZA3"], self.user)
+        self.create_bonds(["US0378331005"], other)
+        data = ["CZ0003551251", "US0378331005", "GB0002634946",
+                "CZ0003551251", 1, "AU0000XVGZA3"]
+
+        response = self.client.delete(reverse("bond-bulk"), data,
+                                      format="json")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([item["status"] for item in response.data],
+                         ["deleted", "error", "error", "error", "error",
+                          "deleted"])
+        self.assertEqual([item.get("error") for item in response.data[1:5]],
+                         ["Permission denied", "Bond not found",
+                          "Duplicate ISIN in request", "ISIN expected"])
+        self.assertEqual(list(Bond.objects.values_list("isin", flat=True)),
+                         ["US0378331005"])
+
+        response = self.client.delete(reverse("bond-bulk"), "CZ0003551251",
+                                      format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_bond_user_statistics(self):
+        """
+        Ensure user statistics are computed over all bonds of user.
+        """
+        for i, (value, interest, year) in enumerate([(100.0, 2.0, 2030),
+                                                      (50.0, 4.0, 2026)]):
+            Bond.objects.create(emmision_name="Bond %s" % i,
+                                isin="CZ%010d" % i,
+                                value=value, interest=interest,
+                                purchase_date="2024-06-16T12:00:00Z",
+                                maturity_date="%s-06-16T12:00:00Z" % year,
+                                interest_payment_frequency="Y",
+                                user=self.user)
+        url = reverse("bond-user-detail", args=[self.user.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertAlmostEqual(response.data["avg_interest"], 3.0)
+        self.assertAlmostEqual(response.data["total_value"], 150.0)
+        self.assertAlmostEqual(response.data["future_value"],
+                               100.0 * 1.02 ** 6 + 50.0 * 1.04 ** 2)
+        self.assertEqual(response.data["next_maturity"]["isin"],
+                         "CZ0000000001")
+
+        url = reverse("bond-user-detail", args=[self.user.id + 1])
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
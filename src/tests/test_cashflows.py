@@ -0,0 +1,109 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from datetime import datetime
+from datetime import timezone
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from bonds_api.models import Bond
+from bonds_api.cashflows import add_periods
+from bonds_api.cashflows import iter_cashflows
+from bonds_api.utils import get_number_of_payments
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class CashflowTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("test", "test")
+        self.client.force_authenticate(self.user)
+
+    def add_bond(self, isin, frequency, purchase_date, maturity_date):
+        return Bond.objects.create(emmision_name="Bond", isin=isin,
+                                   value=100.0, interest=2.0,
+                                   purchase_date=purchase_date,
+                                   maturity_date=maturity_date,
+                                   interest_payment_frequency=frequency,
+                                   user=self.user)
+
+    def test_add_periods(self):
+        """
+        Ensure day of month is clamped to end of month.
+        """
+        date = utc(2024, 1, 31)
+        self.assertEqual(add_periods(date, "M", 1), utc(2024, 2, 29))
+        self.assertEqual(add_periods(date, "M", 13), utc(2025, 2, 28))
+        self.assertEqual(add_periods(utc(2024, 2, 29), "Y", 1),
+                         utc(2025, 2, 28))
+        self.assertEqual(add_periods(date, "W", 2), utc(2024, 2, 14))
+
+    def test_iter_cashflows(self):
+        """
+        Ensure schedule matches number of payments and date range.
+        """
+        for frequency in "DWMY":
+            bond = self.add_bond("CZ000000000" + frequency, frequency,
+                                 utc(2024, 1, 31, 12), utc(2029, 3, 15))
+            cashflows = list(iter_cashflows(bond))
+            self.assertEqual(len(cashflows), get_number_of_payments(
+                bond.purchase_date, bond.maturity_date, frequency))
+            self.assertEqual(cashflows[-1]["date"], bond.maturity_date)
+            self.assertEqual(cashflows[-1]["principal"], 100.0)
+            self.assertEqual(sum(cashflow["principal"]
+                                 for cashflow in cashflows), 100.0)
+
+            start = utc(2026, 5, 1)
+            end = utc(2027, 5, 1)
+            self.assertEqual(list(iter_cashflows(bond, start, end)),
+                             [cashflow for cashflow in cashflows
+                              if start <= cashflow["date"] <= end])
+
+    def test_bond_cashflows(self):
+        """
+        Ensure schedule of bond is paginated.
+        """
+        self.add_bond("CZ0003551251", "M", utc(2024, 1, 15), utc(2025, 1, 15))
+        url = reverse("bond-cashflows", args=["CZ0003551251"]) + "?limit=5"
+        dates = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            dates += [cashflow["date"] for cashflow in
+                      response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(len(dates), 12)
+        self.assertEqual(dates[0], utc(2024, 2, 15))
+
+        url = reverse("bond-cashflows", args=["CZ0003551251"])
+        response = self.client.get(url, {"from": "2024-06-01",
+                                         "to": "2024-08-15T00:00:00Z"})
+        self.assertEqual([cashflow["number"] for cashflow in
+                          response.data["results"]], [5, 6, 7])
+
+        response = self.client.get(url, {"from": "x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_portfolio_cashflows(self):
+        """
+        Ensure schedules of bonds are merged in date order.
+        """
+        self.add_bond("CZ0003551251", "Y", utc(2024, 1, 15), utc(2030, 1, 15))
+        self.add_bond("US0378331005", "M", utc(2024, 1, 15), utc(2025, 1, 15))
+        self.add_bond("AU0000XVGZA3", "Y", utc(2020, 1, 15), utc(2026, 1, 15))
+        url = reverse("portfolio-cashflows") + "?from=2024-01-01&limit=4"
+        cashflows = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            cashflows += response.data["results"]
+            url = response.data["next"]
+        keys = [(cashflow["date"], cashflow["isin"]) for cashflow in cashflows]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(keys), len(set(keys)))
+        self.assertEqual(len(keys), 6 + 12 + 3)
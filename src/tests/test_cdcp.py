@@ -0,0 +1,166 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import asyncio
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+
+from bonds_api.cdcp import AsyncCDCPClient
+from bonds_api.cdcp import CDCPClient
+from bonds_api.cdcp import CDCPUnavailableException
+from bonds_api.cdcp import CircuitBreaker
+from bonds_api.cdcp import SingleFlight
+
+from cdcp_stub import CDCPStubServer
+
+
+class CDCPClientTests(SimpleTestCase):
+    def get_client(self, server, **kwargs):
+        kwargs.setdefault("backoff", 0)
+        client = CDCPClient(url=server.url, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_is_issued(self):
+        """
+        Ensure issued and unknown ISINs are recognized over one connection.
+        """
+        with CDCPStubServer(issued=["CZ0003551251"]) as server:
+            client = self.get_client(server)
+            self.assertTrue(client.is_issued("CZ0003551251"))
+            self.assertFalse(client.is_issued("CZ0003551252"))
+            self.assertTrue(client.is_issued("CZ0003551251"))
+            self.assertEqual(len(server.requests), 3)
+            self.assertEqual(len(server.clients), 1)
+
+    def test_retry(self):
+        """
+        Ensure upstream errors are retried.
+        """
+        with CDCPStubServer(issued=["CZ0003551251"]) as server:
+            server.statuses = [500, 503]
+            client = self.get_client(server, max_retries=2)
+            self.assertTrue(client.is_issued("CZ0003551251"))
+            self.assertEqual(len(server.requests), 3)
+
+    def test_timeout(self):
+        """
+        Ensure slow upstream does not block longer than timeout.
+        """
+        with CDCPStubServer(delay=0.5) as server:
+            client = self.get_client(server, read_timeout=0.05,
+                                     max_retries=1)
+            with self.assertRaises(CDCPUnavailableException):
+                client.is_issued("CZ0003551251")
+            self.assertEqual(len(server.requests), 2)
+
+    def test_circuit_breaker(self):
+        """
+        Ensure open circuit fails fast without upstream request.
+        """
+        with CDCPStubServer(issued=["CZ0003551251"]) as server:
+            server.statuses = [500] * 2
+            breaker = CircuitBreaker(window=10, min_calls=2, error_rate=0.5,
+                                     reset_timeout=60)
+            client = self.get_client(server, max_retries=0, breaker=breaker)
+            for _ in range(2):
+                with self.assertRaises(CDCPUnavailableException):
+                    client.is_issued("CZ0003551251")
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+            with self.assertRaises(CDCPUnavailableException):
+                client.is_issued("CZ0003551251")
+            self.assertEqual(len(server.requests), 2)
+
+            # after reset timeout one trial request closes the circuit
+            breaker.reset_timeout = 0
+            self.assertTrue(client.is_issued("CZ0003551251"))
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_async_client(self):
+        """
+        Ensure async client recognizes ISINs, retries and times out.
+        """
+        with CDCPStubServer(issued=["CZ0003551251"]) as server:
+            client = AsyncCDCPClient(url=server.url, backoff=0, max_retries=1)
+            self.assertTrue(asyncio.run(client.is_issued("CZ0003551251")))
+            self.assertFalse(asyncio.run(client.is_issued("CZ0003551252")))
+            server.statuses = [503]
+            self.assertTrue(asyncio.run(client.is_issued("CZ0003551251")))
+            self.assertEqual(len(server.requests), 4)
+            # keep-alive connection is reused by lookups of event loops
+            self.assertEqual(len(server.clients), 1)
+            client.close()
+
+        with CDCPStubServer(delay=0.5) as server:
+            client = AsyncCDCPClient(url=server.url, read_timeout=0.05,
+                                     backoff=0, max_retries=0)
+            with self.assertRaises(CDCPUnavailableException):
+                asyncio.run(client.is_issued("CZ0003551251"))
+
+    def test_coalescing(self):
+        """
+        Ensure concurrent lookups of the same ISIN share one request.
+        """
+        with CDCPStubServer(issued=["CZ0003551251"], delay=0.2) as server:
+            client = self.get_client(server)
+            isins = ["CZ0003551251"] * 8 + ["CZ0003551252"] * 2
+            with ThreadPoolExecutor(max_workers=len(isins)) as executor:
+                results = list(executor.map(client.is_issued, isins))
+            self.assertEqual(results, [True] * 8 + [False] * 2)
+            self.assertEqual(sorted(server.requests),
+                             ["CZ0003551251", "CZ0003551252"])
+            self.assertEqual(client.single_flight.saved, 8)
+
+            # lookups over bound of table are not coalesced
+            client = self.get_client(server,
+                                     single_flight=SingleFlight(max_keys=1))
+            with ThreadPoolExecutor(max_workers=len(isins)) as executor:
+                results = list(executor.map(client.is_issued, isins))
+            self.assertEqual(results, [True] * 8 + [False] * 2)
+            self.assertGreater(len(server.requests), 4)
+
+    def test_coalescing_timeout(self):
+        """
+        Ensure waiter gives up on slow lookup and errors are shared.
+        """
+        with CDCPStubServer(delay=0.5) as server:
+            client = self.get_client(server, single_flight=SingleFlight(
+                timeout=0.05))
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                leader = executor.submit(client.is_issued, "CZ0003551251")
+                while not server.requests:
+                    time.sleep(0.01)
+                waiter = executor.submit(client.is_issued, "CZ0003551251")
+                with self.assertRaises(CDCPUnavailableException):
+                    waiter.result()
+                self.assertFalse(leader.result())
+
+        with CDCPStubServer(delay=0.2) as server:
+            server.statuses = [500]
+            client = self.get_client(server, max_retries=0)
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [executor.submit(client.is_issued, "CZ0003551251")
+                           for _ in range(4)]
+                for future in futures:
+                    with self.assertRaises(CDCPUnavailableException):
+                        future.result()
+            self.assertEqual(len(server.requests), 1)
+
+    def test_async_coalescing(self):
+        """
+        Ensure concurrent async lookups of the same ISIN share one request.
+        """
+        async def lookup(client, isins):
+            return await asyncio.gather(*[client.is_issued(isin)
+                                          for isin in isins])
+
+        with CDCPStubServer(issued=["CZ0003551251"], delay=0.1) as server:
+            client = AsyncCDCPClient(url=server.url, backoff=0)
+            isins = ["CZ0003551251"] * 5 + ["CZ0003551252"] * 3
+            self.assertEqual(asyncio.run(lookup(client, isins)),
+                             [True] * 5 + [False] * 3)
+            self.assertEqual(len(server.requests), 2)
+            self.assertEqual(client.single_flight.saved, 6)
@@ -0,0 +1,165 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import io
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from bonds_api.models import Bond
+from bonds_api.models import PortfolioSummary
+from bonds_api.cdcp import CDCPUnavailableException
+from bonds_api.isin_cache import get_isin_cache
+from bonds_api.summary import check_summary
+
+from unittest.mock import patch
+
+
+class DeferredValidationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("test", "test")
+        self.client.force_authenticate(self.user)
+        get_isin_cache().clear()
+        for name in ["bonds_api.bond_views.ISIN_VALIDATION_MODE",
+                     "bonds_api.async_views.ISIN_VALIDATION_MODE"]:
+            patcher = patch(name, "deferred")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch("bonds_api.utils.get_cdcp_client")
+        self.cdcp = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.cdcp.is_issued.side_effect = \
+            lambda isin: isin != "US0378331005"
+
+    def create_bond(self, isin, url="bond-list", **changes):
+        data = {"emmision_name": "Bond %s" % isin,
+                "isin": isin,
+                "value": 10.0,
+                "interest": 2.9,
+                "purchase_date": "2024-06-16T12:00:00Z",
+                "maturity_date": "2044-06-16T12:00:00Z",
+                "interest_payment_frequency": "Yearly",
+                **changes}
+        return self.client.post(reverse(url), data, format="json")
+
+    def validate(self, *args):
+        out = io.StringIO()
+        call_command("validate_bonds", "--once", *args, stdout=out)
+        return out.getvalue()
+
+    def test_create_pending_bonds(self):
+        """
+        Ensure bonds are created without CDCP and validated by worker.
+        """
+        for isin, url in [("CZ0003551251", "bond-list"),
+                          ("US0378331005", "bond-list"),
+                          ("US5949181045", "bond-list-async")]:
+            response = self.create_bond(isin, url)
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(response.data["validation_status"], "Pending")
+        self.cdcp.is_issued.assert_not_called()
+        self.assertEqual(PortfolioSummary.objects.get().count, 3)
+
+        response = self.create_bond("CZ000355125")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        output = self.validate("--batch-size", "2")
+        self.assertEqual(output.splitlines(), [
+            "valid: 1, rejected: 1",
+            "valid: 1, rejected: 0",
+            "Done, valid: 2, rejected: 1"])
+        self.assertEqual(dict(Bond.objects.values_list(
+            "isin", "validation_status")),
+            {"CZ0003551251": "V", "US0378331005": "R", "US5949181045": "V"})
+
+        response = self.client.get(reverse("bond-detail",
+                                           args=["US0378331005"]))
+        self.assertEqual(response.data["validation_status"], "Rejected")
+
+    def test_create_with_cached_isin(self):
+        """
+        Ensure known ISINs are not queued.
+        """
+        get_isin_cache().set("CZ0003551251", True)
+        get_isin_cache().set("US0378331005", False)
+        response = self.create_bond("CZ0003551251")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["validation_status"], "Valid")
+        response = self.create_bond("US0378331005")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Bond.objects.count(), 1)
+
+    def test_cdcp_unavailable(self):
+        """
+        Ensure bonds stay pending when CDCP is unavailable.
+        """
+        self.create_bond("CZ0003551251")
+        self.cdcp.is_issued.side_effect = CDCPUnavailableException()
+        with self.assertRaises(CommandError):
+            self.validate()
+        self.assertEqual(Bond.objects.get().validation_status, "P")
+
+        self.cdcp.is_issued.side_effect = None
+        self.cdcp.is_issued.return_value = True
+        self.assertEqual(self.validate(), "valid: 1, rejected: 0\n"
+                                          "Done, valid: 1, rejected: 0\n")
+        self.assertEqual(Bond.objects.get().validation_status, "V")
+
+    @patch("bonds_api.utils.CDCP_DEGRADED_MODE", "accept")
+    def test_cdcp_unavailable_degraded(self):
+        """
+        Ensure bonds stay pending when CDCP is unavailable even in
+        degraded mode.
+        """
+        self.create_bond("CZ0003551251")
+        self.cdcp.is_issued.side_effect = CDCPUnavailableException()
+        with self.assertRaises(CommandError):
+            self.validate()
+        self.assertEqual(Bond.objects.get().validation_status, "P")
+
+    def test_rejected_not_counted(self):
+        """
+        Ensure rejected bonds are removed from statistics and analytics,
+        but stay listed until they are deleted.
+        """
+        self.create_bond("CZ0003551251")
+        self.create_bond("US0378331005", value=20.0,
+                         maturity_date="2030-06-16T12:00:00Z")
+        url = reverse("bond-user-detail", args=[self.user.id])
+        response = self.client.get(url)
+        self.assertEqual(response.data["total_value"], 30.0)
+        self.assertEqual(response.data["next_maturity"]["isin"],
+                         "US0378331005")
+
+        self.validate()
+        response = self.client.get(url)
+        self.assertEqual(response.data["total_value"], 10.0)
+        self.assertEqual(response.data["next_maturity"]["isin"],
+                         "CZ0003551251")
+        summary = PortfolioSummary.objects.get()
+        self.assertEqual(summary.count, 1)
+        self.assertEqual(check_summary(summary), {})
+
+        response = self.client.post(reverse("bond-analytics"),
+                                    {"discount_rate": 2.0}, format="json")
+        self.assertEqual([result["isin"] for result
+                          in response.data["results"]], ["CZ0003551251"])
+        response = self.client.get(reverse("portfolio-cashflows"))
+        self.assertEqual({payment["isin"] for payment
+                          in response.data["results"]}, {"CZ0003551251"})
+        response = self.client.get(reverse("bond-list"))
+        self.assertEqual([bond["isin"] for bond
+                          in response.data["results"]],
+                         ["US0378331005", "CZ0003551251"])
+
+        # rejected bond is not subtracted again
+        response = self.client.delete(reverse("bond-detail",
+                                              args=["US0378331005"]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = PortfolioSummary.objects.get()
+        self.assertEqual(summary.count, 1)
+        self.assertEqual(check_summary(summary), {})
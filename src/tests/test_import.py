@@ -0,0 +1,178 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from bonds_api.models import Bond
+from bonds_api.models import PortfolioSummary
+from bonds_api.cdcp import CDCPUnavailableException
+from bonds_api.isin_cache import get_isin_cache
+from bonds_api.summary import check_summary
+
+from unittest.mock import patch
+
+HEADER = "emmision_name,isin,value,interest,purchase_date,maturity_date," \
+         "interest_payment_frequency\n"
+ROW = "Bond {0},{0},{1},2.5,2024-06-16T12:00:00Z,2030-06-16T12:00:00Z," \
+      "Yearly\n"
+
+
+class ImportBondsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("test", "test")
+        get_isin_cache().clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        patcher = patch("bonds_api.utils.get_cdcp_client")
+        self.cdcp = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.cdcp.is_issued.side_effect = \
+            lambda isin: isin != "US0378331005"
+
+    def write(self, content, name="bonds.csv"):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as fp:
+            fp.write(content)
+        return path
+
+    def run_import(self, path, *args):
+        out = io.StringIO()
+        call_command("import_bonds", path, "--user", "test", *args,
+                     stdout=out)
+        return out.getvalue()
+
+    def read_rejects(self, path):
+        with open(path + ".rejects") as fp:
+            return [json.loads(line) for line in fp]
+
+    def test_import_csv(self):
+        """
+        Ensure valid rows are created and rejected rows are reported.
+        """
+        path = self.write(HEADER + ROW.format("CZ0003551251", "10.5") +
+                          ROW.format("AU0000XVGZA3", "x") +
+                          ROW.format("US0378331005", "20") +
+                          ROW.format("CZ0003551252", "20") +
+                          ROW.format("CZ0003551251", "30") +
+                          ROW.format("GB0002634946", "40"))
+        out = self.run_import(path, "--batch-size", "10")
+        self.assertIn("Done, rows: 6, created: 2, skipped: 0, rejected: 4",
+                      out)
+        self.assertIn("rows per second", out)
+        self.assertEqual(sorted(Bond.objects.values_list("isin", "value")),
+                         [("CZ0003551251", 10.5), ("GB0002634946", 40.0)])
+        self.assertEqual([(item["row"], item["isin"]) for item
+                          in self.read_rejects(path)],
+                         [(2, "AU0000XVGZA3"), (3, "US0378331005"),
+                          (4, "CZ0003551252"), (5, "CZ0003551251")])
+        self.assertEqual(self.read_rejects(path)[1]["error"],
+                         "Invalid ISIN code")
+        self.assertEqual(self.read_rejects(path)[3]["error"],
+                         "Duplicate ISIN in file")
+        summary = PortfolioSummary.objects.get(user=self.user)
+        self.assertEqual(summary.count, 2)
+        self.assertEqual(check_summary(summary), {})
+        self.assertFalse(os.path.exists(path + ".checkpoint"))
+
+        # bonds imported before are skipped
+        out = self.run_import(path)
+        self.assertIn("created: 0, skipped: 2, rejected: 4", out)
+
+    def test_import_json(self):
+        """
+        Ensure JSON lines file is imported in batches.
+        """
+        bond = {"emmision_name": "Bond", "value": 10.0, "interest": 2.0,
+                "purchase_date": "2024-06-16T12:00:00Z",
+                "maturity_date": "2030-06-16T12:00:00Z",
+                "interest_payment_frequency": "M"}
+        path = self.write("\n".join(json.dumps(dict(bond, isin=isin))
+                                    for isin in ["CZ0003551251",
+                                                 "AU0000XVGZA3",
+                                                 "GB0002634946"]),
+                          name="bonds.ndjson")
+        out = self.run_import(path, "--format", "json", "--batch-size", "2")
+        self.assertIn("rows: 2, created: 2", out)
+        self.assertIn("Done, rows: 3, created: 3", out)
+        self.assertEqual(Bond.objects.filter(user=self.user).count(), 3)
+
+    def test_import_offset_dates(self):
+        """
+        Ensure dates with offset are imported in UTC and summary is the
+        same as computed from database.
+        """
+        # summary exists, so it is updated by imported bonds
+        self.run_import(self.write(HEADER + ROW.format("AU0000XVGZA3", 10),
+                                   name="first.csv"))
+        path = self.write(
+            HEADER + "Bond,CZ0003551251,100,10,2024-01-01T00:30:00+01:00,"
+            "2025-12-31T23:30:00-01:00,Yearly\n")
+        out = self.run_import(path)
+        self.assertIn("Done, rows: 1, created: 1", out)
+        bond = Bond.objects.get(isin="CZ0003551251")
+        self.assertEqual(bond.purchase_date.isoformat(),
+                         "2023-12-31T23:30:00+00:00")
+        self.assertEqual(bond.maturity_date.isoformat(),
+                         "2026-01-01T00:30:00+00:00")
+        summary = PortfolioSummary.objects.get(user=self.user)
+        self.assertAlmostEqual(summary.future_value, 133.1 + 10 * 1.025 ** 6)
+        self.assertEqual(check_summary(summary), {})
+
+    def test_resume(self):
+        """
+        Ensure import interrupted by unavailable CDCP is resumed.
+        """
+        path = self.write(HEADER + ROW.format("CZ0003551251", "10") +
+                          ROW.format("US0378331005", "20") +
+                          ROW.format("AU0000XVGZA3", "30") +
+                          ROW.format("GB0002634946", "40") +
+                          ROW.format("DE000BAY0017", "50"))
+
+        def is_issued(isin):
+            if isin == "GB0002634946":
+                raise CDCPUnavailableException()
+            return isin != "US0378331005"
+
+        self.cdcp.is_issued.side_effect = is_issued
+        with self.assertRaisesMessage(CommandError,
+                                      "resume import after 2 rows"):
+            self.run_import(path, "--batch-size", "2")
+        self.assertEqual(Bond.objects.count(), 1)
+        with open(path + ".checkpoint") as fp:
+            self.assertEqual(json.load(fp)["rows"], 2)
+
+        self.cdcp.is_issued.side_effect = \
+            lambda isin: isin != "US0378331005"
+        out = self.run_import(path, "--batch-size", "2")
+        self.assertIn("Resuming after 2 rows", out)
+        self.assertIn("Done, rows: 5, created: 4, skipped: 0, rejected: 1",
+                      out)
+        self.assertEqual(Bond.objects.count(), 4)
+        # rejection of first batch is reported once
+        self.assertEqual([item["row"] for item in self.read_rejects(path)],
+                         [2])
+
+    def test_checkpoint_of_other_file(self):
+        """
+        Ensure checkpoint is not used for changed file.
+        """
+        path = self.write(HEADER + ROW.format("CZ0003551251", "10"))
+        with open(path + ".checkpoint", "w") as fp:
+            json.dump({"file": path, "size": 1, "rows": 1}, fp)
+        with self.assertRaisesMessage(CommandError, "--restart"):
+            self.run_import(path)
+        out = self.run_import(path, "--restart")
+        self.assertIn("Done, rows: 1, created: 1", out)
+
+        with self.assertRaisesMessage(CommandError, "Unknown user"):
+            call_command("import_bonds", path, "--user", "nobody",
+                         stdout=io.StringIO())
@@ -0,0 +1,31 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from django.test import SimpleTestCase
+
+from bonds_api.isin import get_isin_error
+from bonds_api.isin import is_valid_isin
+
+
+class ISINTests(SimpleTestCase):
+    def test_valid_isin(self):
+        """
+        Ensure well formed ISINs are accepted.
+        """
+        for isin in ("CZ0003551251", "US0378331005", "AU0000XVGZA3",
+                     "DE000BAY0017", "GB0002634946"):
+            self.assertTrue(is_valid_isin(isin), isin)
+
+    def test_invalid_isin(self):
+        """
+        Ensure malformed ISINs are rejected with reason.
+        """
+        self.assertEqual(get_isin_error(None), "ISIN must be a string")
+        self.assertEqual(get_isin_error("CZ000355125"),
+                         "ISIN must have 12 characters")
+        self.assertEqual(get_isin_error("cz0003551251"),
+                         "ISIN must contain only upper case letters and "
+                         "digits")
+        self.assertEqual(get_isin_error("QQ0003551251"),
+                         "Unknown country code QQ")
+        self.assertEqual(get_isin_error("CZ0003551252"), "Invalid check digit")
@@ -0,0 +1,90 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from bonds_api.isin_cache import ISINCache
+from bonds_api.isin_cache import LocalISINCache
+from bonds_api.isin_cache import DjangoISINCache
+
+from unittest.mock import patch
+
+
+class ISINCacheTests(SimpleTestCase):
+    def test_abstract(self):
+        """
+        Ensure base class without backend can not be instantiated.
+        """
+        with self.assertRaises(TypeError):
+            ISINCache()
+
+
+class LocalISINCacheTests(SimpleTestCase):
+    def test_lru_eviction(self):
+        """
+        Ensure least recently used ISIN is evicted first.
+        """
+        cache = LocalISINCache(max_size=2)
+        cache.set("CZ0000000001", True)
+        cache.set("CZ0000000002", True)
+        cache.get("CZ0000000001")
+        cache.set("CZ0000000003", False)
+        self.assertEqual(len(cache), 2)
+        self.assertTrue(cache.get("CZ0000000001"))
+        self.assertIsNone(cache.get("CZ0000000002"))
+        self.assertFalse(cache.get("CZ0000000003"))
+
+    @patch('bonds_api.isin_cache.time.monotonic')
+    def test_ttl(self, mock_monotonic):
+        """
+        Ensure valid and invalid results expire after their own TTL.
+        """
+        cache = LocalISINCache(positive_ttl=100, negative_ttl=10)
+        mock_monotonic.return_value = 0
+        cache.set("CZ0000000001", True)
+        cache.set("CZ0000000002", False)
+        mock_monotonic.return_value = 50
+        self.assertTrue(cache.get("CZ0000000001"))
+        self.assertIsNone(cache.get("CZ0000000002"))
+        mock_monotonic.return_value = 100
+        self.assertIsNone(cache.get("CZ0000000001"))
+
+    def test_stats(self):
+        """
+        Ensure hits and misses are counted.
+        """
+        cache = LocalISINCache()
+        cache.get("CZ0000000001")
+        cache.set("CZ0000000001", True)
+        cache.get("CZ0000000001")
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1})
+        cache.clear()
+        self.assertEqual(cache.stats(), {"hits": 0, "misses": 0})
+        self.assertIsNone(cache.get("CZ0000000001"))
+
+
+class DjangoISINCacheTests(SimpleTestCase):
+    def test_shared_cache(self):
+        """
+        Ensure results stored by one instance are seen by another one.
+        """
+        DjangoISINCache().clear()
+        DjangoISINCache().set("CZ0000000001", False)
+        cache = DjangoISINCache()
+        self.assertFalse(cache.get("CZ0000000001"))
+        self.assertIsNone(cache.get("CZ0000000002"))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_clear_keeps_other_caches(self):
+        """
+        Ensure clearing ISINs does not remove entries of other caches.
+        """
+        caches["default"].set("other", 1)
+        caches["responses"].set("other", 2)
+        cache = DjangoISINCache()
+        cache.set("CZ0000000001", True)
+        cache.clear()
+        self.assertIsNone(cache.get("CZ0000000001"))
+        self.assertEqual(caches["default"].get("other"), 1)
+        self.assertEqual(caches["responses"].get("other"), 2)
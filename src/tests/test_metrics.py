@@ -0,0 +1,192 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import json
+import os
+import tempfile
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from bonds_api.isin_cache import get_isin_cache
+from bonds_api.metrics import MetricsRegistry
+from bonds_api.metrics import clear_metrics_dir
+from bonds_api.metrics import render_metrics
+
+from unittest.mock import patch
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("test", "test")
+        self.client.force_authenticate(self.user)
+        get_isin_cache().clear()
+        patcher = patch("bonds_api.metrics._registry",
+                        MetricsRegistry(directory=None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_metrics(self):
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        return response.content.decode().splitlines()
+
+    def test_requests(self):
+        """
+        Ensure requests are counted and timed per route.
+        """
+        self.client.get(reverse("bond-list"))
+        self.client.get(reverse("bond-list"))
+        self.client.get(reverse("bond-detail", args=["CZ0003551251"]))
+        lines = self.get_metrics()
+        self.assertIn('bonds_http_requests_total{route="bond-list",'
+                      'method="GET",status="200"} 2', lines)
+        self.assertIn('bonds_http_requests_total{route="bond-detail",'
+                      'method="GET",status="404"} 1', lines)
+        self.assertIn('bonds_http_request_duration_seconds_count'
+                      '{route="bond-list",method="GET"} 2', lines)
+        self.assertIn('bonds_http_request_duration_seconds_bucket'
+                      '{route="bond-list",method="GET",le="+Inf"} 2', lines)
+        self.assertIn("# TYPE bonds_http_request_duration_seconds "
+                      "histogram", lines)
+
+    @patch('bonds_api.cdcp.requests.Session.request')
+    def test_cdcp_requests(self, mock_request):
+        """
+        Ensure CDCP requests are timed by outcome.
+        """
+        mock_request.return_value.status_code = 404
+        data = {"emmision_name": "Bond Valid ISIN",
+                "isin": "CZ0003551251",
+                "value": 11.5,
+                "interest": 2.8,
+                "purchase_date": "2024-06-16T12:00:00Z",
+                "maturity_date": "2025-06-16T12:00:00Z",
+                "interest_payment_frequency": "Yearly",
+                }
+        response = self.client.post(reverse("bond-list"), data,
+                                    format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        lines = self.get_metrics()
+        self.assertIn('bonds_cdcp_request_duration_seconds_count'
+                      '{outcome="not_issued"} 1', lines)
+
+    def make_registry(self, **kwargs):
+        registry = MetricsRegistry(**kwargs)
+        # background thread is stopped
+        self.addCleanup(registry.close)
+        return registry
+
+    def test_processes(self):
+        """
+        Ensure values of processes sharing directory are summed.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            first = self.make_registry(directory=directory,
+                                       buckets=(0.1, 1.0))
+            second = self.make_registry(directory=directory,
+                                        buckets=(0.1, 1.0))
+            labels = (("route", 'a"b'),)
+            first.inc("bonds_http_errors_total", labels)
+            second.inc("bonds_http_errors_total", labels, 2)
+            first.observe("bonds_http_request_duration_seconds", labels,
+                          0.05)
+            second.observe("bonds_http_request_duration_seconds", labels,
+                           0.5)
+            second.flush()
+
+            lines = render_metrics(first.collect(), first.buckets) \
+                .splitlines()
+        self.assertIn('bonds_http_errors_total{route="a\\"b"} 3', lines)
+        self.assertEqual([line for line in lines if line.startswith(
+            "bonds_http_request_duration_seconds")], [
+            'bonds_http_request_duration_seconds_bucket'
+            '{route="a\\"b",le="0.1"} 1',
+            'bonds_http_request_duration_seconds_bucket'
+            '{route="a\\"b",le="1.0"} 2',
+            'bonds_http_request_duration_seconds_bucket'
+            '{route="a\\"b",le="+Inf"} 2',
+            'bonds_http_request_duration_seconds_sum{route="a\\"b"} 0.55',
+            'bonds_http_request_duration_seconds_count{route="a\\"b"} 2'])
+
+    def test_exit(self):
+        """
+        Ensure values of exited processes are archived and their files
+        are removed, files of previous run are removed by clearing.
+        """
+        labels = (("route", "a"),)
+        with tempfile.TemporaryDirectory() as directory:
+            first = self.make_registry(directory=directory)
+            second = self.make_registry(directory=directory)
+            first.inc("bonds_http_errors_total", labels)
+            second.inc("bonds_http_errors_total", labels, 2)
+            second.flush()
+            # not flushed yet
+            first.inc("bonds_http_errors_total", labels)
+            first.close()
+            self.assertEqual(sorted(name for name in os.listdir(directory)
+                                    if name.endswith(".json")),
+                             sorted(["archive.json", second._file_name]))
+            self.assertEqual(second.collect()["counters"],
+                             {("bonds_http_errors_total", labels): 4})
+
+            # file of killed process
+            with open(os.path.join(directory, "99999999-x.json"), "w") as fp:
+                json.dump({"counters": [["bonds_http_errors_total",
+                                         labels, 5]],
+                           "histograms": []}, fp)
+            third = self.make_registry(directory=directory)
+            third.inc("bonds_http_errors_total", labels)
+            self.assertEqual(third.collect()["counters"],
+                             {("bonds_http_errors_total", labels): 10})
+            self.assertFalse(os.path.exists(
+                os.path.join(directory, "99999999-x.json")))
+
+            clear_metrics_dir(directory)
+            self.assertEqual([name for name in os.listdir(directory)
+                              if name.endswith(".json")], [])
+
+    def test_background_flush(self):
+        """
+        Ensure values are written by background thread, not by request,
+        and lock of parent process is not reused after fork.
+        """
+        labels = (("route", "a"),)
+        with tempfile.TemporaryDirectory() as directory, \
+                patch("bonds_api.metrics.METRICS_FLUSH_INTERVAL", 0.01):
+            registry = self.make_registry(directory=directory)
+            with patch("bonds_api.metrics.write_snapshot") as mock_write:
+                registry._stopped.set()
+                registry.inc("bonds_http_errors_total", labels)
+                registry._flusher.join()
+                mock_write.assert_not_called()
+
+            # lock held by other thread of parent at fork
+            registry._lock.acquire()
+            registry._reset()
+            registry.inc("bonds_http_errors_total", labels, 2)
+            registry._flusher.join(timeout=0.5)
+            path = os.path.join(directory, registry._file_name)
+            self.assertTrue(registry._flusher.is_alive())
+            with open(path) as fp:
+                self.assertEqual(json.load(fp)["counters"],
+                                 [["bonds_http_errors_total",
+                                   [["route", "a"]], 2]])
+            registry.close()
+            self.assertFalse(registry._flusher.is_alive())
+            self.assertFalse(os.path.exists(path))
+
+    def test_allowed_ips(self):
+        """
+        Ensure metrics are not returned to other clients.
+        """
+        response = self.client.get(reverse("metrics"),
+                                   REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        with patch("bonds_api.metrics.METRICS_ALLOWED_IPS", None):
+            response = self.client.get(reverse("metrics"),
+                                       REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
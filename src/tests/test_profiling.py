@@ -0,0 +1,148 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import base64
+import json
+import os
+import tempfile
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from bonds_api.models import Bond
+from bonds_api.isin_cache import get_isin_cache
+from bonds_api.profiling import RequestProfile
+
+from unittest.mock import patch
+
+
+@patch("bonds_api.profiling.PROFILING_ENABLED", True)
+class ProfilingTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("test", "test", is_staff=True)
+        self.client.force_login(self.user)
+        get_isin_cache().clear()
+        Bond.objects.create(emmision_name="Bond", isin="CZ0003551251",
+                            value=10.0, interest=2.0,
+                            purchase_date="2024-06-16T12:00:00Z",
+                            maturity_date="2030-06-16T12:00:00Z",
+                            interest_payment_frequency="Y",
+                            user=self.user)
+
+    def get_timings(self, response):
+        return {metric.split(";")[0]: metric
+                for metric in response["Server-Timing"].split(", ")}
+
+    def test_server_timing(self):
+        """
+        Ensure profiled request of staff user has Server-Timing header
+        and is logged.
+        """
+        url = reverse("bond-detail", args=["CZ0003551251"])
+        with self.assertLogs("bonds_api.profiling", "INFO") as logs:
+            response = self.client.get(url, HTTP_X_PROFILE="1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timings = self.get_timings(response)
+        self.assertEqual(list(timings), ["db", "serialize", "render",
+                                         "total"])
+        # portfolio version and bond
+        self.assertIn('desc="2 calls"', timings["db"])
+
+        data = json.loads(logs.records[0].getMessage())
+        self.assertEqual(data["path"], url)
+        self.assertEqual(data["db_queries"], 2)
+        self.assertGreaterEqual(data["total_ms"], data["db_ms"])
+
+    @patch('bonds_api.cdcp.requests.Session.request')
+    def test_server_timing_cdcp(self, mock_request):
+        """
+        Ensure time of CDCP calls is measured.
+        """
+        mock_request.return_value.status_code = 200
+        data = {"emmision_name": "Bond Valid ISIN",
+                "isin": "CZ0003551269",
+                "value": 11.5,
+                "interest": 2.8,
+                "purchase_date": "2024-06-16T12:00:00Z",
+                "maturity_date": "2025-06-16T12:00:00Z",
+                "interest_payment_frequency": "Yearly",
+                }
+        response = self.client.post(reverse("bond-list"), data,
+                                    format="json", HTTP_X_PROFILE="1")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('desc="1 calls"', self.get_timings(response)["cdcp"])
+
+    def test_not_profiled(self):
+        """
+        Ensure requests without header or of other users are not profiled.
+        """
+        url = reverse("bond-detail", args=["CZ0003551251"])
+        response = self.client.get(url)
+        self.assertNotIn("Server-Timing", response)
+
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get(url, HTTP_X_PROFILE="1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("Server-Timing", response)
+
+        with patch("bonds_api.profiling.PROFILING_ENABLED", False):
+            self.client = self.client_class()
+            self.client.force_authenticate(User.objects.create_user(
+                "staff", "staff", is_staff=True))
+            response = self.client.get(url, HTTP_X_PROFILE="1")
+        self.assertNotIn("Server-Timing", response)
+
+    def basic_auth(self, credentials):
+        self.client.credentials(HTTP_AUTHORIZATION="Basic " + base64
+                                .b64encode(credentials).decode())
+
+    @patch("bonds_api.profiling.RequestProfile", wraps=RequestProfile)
+    def test_not_started(self, mock_profile):
+        """
+        Ensure requests which are not made by staff user are never
+        profiled.
+        """
+        url = reverse("bond-detail", args=["CZ0003551251"])
+        self.user.is_staff = False
+        self.user.set_password("password")
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.client.get(url, HTTP_X_PROFILE="cprofile")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.logout()
+        response = self.client.get(url, HTTP_X_PROFILE="cprofile")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        mock_profile.assert_not_called()
+
+        for credentials, status_code in [
+                (b"test:password", status.HTTP_200_OK),
+                (b"test:wrong", status.HTTP_403_FORBIDDEN),
+                (b"x", status.HTTP_403_FORBIDDEN)]:
+            self.basic_auth(credentials)
+            response = self.client.get(url, HTTP_X_PROFILE="cprofile")
+            self.assertEqual(response.status_code, status_code)
+            self.assertNotIn("Server-Timing", response)
+            self.assertNotIn("X-Profile-Dump", response)
+        mock_profile.assert_not_called()
+
+        # staff user authenticated by credentials
+        self.user.is_staff = True
+        self.user.save()
+        self.basic_auth(b"test:password")
+        response = self.client.get(url, HTTP_X_PROFILE="1")
+        self.assertIn("Server-Timing", response)
+        mock_profile.assert_called_once()
+
+    def test_cprofile_dump(self):
+        """
+        Ensure cProfile stats of request are dumped.
+        """
+        url = reverse("bond-detail", args=["CZ0003551251"])
+        with tempfile.TemporaryDirectory() as directory, \
+                patch("bonds_api.profiling.PROFILING_DUMP_DIR", directory):
+            response = self.client.get(url, HTTP_X_PROFILE="cprofile")
+            self.assertEqual(os.listdir(directory),
+                             [response["X-Profile-Dump"]])
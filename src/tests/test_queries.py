@@ -0,0 +1,149 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from bonds_api.models import Bond
+from bonds_api.isin_cache import get_isin_cache
+from bonds_api.summary import rebuild_summary
+from bonds_api.versions import bump_versions
+
+from unittest.mock import patch
+
+
+class QueryBudgetTests(APITestCase):
+    """
+        Number of database queries of every bond endpoint is fixed
+        and does not grow with number of bonds
+        Savepoints of transactions inside test transaction are counted too
+    """
+    def setUp(self):
+        self.user = User.objects.create_user("test", "test")
+        self.client.force_authenticate(self.user)
+        get_isin_cache().clear()
+        for i in range(20):
+            Bond.objects.create(emmision_name="Bond %s" % i,
+                                isin="CZ%010d" % i,
+                                value=10.0, interest=2.0,
+                                purchase_date="2024-06-16T12:00:00Z",
+                                maturity_date="%s-06-16T12:00:00Z" %
+                                (2030 + i),
+                                interest_payment_frequency="Y",
+                                user=self.user)
+        rebuild_summary(self.user.id)
+        bump_versions([self.user.id])
+
+    def test_list(self):
+        # portfolio version and page
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("bond-list") + "?page_size=5")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(2):
+            response = self.client.get(response.data["next"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_not_modified(self):
+        for url in [reverse("bond-list"),
+                    reverse("bond-detail", args=["CZ0000000003"]),
+                    reverse("bond-user-detail", args=[self.user.id])]:
+            etag = self.client.get(url)["ETag"]
+            # just portfolio version
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code,
+                             status.HTTP_304_NOT_MODIFIED)
+
+    @patch('bonds_api.cdcp.requests.Session.request')
+    def test_create(self, mock_request):
+        mock_request.return_value.status_code = 200
+        data = {"emmision_name": "Bond Valid ISIN",
+                "isin": "CZ0003551251",
+                "value": 11.5,
+                "interest": 2.8,
+                "purchase_date": "2024-06-16T12:00:00Z",
+                "maturity_date": "2025-06-16T12:00:00Z",
+                "interest_payment_frequency": "Yearly",
+                }
+        # unique ISIN check, insert, portfolio version and summary update
+        with self.assertNumQueries(9):
+            response = self.client.post(reverse("bond-list"), data,
+                                        format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_detail(self):
+        url = reverse("bond-detail", args=["CZ0000000003"])
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_update(self):
+        url = reverse("bond-detail", args=["CZ0000000003"])
+        # lookup, update of changed column, portfolio version and summary
+        # update
+        with self.assertNumQueries(9):
+            response = self.client.patch(url, {"value": 20.0}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # nothing is written when nothing changed
+        with self.assertNumQueries(1):
+            response = self.client.patch(url, {"value": 20.0}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_delete(self):
+        url = reverse("bond-detail", args=["CZ0000000000"])
+        # nearest maturity of summary is unset on delete and found again
+        with self.assertNumQueries(12):
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_bulk_update(self):
+        url = reverse("bond-bulk")
+        for number in (2, 10):
+            data = [{"isin": "CZ%010d" % i, "value": 30.0 + number}
+                    for i in range(number)]
+            # one lookup, one update of all bonds, portfolio version and
+            # summary update
+            with self.assertNumQueries(10):
+                response = self.client.patch(url, data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_bulk_delete(self):
+        url = reverse("bond-bulk")
+        for start, number in ((0, 2), (2, 10)):
+            data = ["CZ%010d" % i for i in range(start, start + number)]
+            # one lookup, one delete of all bonds, portfolio version and
+            # summary update
+            with self.assertNumQueries(13):
+                response = self.client.delete(url, data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_user_detail(self):
+        url = reverse("bond-user-detail", args=[self.user.id])
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cashflows(self):
+        url = reverse("bond-cashflows", args=["CZ0000000003"])
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("portfolio-cashflows"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_export(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("bond-export",
+                                               args=["ndjson"]))
+            b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_analytics(self):
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse("bond-analytics"),
+                                        {"discount_rate": 2.0},
+                                        format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
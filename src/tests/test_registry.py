@@ -0,0 +1,120 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from bonds_api.file_readers import iter_json_records
+from bonds_api.models import Bond
+from bonds_api.models import IssuedISIN
+from bonds_api.isin_cache import get_isin_cache
+
+from unittest.mock import patch
+
+
+class RegistryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("test", "test")
+        self.client.force_authenticate(self.user)
+        get_isin_cache().clear()
+
+    def load(self, content, suffix=".json", *args):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, "w") as fp:
+            fp.write(content)
+        out = io.StringIO()
+        call_command("load_cdcp_registry", path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_iter_json_records(self):
+        """
+        Ensure JSON array and JSON lines are streamed over chunk borders.
+        """
+        records = [{"isin": "CZ%010d" % i} for i in range(100)]
+        self.assertEqual(list(iter_json_records(
+            io.StringIO(json.dumps(records)), chunk_size=10)), records)
+        self.assertEqual(list(iter_json_records(
+            io.StringIO("\n".join(map(json.dumps, records))), chunk_size=7)),
+            records)
+
+        # every token cut by chunk border
+        records = [{"name": "Bond \u017e \\\"x\"", "value": -1.5e-7,
+                    "valid": True, "user": None, "rate": -float("inf")}] * 3
+        content = json.dumps(records)
+        for chunk_size in range(1, 20):
+            self.assertEqual(list(iter_json_records(
+                io.StringIO(content), chunk_size=chunk_size)), records)
+
+    def test_iter_json_records_malformed(self):
+        """
+        Ensure malformed record is reported with its offset before rest
+        of file is read.
+        """
+        valid = json.dumps({"isin": "CZ0003551251"})
+        for malformed in ['{"isin": "CZ0003551251"', '{"isin" "x"}',
+                          '{"isin": "x\ny"}', '{"isin": nul}']:
+            fp = io.StringIO("\n".join([valid, malformed + " " * 100] +
+                                       [valid] * 1000))
+            with self.assertRaisesRegex(ValueError, "Invalid JSON record "
+                                        "at offset %s" % (len(valid) + 1)):
+                list(iter_json_records(fp, chunk_size=50))
+            self.assertLess(fp.tell(), 500)
+
+    def test_load_registry(self):
+        """
+        Ensure snapshot is loaded and refreshed incrementally.
+        """
+        out = self.load(json.dumps([
+            {"ISIN": "CZ0003551251", "name": "Bond A"},
+            {"ISIN": "US0378331005", "name": "Bond B"},
+            {"ISIN": "CZ0003551252", "name": "Bad check digit"}]))
+        self.assertIn("created: 2", out)
+        self.assertIn("skipped: 1", out)
+
+        out = self.load("isin,name\nCZ0003551251,Bond A\n"
+                        "US0378331005,Bond B2\nAU0000XVGZA3,Bond C\n", ".csv")
+        self.assertIn("created: 1, updated: 1, unchanged: 1", out)
+        self.assertEqual(IssuedISIN.objects.count(), 3)
+        self.assertEqual(IssuedISIN.objects.get(isin="US0378331005").name,
+                         "Bond B2")
+
+        out = self.load(json.dumps([{"isin": "AU0000XVGZA3"}]), ".json",
+                        "--full")
+        self.assertIn("deleted: 2", out)
+        self.assertEqual(list(IssuedISIN.objects.values_list("isin",
+                                                             flat=True)),
+                         ["AU0000XVGZA3"])
+
+    @patch('bonds_api.utils.ISIN_REGISTRY_REMOTE_FALLBACK', False)
+    @patch('bonds_api.utils.ISIN_REGISTRY', "mirror")
+    @patch('bonds_api.cdcp.requests.Session.request')
+    def test_add_bond_mirror(self, mock_request):
+        """
+        Ensure ISIN is validated against mirror without request to CDCP.
+        """
+        self.load(json.dumps([{"isin": "CZ0003551251"}]))
+        data = {"emmision_name": "Bond Valid ISIN",
+                "isin": "CZ0003551251",
+                "value": 11.5,
+                "interest": 2.8,
+                "purchase_date": "2024-06-16T12:00:00Z",
+                "maturity_date": "2025-06-16T12:00:00Z",
+                "interest_payment_frequency": "Yearly",
+                }
+        response = self.client.post(reverse("bond-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        data["isin"] = "US0378331005"
+        response = self.client.post(reverse("bond-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Bond.objects.count(), 1)
+        mock_request.assert_not_called()
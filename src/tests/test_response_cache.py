@@ -0,0 +1,173 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import tempfile
+import threading
+import time
+
+from types import SimpleNamespace
+
+from django.core.cache import caches
+from django.http import QueryDict
+from django.test import SimpleTestCase
+from django.test import override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APITestCase
+from bonds_api.models import Bond
+from bonds_api.isin_cache import get_isin_cache
+from bonds_api.response_cache import cached
+
+from unittest.mock import patch
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("test", "test")
+        self.client.force_authenticate(self.user)
+        get_isin_cache().clear()
+        caches["responses"].clear()
+        patcher = patch("bonds_api.utils.get_cdcp_client")
+        patcher.start().return_value.is_issued.return_value = True
+        self.addCleanup(patcher.stop)
+
+    def create_bond(self, isin):
+        data = {"emmision_name": "Bond %s" % isin,
+                "isin": isin,
+                "value": 10.0,
+                "interest": 2.9,
+                "purchase_date": "2024-06-16T12:00:00Z",
+                "maturity_date": "2044-06-16T12:00:00Z",
+                "interest_payment_frequency": "Yearly"}
+        response = self.client.post(reverse("bond-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def get_isins(self, url=None):
+        response = self.client.get(url or reverse("bond-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [bond["isin"] for bond in response.json()["results"]]
+
+    def test_cached_list(self):
+        """
+        Ensure list is cached per query and invalidated by views.
+        """
+        self.create_bond("CZ0003551251")
+        self.assertEqual(self.get_isins(), ["CZ0003551251"])
+        # just portfolio version
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_isins(), ["CZ0003551251"])
+        with self.assertNumQueries(2):
+            self.get_isins(reverse("bond-list") + "?page_size=5")
+
+        self.create_bond("US0378331005")
+        self.assertEqual(self.get_isins(),
+                         ["CZ0003551251", "US0378331005"])
+
+    def test_orm_changes(self):
+        """
+        Ensure changes of bonds outside views invalidate cache.
+        """
+        url = reverse("bond-user-detail", args=[self.user.id])
+        self.create_bond("CZ0003551251")
+        self.assertEqual(self.client.get(url).json()["total_value"], 10.0)
+
+        bond = Bond.objects.get()
+        bond.value = 20.0
+        bond.save()
+        self.assertEqual(self.get_isins(), ["CZ0003551251"])
+        bond.delete()
+        self.assertEqual(self.get_isins(), [])
+
+    def test_file_based_cache(self):
+        """
+        Ensure responses are cached by file based backend.
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        backend = "django.core.cache.backends.filebased.FileBasedCache"
+        with override_settings(CACHES={
+                "default": {"BACKEND": backend,
+                            "LOCATION": directory.name + "/default"},
+                "responses": {"BACKEND": backend,
+                              "LOCATION": directory.name + "/responses"}}):
+            self.create_bond("CZ0003551251")
+            self.assertEqual(self.get_isins(), ["CZ0003551251"])
+            with self.assertNumQueries(1):
+                self.assertEqual(self.get_isins(), ["CZ0003551251"])
+            Bond.objects.get().delete()
+            self.assertEqual(self.get_isins(), [])
+
+    def test_browsable_api(self):
+        """
+        Ensure HTML pages are not cached.
+        """
+        url = reverse("bond-list")
+        for _ in range(2):
+            with self.assertNumQueries(2):
+                response = self.client.get(url, HTTP_ACCEPT="text/html")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class StampedeView:
+    def __init__(self):
+        self.calls = 0
+
+    @cached
+    def get(self, request):
+        self.calls += 1
+        calls = self.calls
+        time.sleep(0.2)
+        return Response({"calls": calls})
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response.accepted_renderer = request.accepted_renderer
+        response.accepted_media_type = request.accepted_media_type
+        response.renderer_context = {}
+        return response
+
+
+class StampedeTests(SimpleTestCase):
+    def setUp(self):
+        caches["responses"].clear()
+
+    def get_request(self):
+        return SimpleNamespace(
+            user=SimpleNamespace(id=1, is_staff=False, is_superuser=False),
+            query_params=QueryDict("page_size=5"),
+            accepted_renderer=JSONRenderer(),
+            accepted_media_type="application/json",
+            portfolio_version=1)
+
+    def get_all(self, view, number):
+        results = [None] * number
+
+        def get(index):
+            results[index] = view.get(self.get_request()).content
+        threads = [threading.Thread(target=get, args=(i,))
+                   for i in range(number)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_stampede(self):
+        """
+        Ensure missing entry is rendered by one of concurrent requests.
+        """
+        view = StampedeView()
+        self.assertEqual(self.get_all(view, 8), [b'{"calls":1}'] * 8)
+        self.assertEqual(view.calls, 1)
+
+    @patch("bonds_api.response_cache.RESPONSE_CACHE_LOCK_WAIT", 0.05)
+    def test_lock_wait(self):
+        """
+        Ensure request does not wait for slow rendering too long.
+        """
+        view = StampedeView()
+        self.assertEqual(sorted(self.get_all(view, 2)),
+                         [b'{"calls":1}', b'{"calls":2}'])
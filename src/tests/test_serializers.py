@@ -0,0 +1,142 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import json
+
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from decimal import Decimal
+from importlib.util import find_spec
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework import serializers
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from bonds_api.models import Bond
+from bonds_api.serializers import BondSerializer
+from bonds_api.serializers import ChoiceField
+from bonds_api.serializers import serialize_bond_values
+from bonds_api.renderers import MessagePackRenderer
+from bonds_api.renderers import ORJSONRenderer
+
+
+class SerializerTests(TestCase):
+    def create_bonds(self, frequencies="DWMY"):
+        user = User.objects.create_user("test", "test")
+        start = datetime(2024, 6, 16, 12, 0, 0, 123456, tzinfo=timezone.utc)
+        for i, frequency in enumerate(frequencies):
+            Bond.objects.create(emmision_name="Bond ž %s" % i,
+                                isin="CZ%010d" % i,
+                                value=10 + i / 3, interest=-1.5 + i,
+                                purchase_date=start + timedelta(seconds=i),
+                                maturity_date=start + timedelta(days=i),
+                                interest_payment_frequency=frequency,
+                                user=user)
+        return Bond.objects.order_by("id")
+
+    def test_serialize_bond_values(self):
+        """
+        Ensure lean serialization renders the same JSON as BondSerializer.
+        """
+        # unknown frequency too
+        bond_list = self.create_bonds("DWMYX")
+        expected = JSONRenderer().render(
+            BondSerializer(bond_list, many=True).data)
+        result = JSONRenderer().render(serialize_bond_values(
+            bond_list.values(*BondSerializer.Meta.fields)))
+        self.assertEqual(result, expected)
+
+    def test_serialize_selected_fields(self):
+        """
+        Ensure just selected fields are serialized.
+        """
+        bond_list = self.create_bonds()
+        fields = ["isin", "value", "maturity_date", "validation_status"]
+        expected = [{field: bond[field] for field in fields}
+                    for bond in serialize_bond_values(
+                        bond_list.values(*BondSerializer.Meta.fields))]
+        self.assertEqual(serialize_bond_values(bond_list.values(*fields),
+                                               fields), expected)
+
+    @skipUnless(find_spec("orjson"), "orjson is not installed")
+    def test_orjson_renderer(self):
+        """
+        Ensure orjson renders the same JSON as JSONRenderer.
+        """
+        bond_list = self.create_bonds()
+        data = ReturnDict({
+            "results": serialize_bond_values(
+                bond_list.values(*BondSerializer.Meta.fields)),
+            "next": None, "count": 4, "price": Decimal("1.50"),
+            "as_of": datetime(2025, 1, 1, tzinfo=timezone.utc),
+            "error": serializers.ErrorDetail("Invalid value")},
+            serializer=None)
+        self.assertEqual(ORJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    @skipUnless(find_spec("orjson"), "orjson is not installed")
+    def test_orjson_edge_cases(self):
+        """
+        Ensure orjson output differs from JSONRenderer just as documented
+        and it is used only when requested.
+        """
+        data = {"name": "Bond\u2028\u2029ž"}
+        self.assertEqual(ORJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+        # the same numbers in other notation
+        data = {"large": 1e16, "small": 1e-7, "mantissa": 1.5e-7}
+        self.assertEqual(JSONRenderer().render(data),
+                         b'{"large":1e+16,"small":1e-07,"mantissa":1.5e-07}')
+        self.assertEqual(ORJSONRenderer().render(data),
+                         b'{"large":1e16,"small":1e-7,"mantissa":1.5e-7}')
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), data)
+        for value in [float("nan"), float("inf"), float("-inf")]:
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({"value": value})
+            self.assertEqual(ORJSONRenderer().render({"value": value}),
+                             b'{"value":null}')
+
+        renderers = [renderer() for renderer
+                     in api_settings.DEFAULT_RENDERER_CLASSES]
+        factory = APIRequestFactory()
+        for url, accept, expected in [
+                ("/bonds/api", "*/*", JSONRenderer),
+                ("/bonds/api", "application/json", JSONRenderer),
+                ("/bonds/api?format=orjson", "*/*", ORJSONRenderer),
+                ("/bonds/api?format=orjson", "application/json",
+                 ORJSONRenderer)]:
+            request = factory.get(url, HTTP_ACCEPT=accept)
+            request.query_params = request.GET
+            renderer, _ = DefaultContentNegotiation().select_renderer(
+                request, renderers, request.GET.get("format"))
+            self.assertIs(type(renderer), expected)
+
+    @skipUnless(find_spec("msgpack"), "msgpack is not installed")
+    def test_msgpack_renderer(self):
+        """
+        Ensure MessagePack carries the same data as JSON.
+        """
+        import msgpack
+        bond_list = self.create_bonds()
+        data = serialize_bond_values(
+            bond_list.values(*BondSerializer.Meta.fields))
+        self.assertEqual(msgpack.unpackb(MessagePackRenderer().render(data)),
+                         json.loads(JSONRenderer().render(data)))
+
+    def test_choice_field(self):
+        """
+        Ensure labels are converted to values and unknown ones rejected.
+        """
+        field = ChoiceField(choices=Bond.PaymentFrequency.choices)
+        self.assertEqual(field.to_internal_value("Weekly"), "W")
+        for data in ["W", "weekly", ["Weekly"], None]:
+            with self.assertRaises(serializers.ValidationError):
+                field.to_internal_value(data)
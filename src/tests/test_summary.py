@@ -0,0 +1,183 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import io
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from bonds_api.models import Bond
+from bonds_api.models import PortfolioSummary
+from bonds_api.isin_cache import get_isin_cache
+from bonds_api.summary import check_summary
+
+from unittest.mock import patch
+
+
+class PortfolioSummaryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("test", "test")
+        self.client.force_authenticate(self.user)
+        get_isin_cache().clear()
+
+    @patch('bonds_api.cdcp.requests.Session.request')
+    def add_bonds(self, mock_request):
+        mock_request.return_value.status_code = 200
+        bond = {"emmision_name": "Bond",
+                "value": 100.0,
+                "interest": 2.0,
+                "purchase_date": "2024-06-16T12:00:00Z",
+                "maturity_date": "2030-06-16T12:00:00Z",
+                "interest_payment_frequency": "Yearly",
+                }
+        response = self.client.post(reverse("bond-list"),
+                                    dict(bond, isin="CZ0003551251"),
+                                    format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse("bond-bulk"), [
+            dict(bond, isin="US0378331005", value=50.0,
+                 maturity_date="2026-06-16T12:00:00Z"),
+            dict(bond, isin="AU0000XVGZA3", interest=4.0,
+                 interest_payment_frequency="Monthly")], format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def get_summary(self):
+        return PortfolioSummary.objects.get(user=self.user)
+
+    def test_summary_is_maintained(self):
+        """
+        Ensure summary follows created, patched and deleted bonds.
+        """
+        self.add_bonds()
+        summary = self.get_summary()
+        self.assertEqual(summary.count, 3)
+        self.assertEqual(summary.next_maturity.isin, "US0378331005")
+        self.assertEqual(check_summary(summary), {})
+
+        url = reverse("bond-detail", args=["US0378331005"])
+        response = self.client.patch(url, {"maturity_date":
+                                           "2040-06-16T12:00:00Z"},
+                                     format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = self.get_summary()
+        self.assertEqual(summary.next_maturity.isin, "CZ0003551251")
+        self.assertEqual(check_summary(summary), {})
+
+        self.client.delete(reverse("bond-detail", args=["CZ0003551251"]))
+        summary = self.get_summary()
+        self.assertEqual(summary.count, 2)
+        self.assertEqual(summary.next_maturity.isin, "AU0000XVGZA3")
+        self.assertEqual(check_summary(summary), {})
+
+        url = reverse("bond-user-detail", args=[self.user.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertAlmostEqual(response.data["total_value"], 150.0)
+        self.assertAlmostEqual(response.data["avg_interest"], 3.0)
+
+        for isin in ("US0378331005", "AU0000XVGZA3"):
+            self.client.delete(reverse("bond-detail", args=[isin]))
+        self.assertFalse(PortfolioSummary.objects.exists())
+
+    @patch('bonds_api.cdcp.requests.Session.request')
+    def test_offset_dates(self, mock_request):
+        """
+        Ensure summary is updated from dates converted to UTC.
+        """
+        mock_request.return_value.status_code = 200
+        response = self.client.post(reverse("bond-list"), {
+            "emmision_name": "Bond",
+            "isin": "CZ0003551251",
+            "value": 100.0,
+            "interest": 10.0,
+            "purchase_date": "2023-06-01T00:00:00Z",
+            "maturity_date": "2025-06-01T00:00:00Z",
+            "interest_payment_frequency": "Yearly"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # 2023-12-31T23:30:00Z
+        url = reverse("bond-detail", args=["CZ0003551251"])
+        response = self.client.patch(url, {"purchase_date":
+                                           "2024-01-01T00:30:00+01:00"},
+                                     format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = self.get_summary()
+        self.assertAlmostEqual(summary.future_value, 121.0)
+        self.assertEqual(check_summary(summary), {})
+
+    def test_summary_is_maintained_by_bulk(self):
+        """
+        Ensure summary follows bonds patched and deleted in batch.
+        """
+        self.add_bonds()
+        response = self.client.patch(reverse("bond-bulk"), [
+            {"isin": "US0378331005", "maturity_date": "2040-06-16T12:00:00Z",
+             "value": 70.0},
+            {"isin": "AU0000XVGZA3", "interest": 1.0}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = self.get_summary()
+        self.assertEqual(summary.next_maturity.isin, "CZ0003551251")
+        self.assertAlmostEqual(summary.total_value, 270.0)
+        self.assertEqual(check_summary(summary), {})
+
+        response = self.client.delete(reverse("bond-bulk"),
+                                      ["AU0000XVGZA3", "CZ0003551251"],
+                                      format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = self.get_summary()
+        self.assertEqual(summary.count, 1)
+        self.assertEqual(summary.next_maturity.isin, "US0378331005")
+        self.assertEqual(check_summary(summary), {})
+
+        self.client.delete(reverse("bond-bulk"), ["US0378331005"],
+                           format="json")
+        self.assertFalse(PortfolioSummary.objects.exists())
+
+    @patch('bonds_api.cdcp.requests.Session.request')
+    def test_offset_dates_by_bulk(self, mock_request):
+        """
+        Ensure summary is updated from bulk dates converted to UTC.
+        """
+        mock_request.return_value.status_code = 200
+        bond = {"emmision_name": "Bond",
+                "value": 100.0,
+                "interest": 10.0,
+                "purchase_date": "2024-01-01T00:30:00+01:00",
+                "maturity_date": "2025-06-01T00:00:00Z",
+                "interest_payment_frequency": "Yearly"}
+        response = self.client.post(reverse("bond-bulk"), [
+            dict(bond, isin="CZ0003551251"),
+            dict(bond, isin="US0378331005")], format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        summary = self.get_summary()
+        self.assertAlmostEqual(summary.future_value, 242.0)
+        self.assertEqual(check_summary(summary), {})
+
+        response = self.client.patch(reverse("bond-bulk"), [
+            {"isin": "CZ0003551251",
+             "maturity_date": "2025-12-31T23:30:00-01:00"}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = self.get_summary()
+        self.assertAlmostEqual(summary.future_value, 254.1)
+        self.assertEqual(check_summary(summary), {})
+
+    def test_rebuild_command(self):
+        """
+        Ensure drift is reported and fixed by rebuild.
+        """
+        self.add_bonds()
+        Bond.objects.filter(isin="CZ0003551251").update(value=200.0)
+
+        out = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command("rebuild_portfolio_summary", "--check", stdout=out)
+        self.assertIn("total_value stored 250.0, computed 350.0",
+                      out.getvalue())
+
+        call_command("rebuild_portfolio_summary", stdout=out)
+        call_command("rebuild_portfolio_summary", "--check", stdout=out)
+        self.assertEqual(self.get_summary().total_value, 350.0)
@@ -0,0 +1,84 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+import random
+
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from django.test import TestCase
+
+from bonds_api.models import Bond
+from bonds_api.utils import get_number_of_payments
+from bonds_api.valuation import get_future_values
+from bonds_api.valuation import get_numbers_of_payments
+from bonds_api.valuation import load_portfolio
+from bonds_api.valuation import to_datetime64
+
+from unittest.mock import patch
+
+
+class ValuationTests(SimpleTestCase):
+    def test_numbers_of_payments(self):
+        """
+        Ensure vectorized number of payments matches scalar one.
+        """
+        rnd = random.Random(42)
+        start = datetime(1990, 1, 1, tzinfo=timezone.utc)
+        purchase = []
+        maturity = []
+        frequency = []
+        for _ in range(2000):
+            purchase.append(start + timedelta(seconds=rnd.randrange(10 ** 9)))
+            maturity.append(purchase[-1] +
+                            timedelta(seconds=rnd.randrange(10 ** 9)))
+            frequency.append(rnd.choice("DWMYX"))
+
+        expected = [get_number_of_payments(*args)
+                    for args in zip(purchase, maturity, frequency)]
+        result = get_numbers_of_payments(to_datetime64(purchase),
+                                         to_datetime64(maturity), frequency)
+        self.assertEqual(result.tolist(), expected)
+
+    def test_future_values(self):
+        """
+        Ensure future values match scalar formula.
+        """
+        result = get_future_values([100.0, 50.0], [2.0, -1.0], [6, 24])
+        self.assertAlmostEqual(result[0], 100.0 * 1.02 ** 6)
+        self.assertAlmostEqual(result[1], 50.0 * 0.99 ** 24)
+
+
+class LoadPortfolioTests(TestCase):
+    def test_dates(self):
+        """
+        Ensure dates read as epoch microseconds equal converted datetimes.
+        """
+        user = User.objects.create_user("test", "test")
+        dates = [datetime(2025, 6, 16, 12, tzinfo=timezone.utc),
+                 datetime(2025, 6, 16, 12, 0, 1, 5, tzinfo=timezone.utc),
+                 datetime(1969, 12, 31, 23, 59, 59, 500000,
+                          tzinfo=timezone.utc),
+                 datetime(1900, 2, 28, 1, 2, 3, 999999, tzinfo=timezone.utc)]
+        Bond.objects.bulk_create(
+            Bond(emmision_name="Bond", isin="CZ%010d" % i, value=1.0,
+                 interest=1.0, purchase_date=date - timedelta(days=1),
+                 maturity_date=date, interest_payment_frequency="Y",
+                 user=user) for i, date in enumerate(dates))
+        queryset = Bond.objects.order_by("id")
+
+        portfolio = load_portfolio(queryset)
+        self.assertEqual(portfolio["maturity_date"].dtype, "datetime64[us]")
+        self.assertEqual(portfolio["maturity_date"].tolist(),
+                         to_datetime64(dates).tolist())
+        self.assertEqual(portfolio["purchase_date"].tolist(),
+                         to_datetime64([date - timedelta(days=1)
+                                        for date in dates]).tolist())
+        # other databases read datetimes
+        with patch("bonds_api.valuation.EPOCH_VENDORS", set()):
+            fallback = load_portfolio(queryset)
+        self.assertEqual(fallback["maturity_date"].tolist(),
+                         portfolio["maturity_date"].tolist())
@@ -0,0 +1,133 @@
+#!python3
+# -*- codding: utf-8 -*-
+
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.test import APITransactionTestCase
+from bonds_api.models import Bond
+from bonds_api.models import PortfolioVersion
+from bonds_api.isin_cache import get_isin_cache
+
+from unittest.mock import patch
+
+
+class VersionTestMixin:
+    def setUp(self):
+        self.user = User.objects.create_user("test", "test")
+        self.client.force_authenticate(self.user)
+        get_isin_cache().clear()
+        patcher = patch("bonds_api.utils.get_cdcp_client")
+        patcher.start().return_value.is_issued.return_value = True
+        self.addCleanup(patcher.stop)
+
+    def create_bond(self, isin):
+        data = {"emmision_name": "Bond %s" % isin,
+                "isin": isin,
+                "value": 10.0,
+                "interest": 2.9,
+                "purchase_date": "2024-06-16T12:00:00Z",
+                "maturity_date": "2044-06-16T12:00:00Z",
+                "interest_payment_frequency": "Yearly"}
+        response = self.client.post(reverse("bond-list"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def assert_modified(self, url, etag, modified=True):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code,
+                         status.HTTP_200_OK if modified
+                         else status.HTTP_304_NOT_MODIFIED)
+        self.assertIn("private", response["Cache-Control"])
+        return response["ETag"]
+
+
+class PortfolioVersionTests(VersionTestMixin, APITestCase):
+    def test_etag(self):
+        """
+        Ensure ETag changes with every change of bonds.
+        """
+        url = reverse("bond-list")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(etag, 'W/"%s-0"' % self.user.id)
+
+        self.create_bond("CZ0003551251")
+        etag = self.assert_modified(url, etag)
+        self.assert_modified(url, etag, modified=False)
+
+        detail_url = reverse("bond-detail", args=["CZ0003551251"])
+        response = self.client.patch(detail_url, {"value": 20.0},
+                                     format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = self.assert_modified(url, etag)
+
+        response = self.client.delete(detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = self.assert_modified(url, etag)
+        self.assertEqual(PortfolioVersion.objects.get().version, 3)
+
+        # version does not start again when portfolio was emptied
+        self.create_bond("CZ0003551251")
+        self.assert_modified(url, etag)
+        self.assertEqual(PortfolioVersion.objects.get().version, 4)
+
+    def test_last_modified(self):
+        """
+        Ensure If-Modified-Since is not answered by 304, change in the
+        same second would be missed.
+        """
+        self.create_bond("CZ0003551251")
+        url = reverse("bond-user-detail", args=[self.user.id])
+        response = self.client.get(url)
+        self.create_bond("CZ0003551269")
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["total_value"], 20.0)
+
+    def test_error_headers(self):
+        """
+        Ensure error responses have no ETag and Last-Modified.
+        """
+        self.create_bond("CZ0003551251")
+        response = self.client.get(reverse("bond-detail",
+                                           args=["CZ0003551269"]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(response.has_header("ETag"))
+        self.assertFalse(response.has_header("Last-Modified"))
+
+    def test_other_user(self):
+        """
+        Ensure version of other user's portfolio is not disclosed.
+        """
+        other = User.objects.create_user("other", "other")
+        url = reverse("bond-user-detail", args=[other.id])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='W/"%s-0"' %
+                                   other.id)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(response.has_header("ETag"))
+
+
+
+class OutsideViewsVersionTests(VersionTestMixin, APITransactionTestCase):
+    # versions of bonds changed outside views are incremented after commit
+
+    def test_changed_outside_views(self):
+        """
+        Ensure ETag changes when bond is changed through ORM.
+        """
+        self.create_bond("CZ0003551251")
+        url = reverse("bond-detail", args=["CZ0003551251"])
+        etag = self.client.get(url)["ETag"]
+
+        bond = Bond.objects.get()
+        bond.value = 99.0
+        bond.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["value"], 99.0)
+        etag = response["ETag"]
+
+        bond.delete()
+        self.assert_modified(reverse("bond-list"), etag)
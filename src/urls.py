@@ -6,6 +6,7 @@ from django.urls import path
 from django.urls import include
 from bonds_api import bond_urls
 from bonds_api.bond_views import schema_view
+from bonds_api.metrics import metrics_view
 
 urlpatterns = [
 ]
@@ -13,5 +14,6 @@ urlpatterns = [
 urlpatterns = [
     path("api-auth/", include("rest_framework.urls")),
     path("bonds/", include(bond_urls)),
+    path("metrics", metrics_view, name="metrics"),
     path('', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
 ]